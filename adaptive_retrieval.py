@@ -0,0 +1,137 @@
+"""Adaptive retrieval depth.
+
+Instead of a fixed k, over-fetch `max_k` hits once with
+retrieve_with_scores() and keep the ranked prefix that passes three
+cutoffs, checked in rank order:
+
+- distance: the hit's distance exceeds `max_distance`
+- gap: the hit's distance jumps by more than `max_gap` (relative) over
+  the previous hit's, i.e. the ranking falls off a cliff
+- tokens: keeping the hit would push the context past `max_tokens`
+
+At least `min_k` hits are always kept. Confident queries (one close hit,
+then a gap) get a short context; diffuse ones keep more evidence, up to
+the token ceiling. The returned AdaptiveCut records where and why the
+list was cut.
+
+Usage: uv run python query.py --adaptive "What is retrieval augmented generation?"
+"""
+
+from dataclasses import dataclass
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from tokens import estimate_tokens
+from vectorstore import retrieve_with_scores
+
+
+DEFAULT_MAX_K = 10
+# Distances are squared L2 between unit vectors (0-4); 1.0 is cosine similarity 0.5
+DEFAULT_MAX_DISTANCE = 1.0
+DEFAULT_MAX_GAP = 0.25
+DEFAULT_MAX_TOKENS = 2000
+
+
+@dataclass
+class AdaptiveCut:
+    """Where and why an over-fetched hit list was cut.
+
+    `reason` is "distance", "gap" or "tokens" for the cutoff that fired,
+    or "max_k" if every fetched hit was kept.
+    """
+
+    fetched: int
+    kept: int
+    reason: str
+    tokens: int
+    distances: list[float]
+
+    def describe(self) -> str:
+        return f"kept {self.kept}/{self.fetched} (cut by {self.reason}, ~{self.tokens} tokens)"
+
+
+def cut_hits(
+    hits: list[tuple[Document, float]],
+    max_distance: float | None = DEFAULT_MAX_DISTANCE,
+    max_gap: float | None = DEFAULT_MAX_GAP,
+    max_tokens: int | None = DEFAULT_MAX_TOKENS,
+    min_k: int = 1,
+) -> tuple[list[tuple[Document, float]], AdaptiveCut]:
+    """
+    Cut a ranked (Document, distance) list by distance, score gap and tokens.
+
+    Args:
+        hits: Hits sorted by ascending distance, as from retrieve_with_scores()
+        max_distance: Drop hits farther than this (None: no limit)
+        max_gap: Cut where a distance exceeds the previous one by more than
+            this fraction, e.g. 0.25 for a 25% jump (None: no limit)
+        max_tokens: Estimated token ceiling for the kept chunks (None: no limit)
+        min_k: Always keep at least this many hits
+
+    Returns:
+        (kept hits, AdaptiveCut)
+    """
+    kept: list[tuple[Document, float]] = []
+    tokens = 0
+    reason = "max_k"
+    for doc, distance in hits:
+        doc_tokens = estimate_tokens(doc.page_content)
+        if len(kept) >= min_k:
+            previous = kept[-1][1]
+            if max_distance is not None and distance > max_distance:
+                reason = "distance"
+            elif max_gap is not None and distance > max(previous, 1e-6) * (1 + max_gap):
+                reason = "gap"
+            elif max_tokens is not None and tokens + doc_tokens > max_tokens:
+                reason = "tokens"
+            if reason != "max_k":
+                break
+        kept.append((doc, distance))
+        tokens += doc_tokens
+
+    cut = AdaptiveCut(
+        fetched=len(hits),
+        kept=len(kept),
+        reason=reason,
+        tokens=tokens,
+        distances=[distance for _, distance in hits],
+    )
+    return kept, cut
+
+
+def retrieve_adaptive(
+    vectorstore: Chroma,
+    query: str,
+    max_k: int = DEFAULT_MAX_K,
+    max_distance: float | None = DEFAULT_MAX_DISTANCE,
+    max_gap: float | None = DEFAULT_MAX_GAP,
+    max_tokens: int | None = DEFAULT_MAX_TOKENS,
+    min_k: int = 1,
+) -> tuple[list[tuple[Document, float]], AdaptiveCut]:
+    """
+    Fetch `max_k` hits with retrieve_with_scores(), then cut them with cut_hits().
+
+    Returns:
+        (kept (Document, score) tuples, AdaptiveCut)
+    """
+    hits = retrieve_with_scores(vectorstore, query, k=max_k)
+    return cut_hits(hits, max_distance=max_distance, max_gap=max_gap, max_tokens=max_tokens, min_k=min_k)
+
+
+def add_adaptive_args(parser) -> None:
+    """Add --adaptive and its cutoff options to an argparse parser."""
+    group = parser.add_argument_group("adaptive depth")
+    group.add_argument("--adaptive", action="store_true",
+                       help="Choose retrieval depth per query from scores instead of a fixed k")
+    group.add_argument("--max-k", type=int, default=DEFAULT_MAX_K, help="Hits to over-fetch")
+    group.add_argument("--max-distance", type=float, default=DEFAULT_MAX_DISTANCE)
+    group.add_argument("--max-gap", type=float, default=DEFAULT_MAX_GAP,
+                       help="Relative distance jump that ends the list")
+    group.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                       help="Estimated token ceiling for retrieved context")
+
+
+def cut_kwargs(args) -> dict:
+    """cut_hits() keyword arguments from add_adaptive_args() options."""
+    return {"max_distance": args.max_distance, "max_gap": args.max_gap, "max_tokens": args.max_tokens}
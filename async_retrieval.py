@@ -0,0 +1,191 @@
+"""Async retrieval for event-loop callers.
+
+retrieve() and retrieve_with_scores() block while the query is embedded
+and the index searched, which stalls an async web front end. The async
+variants here run both steps on a bounded thread pool instead, accept a
+timeout, and can be cancelled like any other awaitable.
+
+Queries that arrive within a short window (BATCH_WINDOW_MS) share one
+embed_documents() call, since encoding a batch costs little more than
+encoding a single query. For HuggingFaceEmbeddings embed_query(q) is
+embed_documents([q])[0], so batched vectors are the same as unbatched.
+Batchers are kept per event loop, so loops in different threads that
+share an embedding model never share a window.
+
+    docs = await aretrieve(vectorstore, "What is RAG?", k=3, timeout=2.0)
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import get_embeddings
+
+
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+BATCH_WINDOW_MS = 5.0
+MAX_BATCH_SIZE = 32
+
+_executor: ThreadPoolExecutor | None = None
+_batchers: dict[asyncio.AbstractEventLoop, dict[int, tuple[Embeddings, "QueryBatcher"]]] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for embedding and search (RETRIEVAL_WORKERS threads)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+    return _executor
+
+
+def configure_retrieval_executor(max_workers: int) -> None:
+    """Replace the shared pool with one of a different size."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval")
+
+
+class QueryBatcher:
+    """Coalesces concurrent query embeddings into batched calls.
+
+    The first query to arrive opens a window of `window_ms`; every query
+    received before it closes (or until `max_batch` queries are waiting)
+    is embedded in one embed_documents() call on the retrieval executor.
+    Callers cancelled before their batch runs are dropped from it.
+
+    A batcher belongs to the first event loop that uses it; using it from
+    another loop raises RuntimeError until that loop is closed.
+
+    Args:
+        embeddings: Embedding model
+        window_ms: How long to wait for more queries after the first
+        max_batch: Flush immediately once this many queries are waiting
+    """
+
+    def __init__(self, embeddings: Embeddings, window_ms: float = BATCH_WINDOW_MS, max_batch: int = MAX_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.calls = 0
+        self.queries = 0
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._bind_lock = threading.Lock()
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._bind_lock:
+            if loop is self._loop:
+                return
+            if self._loop is not None and not self._loop.is_closed():
+                raise RuntimeError("QueryBatcher is in use by another event loop; use one batcher per loop")
+            # A window left open by a loop that has since closed would never flush
+            self._loop, self._pending, self._timer = loop, [], None
+
+    async def embed(self, query: str) -> list[float]:
+        """Embed one query, possibly together with concurrent ones."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._bind(loop)
+        future = loop.create_future()
+        self._pending.append((query, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [(query, future) for query, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+        self.calls += 1
+        self.queries += len(batch)
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(
+            get_retrieval_executor(), self.embeddings.embed_documents, [query for query, _ in batch]
+        )
+        task.add_done_callback(lambda done: self._deliver(batch, done))
+
+    @staticmethod
+    def _deliver(batch: list[tuple[str, asyncio.Future]], task: asyncio.Future) -> None:
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result()[i])
+
+
+def get_batcher(vectorstore: Chroma) -> QueryBatcher:
+    """The shared QueryBatcher for a store's embedding function on the running loop."""
+    embeddings = getattr(vectorstore, "_embedding_function", None) or get_embeddings()
+    loop = asyncio.get_running_loop()
+    with _batchers_lock:
+        for closed in [other for other in _batchers if other.is_closed()]:
+            del _batchers[closed]
+        per_loop = _batchers.setdefault(loop, {})
+        if id(embeddings) not in per_loop:
+            # Keep a reference so the id stays unique for the batcher's lifetime
+            per_loop[id(embeddings)] = (embeddings, QueryBatcher(embeddings))
+        return per_loop[id(embeddings)][1]
+
+
+async def _search(
+    vectorstore: Chroma, query: str, k: int, batcher: QueryBatcher | None
+) -> list[tuple[Document, float]]:
+    embedding = await (batcher or get_batcher(vectorstore)).embed(query)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_retrieval_executor(),
+        lambda: vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=k),
+    )
+
+
+async def aretrieve_with_scores(
+    vectorstore: Chroma,
+    query: str,
+    k: int = 3,
+    timeout: float | None = None,
+    batcher: QueryBatcher | None = None,
+) -> list[tuple[Document, float]]:
+    """
+    Async retrieve_with_scores(): embed (batched) and search off the event loop.
+
+    Args:
+        vectorstore: Chroma store, ShardedVectorStore or Snapshot
+        query: The search query
+        k: Number of documents to retrieve (default: 3)
+        timeout: Seconds before asyncio.TimeoutError (default: no limit)
+        batcher: QueryBatcher to use (default: shared per embedding function)
+
+    Returns:
+        List of (Document, score) tuples, sorted by relevance
+    """
+    return await asyncio.wait_for(_search(vectorstore, query, k, batcher), timeout)
+
+
+async def aretrieve(
+    vectorstore: Chroma,
+    query: str,
+    k: int = 3,
+    timeout: float | None = None,
+    batcher: QueryBatcher | None = None,
+) -> list[Document]:
+    """Async retrieve(); see aretrieve_with_scores()."""
+    hits = await aretrieve_with_scores(vectorstore, query, k=k, timeout=timeout, batcher=batcher)
+    return [doc for doc, _ in hits]
@@ -0,0 +1,271 @@
+"""Coarse-to-fine retrieval with a document-level centroid index.
+
+Flat retrieval scores every chunk in the corpus. This module keeps a
+second, much smaller Chroma collection holding one centroid vector (the
+mean chunk embedding, scaled to unit length like the chunk embeddings)
+per paper, or per page for finer sections. A query first finds the top
+`fan_out` documents by centroid, then searches only chunks from those
+documents.
+
+The centroid collection records a fingerprint of the chunk collection it
+was built from (chunk count and a hash of the chunk IDs); loading it
+warns when the chunks have changed since. Query-time loads only compare
+the count, which is O(1); `eval` checks the full fingerprint.
+
+Usage:
+    uv run python centroid_index.py build [--group-by page]
+    uv run python centroid_index.py eval --fan-out 3 --k 5
+"""
+
+import argparse
+import hashlib
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from loguru import logger
+
+from run_evaluation import TEST_QUERIES
+from vectorstore import CHROMA_DB_PATH, iter_entries, load_vectorstore
+
+
+CENTROID_SUFFIX = "_centroids"
+DEFAULT_FAN_OUT = 3
+
+
+def _group_key(metadata: dict, group_by: str) -> str:
+    source = str(metadata.get("source", ""))
+    if group_by == "page":
+        return f"{source}#{metadata.get('page', '')}"
+    return source
+
+
+def centroid_collection_name(collection_name: str) -> str:
+    """Name of the centroid collection paired with a chunk collection."""
+    return f"{collection_name}{CENTROID_SUFFIX}"
+
+
+def chunk_fingerprint(vectorstore: Chroma) -> str:
+    """Chunk count and a hash of the sorted chunk IDs, e.g. "1234:9f86d081884c7d65"."""
+    ids = sorted(entry_id for entry_id, _, _, _ in iter_entries(vectorstore, include=[]))
+    digest = hashlib.sha256("\n".join(ids).encode()).hexdigest()[:16]
+    return f"{len(ids)}:{digest}"
+
+
+def build_centroid_index(vectorstore: Chroma, group_by: str = "source") -> Chroma:
+    """
+    Build (or rebuild) the centroid collection for a chunk store.
+
+    Args:
+        vectorstore: The chunk vector store
+        group_by: "source" for one centroid per paper, "page" for one per page
+
+    Returns:
+        Chroma store of centroids, sharing the chunk store's client
+    """
+    if group_by not in ("source", "page"):
+        raise ValueError(f"group_by must be 'source' or 'page', got {group_by!r}")
+
+    sums: dict[str, np.ndarray] = {}
+    counts: dict[str, int] = {}
+    metadatas: dict[str, dict] = {}
+    for _, _, metadata, embedding in iter_entries(vectorstore, include=["metadatas", "embeddings"]):
+        metadata = metadata or {}
+        key = _group_key(metadata, group_by)
+        vector = np.asarray(embedding, dtype=np.float64)
+        if key in sums:
+            sums[key] += vector
+            counts[key] += 1
+        else:
+            sums[key] = vector.copy()
+            counts[key] = 1
+            metadatas[key] = {"source": metadata.get("source", ""), "group_by": group_by}
+            if group_by == "page" and "page" in metadata:
+                metadatas[key]["page"] = metadata["page"]
+
+    name = centroid_collection_name(vectorstore._collection.name)
+    client = vectorstore._client
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    centroids = Chroma(
+        client=client,
+        collection_name=name,
+        embedding_function=vectorstore._embedding_function,
+        collection_metadata={
+            **(vectorstore._collection.metadata or {}),
+            "chunk_fingerprint": chunk_fingerprint(vectorstore),
+        },
+    )
+
+    keys = list(sums)
+    for start in range(0, len(keys), 1000):
+        batch = keys[start:start + 1000]
+        centroids._collection.upsert(
+            ids=batch,
+            embeddings=[_unit(sums[k]).tolist() for k in batch],
+            metadatas=[{**metadatas[k], "n_chunks": counts[k]} for k in batch],
+            documents=batch,
+        )
+    return centroids
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    """Scale a summed vector to unit length (the mean's direction)."""
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def load_centroid_index(vectorstore: Chroma, verify: bool = False) -> Chroma:
+    """
+    Open the centroid collection paired with a chunk store.
+
+    Logs a warning if the chunk store changed since the centroids were built.
+    By default only the chunk count is compared; verify=True also hashes
+    every chunk ID, which pages through the whole collection.
+
+    Raises:
+        ValueError: If the centroid collection is missing or empty
+    """
+    name = centroid_collection_name(vectorstore._collection.name)
+    if name not in {getattr(c, "name", c) for c in vectorstore._client.list_collections()}:
+        raise ValueError(f"No centroid index {name!r}; run `centroid_index.py build` first")
+    centroids = Chroma(
+        client=vectorstore._client,
+        collection_name=name,
+        embedding_function=vectorstore._embedding_function,
+    )
+    if centroids._collection.count() == 0:
+        raise ValueError(f"Centroid index {name!r} is empty; run `centroid_index.py build`")
+
+    built_from = (centroids._collection.metadata or {}).get("chunk_fingerprint")
+    if verify:
+        current = chunk_fingerprint(vectorstore)
+        stale = built_from != current
+    else:
+        current = str(vectorstore._collection.count())
+        stale = built_from is None or built_from.split(":")[0] != current
+    if stale:
+        logger.warning(
+            f"Centroid index {name!r} is stale: built from chunks {built_from}, "
+            f"now {current}; rebuild with `centroid_index.py build`"
+        )
+    return centroids
+
+
+def _chunk_filter(hits: list[Document]) -> dict | None:
+    """Chroma `where` filter selecting chunks of the given centroid hits."""
+    clauses = []
+    for hit in hits:
+        if hit.metadata.get("group_by") == "page" and "page" in hit.metadata:
+            clauses.append({"$and": [{"source": hit.metadata["source"]}, {"page": hit.metadata["page"]}]})
+        else:
+            clauses.append({"source": hit.metadata["source"]})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def retrieve_coarse_to_fine_by_vector(
+    vectorstore: Chroma,
+    centroids: Chroma,
+    embedding: list[float],
+    k: int = 3,
+    fan_out: int = DEFAULT_FAN_OUT,
+) -> list[tuple[Document, float]]:
+    """Coarse-to-fine search for an already embedded query."""
+    hits = centroids.similarity_search_by_vector(embedding, k=fan_out)
+    where = _chunk_filter(hits)
+    if where is None:
+        return []
+    return vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=where)
+
+
+def retrieve_coarse_to_fine(
+    vectorstore: Chroma,
+    centroids: Chroma,
+    query: str,
+    k: int = 3,
+    fan_out: int = DEFAULT_FAN_OUT,
+) -> list[tuple[Document, float]]:
+    """
+    Retrieve top-k chunks, searching only the `fan_out` nearest documents.
+
+    Args:
+        vectorstore: The chunk vector store
+        centroids: Centroid store from build_centroid_index()
+        query: The search query
+        k: Number of chunks to retrieve (default: 3)
+        fan_out: Number of documents searched at the fine level (default: 3)
+
+    Returns:
+        List of (Document, score) tuples, like retrieve_with_scores()
+    """
+    embedding = vectorstore._embedding_function.embed_query(query)
+    return retrieve_coarse_to_fine_by_vector(vectorstore, centroids, embedding, k=k, fan_out=fan_out)
+
+
+def _result_key(doc: Document) -> tuple:
+    return doc.metadata.get("source"), doc.metadata.get("chunk_id"), doc.page_content
+
+
+def measure_recall_loss(
+    vectorstore: Chroma,
+    centroids: Chroma,
+    queries: list[str],
+    k: int = 5,
+    fan_out: int = DEFAULT_FAN_OUT,
+) -> dict:
+    """
+    Compare coarse-to-fine results with flat search over the same queries.
+
+    Returns:
+        Dict with mean recall@k of coarse-to-fine relative to flat search,
+        the implied recall loss, and the number of queries
+    """
+    recalls = []
+    for query in queries:
+        embedding = vectorstore._embedding_function.embed_query(query)
+        flat = vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=k)
+        coarse = retrieve_coarse_to_fine_by_vector(vectorstore, centroids, embedding, k=k, fan_out=fan_out)
+        expected = {_result_key(doc) for doc, _ in flat}
+        if not expected:
+            continue
+        found = {_result_key(doc) for doc, _ in coarse}
+        recalls.append(len(expected & found) / len(expected))
+
+    recall = float(np.mean(recalls)) if recalls else 0.0
+    return {"recall": recall, "recall_loss": 1.0 - recall, "num_queries": len(recalls), "k": k, "fan_out": fan_out}
+
+
+def main(argv: list[str] | None = None):
+    """Build or evaluate the centroid index."""
+    parser = argparse.ArgumentParser(description="Document-level centroid index.")
+    parser.add_argument("--collection", default="papers")
+    parser.add_argument("--persist-directory", default=str(CHROMA_DB_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Build centroids from the chunk store")
+    build.add_argument("--group-by", choices=["source", "page"], default="source")
+    evaluate = commands.add_parser("eval", help="Report recall loss against flat search")
+    evaluate.add_argument("--k", type=int, default=5)
+    evaluate.add_argument("--fan-out", type=int, nargs="+", default=[1, 2, DEFAULT_FAN_OUT, 5])
+    args = parser.parse_args(argv)
+
+    vectorstore = load_vectorstore(args.collection, args.persist_directory)
+
+    if args.command == "build":
+        centroids = build_centroid_index(vectorstore, group_by=args.group_by)
+        logger.info(f"Built {centroids._collection.count()} centroids (group by {args.group_by})")
+        return
+
+    centroids = load_centroid_index(vectorstore, verify=True)
+    queries = [query for query, _ in TEST_QUERIES]
+    print(f"\n{'fan-out':>8} {'recall@' + str(args.k):>10} {'loss':>8}")
+    for fan_out in args.fan_out:
+        report = measure_recall_loss(vectorstore, centroids, queries, k=args.k, fan_out=fan_out)
+        print(f"{fan_out:>8} {report['recall']:>10.3f} {report['recall_loss']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
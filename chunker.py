@@ -8,6 +8,11 @@ Run tests: uv run pytest tests/test_chunker.py
 
 
 import re
+from collections.abc import Callable, Iterable, Iterator
+
+
+# Batch tokenizer: texts -> per-text list of (start, end) character offsets, one per token
+TokenEncoder = Callable[[list[str]], list[list[tuple[int, int]]]]
 
 
 def chunk_document(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
@@ -138,3 +143,174 @@ def chunk_by_paragraphs(text: str, max_chunk_size: int = 1000) -> list[str]:
     #raise NotImplementedError("Implement chunk_by_paragraphs")
 
 
+def chunk_document_tokens(
+    text: str, encode: TokenEncoder, max_tokens: int, overlap: int = 32
+) -> list[str]:
+    """
+    Split a document into sentence-aligned chunks of at most `max_tokens` tokens.
+
+    Token counts come from `encode`, the embedding model's tokenizer, called
+    once for all sentences of the text. Sentences are packed greedily until
+    the next one would overflow; each new chunk starts with as many whole
+    trailing sentences of the previous chunk as fit in `overlap` tokens.
+    A sentence longer than `max_tokens` is split into token windows that
+    overlap by `overlap` tokens.
+
+    Args:
+        text: The document text to chunk
+        encode: Batch tokenizer returning token character offsets (see TokenEncoder)
+        max_tokens: Token budget per chunk, excluding special tokens
+        overlap: Token budget for sentences repeated from the previous chunk
+
+    Returns:
+        List of text chunks
+    """
+    if not text or not text.strip():
+        return []
+
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+
+    # Break over-long sentences into token windows so every piece fits
+    pieces: list[tuple[str, int]] = []
+    for sentence, spans in zip(sentences, encode(sentences)):
+        if len(spans) <= max_tokens:
+            pieces.append((sentence, len(spans)))
+            continue
+        step = max(1, max_tokens - overlap)
+        for start in range(0, len(spans), step):
+            window = spans[start:start + max_tokens]
+            pieces.append((sentence[window[0][0]:window[-1][1]], len(window)))
+            if start + max_tokens >= len(spans):
+                break
+
+    chunks: list[str] = []
+    current: list[tuple[str, int]] = []
+    current_tokens = 0
+
+    for piece, n_tokens in pieces:
+        if current and current_tokens + n_tokens > max_tokens:
+            chunks.append(" ".join(p for p, _ in current))
+            carried: list[tuple[str, int]] = []
+            carried_tokens = 0
+            for p, m in reversed(current):
+                if carried_tokens + m > overlap or carried_tokens + m + n_tokens > max_tokens:
+                    break
+                carried.insert(0, (p, m))
+                carried_tokens += m
+            current, current_tokens = carried, carried_tokens
+        current.append((piece, n_tokens))
+        current_tokens += n_tokens
+
+    if current:
+        chunks.append(" ".join(p for p, _ in current))
+
+    return chunks
+
+
+def count_truncated(chunks: list[str], encode: TokenEncoder, max_tokens: int, batch_size: int = 1000) -> int:
+    """Number of chunks longer than `max_tokens` tokens (cut off when embedded)."""
+    truncated = 0
+    for start in range(0, len(chunks), batch_size):
+        truncated += sum(len(spans) > max_tokens for spans in encode(chunks[start:start + batch_size]))
+    return truncated
+
+
+def chunk_pages(
+    pages: Iterable[tuple[int, str]],
+    chunk_size: int = 500,
+    overlap: int = 50,
+    encode: TokenEncoder | None = None,
+) -> Iterator[tuple[str, int]]:
+    """
+    Chunk a stream of pages, tagging each chunk with its starting page.
+
+    Pages are consumed one at a time, so memory stays bounded by a page
+    rather than the whole document. The unfinished last chunk of each page
+    is carried into the next page, so chunks can still span page breaks
+    and the output matches chunk_document() on the joined text closely.
+
+    Args:
+        pages: Iterable of (page_number, page_text) pairs in reading order
+        chunk_size: Maximum characters per chunk (default: 500)
+        overlap: Number of characters to overlap between chunks (default: 50)
+        encode: If given, chunk with chunk_document_tokens() and measure
+            chunk_size and overlap in tokens instead of characters
+
+    Yields:
+        (chunk_text, page_number) tuples
+    """
+    carry = ""
+    carry_page = None
+
+    for page_number, page_text in pages:
+        if not page_text or not page_text.strip():
+            continue
+
+        text = f"{carry}\n\n{page_text}" if carry else page_text
+        if encode is None:
+            chunks = chunk_document(text, chunk_size=chunk_size, overlap=overlap)
+        else:
+            chunks = chunk_document_tokens(text, encode, max_tokens=chunk_size, overlap=overlap)
+        if not chunks:
+            continue
+
+        for i, chunk in enumerate(chunks[:-1]):
+            yield chunk, carry_page if (i == 0 and carry) else page_number
+
+        if len(chunks) > 1 or not carry:
+            carry_page = page_number
+        carry = chunks[-1]
+
+    if carry:
+        yield carry, carry_page
+
+
+def sentence_windows(text: str, window: int = 2, step: int | None = None) -> list[str]:
+    """
+    Split text into windows of `window` consecutive sentences.
+
+    Args:
+        text: Text to split
+        window: Sentences per window (default: 2)
+        step: Sentences between window starts (default: window, no overlap)
+
+    Returns:
+        List of windows; the last one always ends with the final sentence
+    """
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s] if text else []
+    if not sentences:
+        return []
+    step = step or window
+    last = max(len(sentences) - window, 0)
+    starts = list(range(0, last + 1, step))
+    if starts[-1] != last:
+        starts.append(last)
+    return [" ".join(sentences[start:start + window]) for start in starts]
+
+
+def chunk_parents_and_children(
+    pages: Iterable[tuple[int, str]],
+    max_parent_size: int = 1000,
+    window: int = 2,
+    step: int | None = None,
+) -> Iterator[tuple[str, int, list[str]]]:
+    """
+    Build a two-level hierarchy for small-to-big retrieval.
+
+    Each page is split into parent passages with chunk_by_paragraphs(), and
+    each parent into sentence-window children with sentence_windows().
+    Children are meant to be embedded and searched; parents are what the
+    LLM reads.
+
+    Args:
+        pages: Iterable of (page_number, page_text) pairs in reading order
+        max_parent_size: Maximum characters per parent (paragraphs are never split)
+        window: Sentences per child
+        step: Sentences between child starts (default: window)
+
+    Yields:
+        (parent_text, page_number, child_texts) tuples
+    """
+    for page_number, page_text in pages:
+        for parent in chunk_by_paragraphs(page_text or "", max_chunk_size=max_parent_size):
+            yield parent, page_number, sentence_windows(parent, window=window, step=step)
@@ -0,0 +1,162 @@
+"""Near-duplicate chunk elimination for indexing.
+
+Papers repeat boilerplate (license headers, reference entries, running
+titles) and preprints repeat whole sections. This module finds chunks
+whose word shingles overlap heavily, using MinHash signatures with LSH
+banding so candidates are found in linear time instead of comparing
+every pair, and keeps one representative per group as chunks stream
+into the store.
+
+Run tests: uv run pytest tests/test_dedup.py
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SHINGLE_SIZE = 3
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """Word n-grams of a normalized text.
+
+    Texts shorter than `size` words become a single shingle.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed family of hash permutations.
+
+    Args:
+        num_perm: Number of permutations (signature length)
+        seed: Seed for the permutation parameters
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2**32 and hash values < 2**32 keep a * h + b below 2**64
+        self.a = rng.integers(1, MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, shingle_set: set[str]) -> np.ndarray:
+        """MinHash signature of a set of shingles."""
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+             for s in shingle_set),
+            dtype=np.uint64,
+            count=len(shingle_set),
+        )
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimate Jaccard similarity as the fraction of agreeing signature slots."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class StreamingDeduper:
+    """Drop near-duplicate chunks as they arrive in batches, keeping the first.
+
+    Signatures are split into `bands` bands; a chunk is compared with the
+    kept chunks sharing any of its band buckets, and dropped if one has an
+    estimated Jaccard similarity of at least `threshold`, joining that
+    chunk's group. Groups are not chained through dropped chunks, so a
+    chunk similar only to a dropped one is kept. Only the MinHash
+    signatures, IDs and sources of kept chunks are held, not their text.
+
+    Args:
+        threshold: Minimum estimated Jaccard similarity to count as duplicate
+        num_perm: MinHash signature length (must be divisible by bands)
+        bands: Number of LSH bands
+        seed: Seed for the MinHash permutations
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.threshold = threshold
+        self.removed = 0
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm, seed)
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+        self._signatures: list[np.ndarray] = []
+        self._kept: list[tuple[str, str]] = []
+        self._groups: dict[int, list[str]] = {}
+
+    def keep(self, chunks: list[str], metadatas: list[dict], ids: list[str]) -> list[int]:
+        """
+        Check a batch against every chunk kept so far, and against itself.
+
+        Args:
+            chunks: Chunk texts in index order
+            metadatas: Metadata dicts (one per chunk), each with a 'source' key
+            ids: Chunk IDs, reported by merged() for groups with duplicates
+
+        Returns:
+            Indices into the batch of the chunks to keep
+        """
+        if not len(chunks) == len(metadatas) == len(ids):
+            raise ValueError(
+                f"chunks, metadatas and ids must be same length. "
+                f"Got {len(chunks)} chunks, {len(metadatas)} metadatas and {len(ids)} ids."
+            )
+        kept = []
+        for i, (chunk, metadata, chunk_id) in enumerate(zip(chunks, metadatas, ids)):
+            sig = self._hasher.signature(shingles(chunk))
+            keys = [sig[band * self._rows:(band + 1) * self._rows].tobytes() for band in range(len(self._buckets))]
+            source = str(metadata.get("source", ""))
+            match = self._find_match(sig, keys)
+            if match is not None:
+                self._groups.setdefault(match, [self._kept[match][1]]).append(source)
+                self.removed += 1
+                continue
+
+            index = len(self._kept)
+            self._kept.append((chunk_id, source))
+            self._signatures.append(sig)
+            for buckets, key in zip(self._buckets, keys):
+                buckets.setdefault(key, []).append(index)
+            kept.append(i)
+        return kept
+
+    def _find_match(self, sig: np.ndarray, keys: list[bytes]) -> int | None:
+        candidates = sorted({j for buckets, key in zip(self._buckets, keys) for j in buckets.get(key, ())})
+        for j in candidates:
+            if estimate_jaccard(sig, self._signatures[j]) >= self.threshold:
+                return j
+        return None
+
+    def merged(self) -> tuple[list[str], list[dict]]:
+        """
+        Metadata updates for kept chunks that stand for duplicates.
+
+        Each metadata holds the kept chunk's "source", plus "sources" (all
+        distinct source files in the group, "; "-separated) and "duplicates"
+        (how many chunks it stands for). Chroma metadata values must be
+        scalars, hence the joined string.
+
+        Returns:
+            (ids, metadatas) of the kept chunks with duplicates
+        """
+        ids, metadatas = [], []
+        for index, sources in self._groups.items():
+            chunk_id, source = self._kept[index]
+            ids.append(chunk_id)
+            metadatas.append({
+                "source": source,
+                "sources": "; ".join(dict.fromkeys(sources)),
+                "duplicates": len(sources),
+            })
+        return ids, metadatas
@@ -0,0 +1,196 @@
+"""Precomputed chunk digests for compact prompts.
+
+An optional offline stage after index.py. Each stored chunk gets a short
+digest in its metadata ("digest", plus "digest_method"), either
+
+- extractive: the chunk's most central sentences, by how often their
+  content words recur across the chunk, kept in original order; or
+- llm: a summary written once per chunk through generate_many(), with
+  its rate limiting, adaptive concurrency and resumable checkpoint.
+
+Digests travel with retrieved Documents, so generate_answer_with_citations
+(max_context_tokens=...) can send digests instead of full text for
+lower-ranked chunks when the context would exceed its budget.
+
+Re-running index.py keeps the digests of unchanged chunks: their IDs
+include a hash of the text, and Chroma's upsert merges the new metadata
+into the stored dict. Chunks whose text changed get new IDs and no
+digest, so run `build` again after re-indexing; it only digests chunks
+that lack one.
+
+Usage:
+    uv run python digests.py build [--method llm --checkpoint digests.jsonl]
+    uv run python query.py --context-tokens 600 "What is retrieval augmented generation?"
+"""
+
+import argparse
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from loguru import logger
+
+from generator import generate_many
+from vectorstore import CHROMA_DB_PATH, iter_entries, load_vectorstore, update_metadata
+
+
+DEFAULT_MAX_SENTENCES = 2
+DIGEST_METHODS = ("extractive", "llm")
+
+_WORD = re.compile(r"[a-z][a-z0-9-]+")
+STOPWORDS = frozenset(
+    "a an the and or but if of to in on at by for with from as into than then that this these those "
+    "it its is are was were be been being has have had do does did not no can could may might will would "
+    "we our they their which who what when where how such also more most other some using used use based".split()
+)
+
+
+def _sentences(text: str) -> list[str]:
+    return [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+
+
+def extractive_digest(text: str, max_sentences: int = DEFAULT_MAX_SENTENCES) -> str:
+    """
+    Pick the `max_sentences` most central sentences of a chunk.
+
+    A sentence scores the summed frequency (within the chunk) of its
+    distinct content words, divided by the square root of their count so
+    long sentences are not favoured just for length.
+    """
+    sentences = _sentences(text)
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+
+    words = [[w for w in _WORD.findall(s.lower()) if w not in STOPWORDS] for s in sentences]
+    frequency = Counter(w for sentence_words in words for w in set(sentence_words))
+    scores = [
+        sum(frequency[w] for w in set(sentence_words)) / math.sqrt(len(set(sentence_words))) if sentence_words else 0.0
+        for sentence_words in words
+    ]
+    top = sorted(sorted(range(len(sentences)), key=lambda i: -scores[i])[:max_sentences])
+    return " ".join(sentences[i] for i in top)
+
+
+def _build_digest_prompt(instruction: str, context_docs: list[Document]) -> str:
+    return f"""
+        {instruction}
+        Keep key claims, numbers, method and dataset names. Do not add anything not in the passage.
+
+        Passage:
+        {context_docs[0].page_content}
+
+        Summary:
+    """
+
+
+def _parse_digest_response(text: str, context_docs: list[Document]) -> dict:
+    return {"digest": text.strip()}
+
+
+def llm_digests(
+    texts: list[str],
+    llm=None,
+    max_sentences: int = DEFAULT_MAX_SENTENCES,
+    checkpoint_path: str | Path | None = None,
+    requests_per_second: float | None = None,
+) -> list[str | None]:
+    """
+    Summarize chunks with the LLM as one batch job (see generate_many).
+
+    Returns:
+        One digest per text, None where the LLM kept failing
+    """
+    instruction = f"Summarize the passage from a research paper in at most {max_sentences} sentences."
+    items = [(instruction, [Document(page_content=text)]) for text in texts]
+    results = generate_many(
+        items,
+        llm=llm,
+        checkpoint_path=checkpoint_path,
+        requests_per_second=requests_per_second,
+        build_prompt=_build_digest_prompt,
+        parse_response=_parse_digest_response,
+    )
+    return [result.get("digest") for result in results]
+
+
+def build_digests(
+    vectorstore: Chroma,
+    method: str = "extractive",
+    max_sentences: int = DEFAULT_MAX_SENTENCES,
+    llm=None,
+    checkpoint_path: str | Path | None = None,
+    requests_per_second: float | None = None,
+    force: bool = False,
+) -> int:
+    """
+    Compute and store a digest for every chunk that lacks one.
+
+    Args:
+        vectorstore: The chunk vector store
+        method: "extractive" or "llm"
+        max_sentences: Sentences per digest
+        llm: Language model for method="llm" (default: get_llm())
+        checkpoint_path: JSONL checkpoint for method="llm", so an
+            interrupted run resumes without re-summarizing
+        requests_per_second: Rate limit for method="llm"
+        force: Recompute digests that already exist
+
+    Returns:
+        Number of chunks given a digest
+    """
+    if method not in DIGEST_METHODS:
+        raise ValueError(f"method must be one of {DIGEST_METHODS}, got {method!r}")
+
+    ids, texts = [], []
+    for entry_id, document, metadata, _ in iter_entries(vectorstore, include=["documents", "metadatas"]):
+        if document and (force or not (metadata or {}).get("digest")):
+            ids.append(entry_id)
+            texts.append(document)
+    if not ids:
+        return 0
+
+    if method == "llm":
+        digests = llm_digests(texts, llm, max_sentences, checkpoint_path, requests_per_second)
+    else:
+        digests = [extractive_digest(text, max_sentences) for text in texts]
+
+    done = [(entry_id, digest) for entry_id, digest in zip(ids, digests) if digest]
+    update_metadata(
+        vectorstore,
+        [entry_id for entry_id, _ in done],
+        [{"digest": digest, "digest_method": method} for _, digest in done],
+    )
+    return len(done)
+
+
+def main(argv: list[str] | None = None):
+    """Build chunk digests for the vector store."""
+    parser = argparse.ArgumentParser(description="Precompute chunk digests.")
+    parser.add_argument("--collection", default="papers")
+    parser.add_argument("--persist-directory", default=str(CHROMA_DB_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Digest every chunk that has none")
+    build.add_argument("--method", choices=DIGEST_METHODS, default="extractive")
+    build.add_argument("--max-sentences", type=int, default=DEFAULT_MAX_SENTENCES)
+    build.add_argument("--checkpoint", type=Path, default=None, help="JSONL checkpoint for --method llm")
+    build.add_argument("--rps", type=float, default=None, help="LLM requests per second for --method llm")
+    build.add_argument("--force", action="store_true", help="Recompute existing digests")
+    args = parser.parse_args(argv)
+
+    vectorstore = load_vectorstore(args.collection, args.persist_directory)
+    count = build_digests(
+        vectorstore,
+        method=args.method,
+        max_sentences=args.max_sentences,
+        checkpoint_path=args.checkpoint,
+        requests_per_second=args.rps,
+        force=args.force,
+    )
+    logger.info(f"Stored {args.method} digests for {count} chunks")
+
+
+if __name__ == "__main__":
+    main()
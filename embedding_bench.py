@@ -0,0 +1,126 @@
+"""Parity and throughput comparison of embedding backends.
+
+Embeds the same texts with the PyTorch model and with the ONNX backends
+(`onnx`, and `onnx-int8` with dynamic int8 quantization), then reports
+each backend's throughput and its cosine similarity to the PyTorch
+vectors. A backend passes when every text's cosine is at least the
+threshold, so speed can be traded against fidelity per deployment.
+
+Usage: uv run python embedding_bench.py --backends onnx onnx-int8 --threshold 0.99
+"""
+
+import argparse
+import time
+
+import numpy as np
+from loguru import logger
+
+from vectorstore import EMBEDDING_BACKENDS, get_embeddings, iter_entries, load_vectorstore
+
+
+DEFAULT_THRESHOLD = 0.99
+SAMPLE_TEXTS = [
+    "Retrieval-augmented generation combines a parametric language model with a non-parametric memory.",
+    "Chain-of-thought prompting elicits intermediate reasoning steps from large language models.",
+    "Dense passage retrieval encodes questions and passages with a dual encoder.",
+    "Continuous renal replacement therapy is used in intensive care units for acute kidney injury.",
+    "HNSW builds a hierarchical proximity graph for approximate nearest neighbour search.",
+]
+
+
+def row_cosines(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarity between matching rows of two matrices."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def embed_timed(backend: str, texts: list[str]) -> tuple[np.ndarray, float]:
+    """Embed texts with one backend, returning (vectors, texts per second).
+
+    A warm-up call runs first so model loading is not counted.
+    """
+    embeddings = get_embeddings(backend)
+    embeddings.embed_documents(texts[:8])
+    started = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - started
+    return vectors, len(texts) / elapsed if elapsed > 0 else float("inf")
+
+
+def compare_backends(
+    texts: list[str], backends: list[str], threshold: float = DEFAULT_THRESHOLD
+) -> list[dict]:
+    """
+    Compare backends against the PyTorch reference on the same texts.
+
+    Args:
+        texts: Texts to embed
+        backends: Backends to compare (see EMBEDDING_BACKENDS)
+        threshold: Minimum per-text cosine similarity to the reference
+
+    Returns:
+        One row per backend (reference first) with "backend",
+        "texts_per_s", "speedup", "min_cosine", "mean_cosine", "passed"
+    """
+    reference, reference_rate = embed_timed("torch", texts)
+    rows = [{
+        "backend": "torch",
+        "texts_per_s": reference_rate,
+        "speedup": 1.0,
+        "min_cosine": 1.0,
+        "mean_cosine": 1.0,
+        "passed": True,
+    }]
+    for backend in backends:
+        if backend == "torch":
+            continue
+        vectors, rate = embed_timed(backend, texts)
+        cosines = row_cosines(vectors, reference)
+        rows.append({
+            "backend": backend,
+            "texts_per_s": rate,
+            "speedup": rate / reference_rate,
+            "min_cosine": float(cosines.min()),
+            "mean_cosine": float(cosines.mean()),
+            "passed": bool(cosines.min() >= threshold),
+        })
+    return rows
+
+
+def main(argv: list[str] | None = None):
+    """Compare embedding backends on chunks from the vector store."""
+    parser = argparse.ArgumentParser(description="Embedding backend parity and throughput.")
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=["onnx", "onnx-int8"])
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--sample", type=int, default=512, help="Number of stored chunks to embed")
+    args = parser.parse_args(argv)
+
+    texts = []
+    try:
+        vectorstore = load_vectorstore()
+        for _, document, _, _ in iter_entries(vectorstore, include=["documents"]):
+            if document:
+                texts.append(document)
+            if len(texts) >= args.sample:
+                break
+    except Exception as e:
+        logger.warning(f"Could not read chunks from the vector store: {e}")
+    if not texts:
+        logger.info("Using built-in sample texts")
+        texts = SAMPLE_TEXTS
+
+    logger.info(f"Embedding {len(texts)} texts with torch, {', '.join(args.backends)}...")
+    rows = compare_backends(texts, args.backends, args.threshold)
+
+    print(f"\n{'backend':<10} {'texts/s':>9} {'speedup':>8} {'min cos':>8} {'mean cos':>9}  parity")
+    for row in rows:
+        status = "ok" if row["passed"] else f"FAIL (< {args.threshold})"
+        print(
+            f"{row['backend']:<10} {row['texts_per_s']:>9.1f} {row['speedup']:>7.2f}x "
+            f"{row['min_cosine']:>8.4f} {row['mean_cosine']:>9.4f}  {status}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Multi-process CPU embedding for index builds.
+
+HuggingFaceEmbeddings encodes every chunk in one process. On many-core
+CPU-only machines most cores sit idle, because PyTorch's intra-op
+threading scales poorly for a model as small as MiniLM. PooledEmbeddings
+spreads chunk batches across worker processes that each hold their own
+model copy and a fixed number of torch threads. Batches come back in
+input order.
+
+Workers encode with the same preprocessing and encode settings as
+get_embeddings(), and with the same batches: SentenceTransformer.encode
+sorts texts by length and pads each batch of ENCODE_BATCH_SIZE to its
+longest text, so the texts are sorted and cut here exactly as
+single-process encode would, and each worker encodes whole batches. Every
+text is then padded and encoded alongside the same neighbours, and the
+vectors equal single-process embedding (compared with == in tests).
+
+Usage: uv run python index.py --embed-workers 8 --embed-threads 2 --embed-batch-size 256
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import EMBEDDING_BACKEND, EMBEDDING_MODEL, backend_model_kwargs
+
+
+DEFAULT_BATCH_SIZE = 256
+# SentenceTransformer.encode's default batch size, used by get_embeddings()
+ENCODE_BATCH_SIZE = 32
+
+_worker_model = None
+_worker_encode_kwargs: dict = {}
+
+
+def _init_worker(model_name: str, model_kwargs: dict, encode_kwargs: dict, threads: int) -> None:
+    """Load one model copy per worker process and pin its thread count."""
+    global _worker_model, _worker_encode_kwargs
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, **model_kwargs)
+    _worker_encode_kwargs = encode_kwargs
+
+
+def _encode_batches(batches: list[list[str]]) -> list[list[float]]:
+    """Encode each batch on its own, so padding matches single-process encode."""
+    vectors: list[list[float]] = []
+    for batch in batches:
+        vectors.extend(
+            _worker_model.encode(batch, batch_size=len(batch), show_progress_bar=False, **_worker_encode_kwargs)
+            .tolist()
+        )
+    return vectors
+
+
+class PooledEmbeddings(Embeddings):
+    """Embeddings that encode documents on a pool of worker processes.
+
+    Queries are embedded in-process with a HuggingFaceEmbeddings copy of
+    the workers' model and settings, created on first use, since one short
+    text is not worth a round trip.
+
+    Args:
+        workers: Number of worker processes (default: CPU count // threads)
+        batch_size: Texts sent to a worker per task, rounded up to whole encode batches
+        threads: Torch threads per worker
+        model_name: Sentence-transformers model (default: EMBEDDING_MODEL)
+        backend: Inference backend, as for get_embeddings() (default: EMBEDDING_BACKEND)
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        threads: int = 1,
+        model_name: str = EMBEDDING_MODEL,
+        backend: str | None = None,
+    ):
+        self.model_name = model_name
+        self.model_kwargs = backend_model_kwargs(backend or EMBEDDING_BACKEND)
+        self.encode_kwargs: dict = {}
+        self.threads = threads
+        self.batch_size = batch_size
+        self.workers = workers or max(1, (os.cpu_count() or 1) // threads)
+        self._local: HuggingFaceEmbeddings | None = None
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawn, not fork: forking after torch has started threads can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.model_kwargs, self.encode_kwargs, self.threads),
+            )
+        return self._pool
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts across the worker pool, preserving input order."""
+        if not texts:
+            return []
+        texts = [text.replace("\n", " ") for text in texts]
+        # The same length sort and batch cuts as SentenceTransformer.encode
+        order = np.argsort([-len(text) for text in texts])
+        ordered = [texts[i] for i in order]
+        batches = [ordered[i:i + ENCODE_BATCH_SIZE] for i in range(0, len(ordered), ENCODE_BATCH_SIZE)]
+        per_task = max(1, -(-self.batch_size // ENCODE_BATCH_SIZE))
+        tasks = [batches[i:i + per_task] for i in range(0, len(batches), per_task)]
+
+        vectors: list[list[float] | None] = [None] * len(texts)
+        position = 0
+        for task_vectors in self._get_pool().map(_encode_batches, tasks):
+            for vector in task_vectors:
+                vectors[order[position]] = vector
+                position += 1
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        if self._local is None:
+            self._local = HuggingFaceEmbeddings(
+                model_name=self.model_name, model_kwargs=self.model_kwargs, encode_kwargs=self.encode_kwargs
+            )
+        return self._local.embed_query(text)
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
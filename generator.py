@@ -6,23 +6,46 @@ with support for source citations.
 Run tests: uv run pytest tests/test_generator.py
 """
 
+import hashlib
+import json
 import re
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
 
 from dotenv import load_dotenv
 from langchain_core.documents import Document
 from langchain_openai import ChatOpenAI
+from loguru import logger
 import os
 
+from http_pool import get_async_http_client, get_http_client, get_pool_config
+from tokens import estimate_tokens
+
 load_dotenv()
 
 
-def get_llm(model: str = "gpt-oss-20b", temperature: float = 0.1) -> ChatOpenAI:
-    """Get a configured LLM instance. (Provided)"""
+def get_llm(
+    model: str = "gpt-oss-20b", temperature: float = 0.1, base_url: str | None = None, max_retries: int = 2
+) -> ChatOpenAI:
+    """Get a configured LLM instance. (Provided)
+
+    `base_url` overrides NAVIGATOR_API_BASE, e.g. to point at llm_stub.py.
+    `max_retries` is how often the client silently retries a failed call.
+    All instances share the process-wide pooled HTTP clients from http_pool,
+    so repeated calls reuse open connections instead of reconnecting. The
+    pool's timeouts, including the connect timeout, apply to every request.
+    """
     return ChatOpenAI(
         model=model,
         temperature=temperature,
         api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=os.getenv("NAVIGATOR_API_BASE"),
+        base_url=base_url or os.getenv("NAVIGATOR_API_BASE"),
+        timeout=get_pool_config().httpx_timeout(),
+        max_retries=max_retries,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
     )
 
 
@@ -84,8 +107,36 @@ def generate_answer(query: str, context_docs: list[Document], llm=None) -> str:
     # raise NotImplementedError("Implement generate_answer")
 
 
+def select_context(context_docs: list[Document], max_tokens: int) -> list[Document]:
+    """
+    Fit context into a token budget by swapping in precomputed digests.
+
+    Starting from the lowest-ranked document, full text is replaced by the
+    chunk's "digest" metadata (see digests.py) until the estimated total
+    fits. Documents are never dropped or reordered, so [n] still refers to
+    the n-th retrieved chunk. Chunks without a digest are sent as is, and
+    a warning is logged if the context still exceeds the budget.
+    """
+    texts = [doc.page_content for doc in context_docs]
+    total = sum(estimate_tokens(text) for text in texts)
+    for i in reversed(range(len(context_docs))):
+        if total <= max_tokens:
+            break
+        digest = context_docs[i].metadata.get("digest")
+        if digest and len(digest) < len(texts[i]):
+            total += estimate_tokens(digest) - estimate_tokens(texts[i])
+            texts[i] = digest
+    missing = sum(1 for doc in context_docs if not doc.metadata.get("digest"))
+    if total > max_tokens and missing:
+        logger.warning(
+            f"Context is ~{total} tokens, over the {max_tokens} budget; {missing} of {len(context_docs)} "
+            "chunks have no digest (run `digests.py build` after re-indexing)"
+        )
+    return [Document(page_content=text, metadata=doc.metadata) for text, doc in zip(texts, context_docs)]
+
+
 def generate_answer_with_citations(
-    query: str, context_docs: list[Document], llm=None
+    query: str, context_docs: list[Document], llm=None, max_context_tokens: int | None = None
 ) -> dict:
     """
     Generate an answer with explicit citations to source documents.
@@ -94,6 +145,8 @@ def generate_answer_with_citations(
         query: The user's question
         context_docs: Retrieved documents to use as context
         llm: The language model (if None, creates default)
+        max_context_tokens: Token budget for the sources; over budget, chunk
+            digests replace full text (see select_context). None sends full text.
 
     Returns:
         Dictionary with:
@@ -111,7 +164,13 @@ def generate_answer_with_citations(
     if llm is None:
         llm = get_llm()
 
-    # Build numbered sources for the prompt
+    prompt_docs = context_docs if max_context_tokens is None else select_context(context_docs, max_context_tokens)
+    response = llm.invoke(_build_citation_prompt(query, prompt_docs))
+    return _parse_citation_response(response.content, context_docs)
+
+
+def _build_citation_prompt(query: str, context_docs: list[Document]) -> str:
+    """Build the numbered-sources prompt used by generate_answer_with_citations."""
     numbered_sources = []
     for idx, doc in enumerate(context_docs, start=1):
         source = doc.metadata.get("source", "unknown")
@@ -119,7 +178,7 @@ def generate_answer_with_citations(
 
     sources_text = "\n\n".join(numbered_sources) if numbered_sources else "No sources retrieved."
 
-    prompt = f"""
+    return f"""
         You are a research assistant answering questions about academic papers.
 
         Use ONLY the sources below to answer the question.
@@ -135,8 +194,9 @@ def generate_answer_with_citations(
         Answer (with citations):
     """
 
-    response = llm.invoke(prompt)
-    answer_text = response.content
+
+def _parse_citation_response(answer_text: str, context_docs: list[Document]) -> dict:
+    """Map [n] markers in an answer back to the metadata of the cited documents."""
     cited_numbers = _extract_citations(answer_text, max_source=len(context_docs))
 
     citations = []
@@ -161,3 +221,180 @@ def _extract_citations(text: str, max_source: int) -> list[int]:
         if 1 <= num <= max_source and num not in citations:
             citations.append(num)
     return citations
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum burst size (default: one second's worth, at least 1)
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` tokens are available, then consume them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Whether an LLM error is an HTTP 429 (openai.RateLimitError or similar)."""
+    return getattr(error, "status_code", None) == 429
+
+
+def _item_key(query: str, context_docs: list[Document]) -> str:
+    """Stable key identifying a (question, context) pair in a checkpoint file."""
+    digest = hashlib.sha256(query.encode())
+    for doc in context_docs:
+        digest.update(b"\0")
+        digest.update(doc.page_content.encode())
+    return digest.hexdigest()
+
+
+def _load_checkpoint(path: Path) -> dict[str, dict]:
+    """Read completed answers from a JSONL checkpoint, keyed by item key."""
+    done = {}
+    if not path.exists():
+        return done
+    with path.open() as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                continue
+            if not isinstance(record, dict) or "key" not in record:
+                logger.warning(f"Skipping malformed checkpoint record in {path}: {line[:80]}")
+                continue
+            done[record["key"]] = {k: v for k, v in record.items() if k not in ("key", "query")}
+    return done
+
+
+def generate_many(
+    items: list[tuple[str, list[Document]]],
+    llm=None,
+    checkpoint_path: str | Path | None = None,
+    requests_per_second: float | None = None,
+    max_concurrency: int = 8,
+    min_concurrency: int = 1,
+    max_retries: int = 5,
+    max_rate_limited: int = 20,
+    build_prompt: Callable[[str, list[Document]], str] = _build_citation_prompt,
+    parse_response: Callable[[str, list[Document]], dict] = _parse_citation_response,
+) -> list[dict]:
+    """
+    Generate cited answers for many (question, context) pairs.
+
+    Prompts are sent in waves through `llm.batch()`. A token bucket caps the
+    request rate, and the wave size adapts: it grows by one after a clean
+    wave and halves when the endpoint answers 429. Each finished answer is
+    appended to `checkpoint_path` (JSONL), and items already in the file are
+    skipped, so a crashed run resumes where it stopped.
+
+    Args:
+        items: List of (query, context_docs) pairs
+        llm: The language model (if None, creates default with get_llm())
+        checkpoint_path: JSONL file for completed answers (optional)
+        requests_per_second: Rate limit for LLM calls (None = unlimited)
+        max_concurrency: Upper bound on requests in flight
+        min_concurrency: Lower bound when backing off
+        max_retries: Attempts per item for non-429 errors before giving up
+        max_rate_limited: 429 answers per item before giving up, so an
+            endpoint that never stops throttling cannot stall the job
+        build_prompt: Prompt for one (query, context_docs) item; other batch
+            jobs (e.g. digests.py summaries) pass their own
+        parse_response: Result dict from (response text, context_docs)
+
+    Returns:
+        One dict per item, in input order, shaped like
+        generate_answer_with_citations() output (or parse_response's).
+        Items that kept failing get "answer": None and an "error" message.
+    """
+    if llm is None:
+        llm = get_llm()
+
+    checkpoint = Path(checkpoint_path) if checkpoint_path is not None else None
+    done = _load_checkpoint(checkpoint) if checkpoint is not None else {}
+    keys = [_item_key(query, docs) for query, docs in items]
+
+    results: list[dict | None] = [done.get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    attempts = {i: 0 for i in pending}
+    rate_limited = {i: 0 for i in pending}
+    if len(pending) < len(items):
+        logger.info(f"Resuming: {len(items) - len(pending)} of {len(items)} answers already in checkpoint")
+
+    limiter = TokenBucket(requests_per_second) if requests_per_second else None
+    concurrency = max(min_concurrency, min(max_concurrency, len(pending) or 1))
+    backoff = 1.0
+
+    out = checkpoint.open("a") if checkpoint is not None else None
+    try:
+        while pending:
+            wave, pending = pending[:concurrency], pending[concurrency:]
+            if limiter is not None:
+                for _ in wave:
+                    limiter.acquire()
+
+            prompts = [build_prompt(*items[i]) for i in wave]
+            responses = llm.batch(prompts, config={"max_concurrency": concurrency}, return_exceptions=True)
+
+            throttled, gave_up = [], 0
+            for i, response in zip(wave, responses):
+                if isinstance(response, Exception):
+                    if _is_rate_limited(response):
+                        rate_limited[i] += 1
+                        if rate_limited[i] < max_rate_limited:
+                            throttled.append(i)
+                        else:
+                            logger.error(f"Giving up on item {i} after {rate_limited[i]} rate-limited attempts")
+                            gave_up += 1
+                            results[i] = {"answer": None, "citations": [], "error": str(response)}
+                        continue
+                    attempts[i] += 1
+                    if attempts[i] < max_retries:
+                        pending.append(i)
+                    else:
+                        logger.error(f"Giving up on item {i} after {attempts[i]} attempts: {response}")
+                        results[i] = {"answer": None, "citations": [], "error": str(response)}
+                    continue
+
+                results[i] = parse_response(response.content, items[i][1])
+                if out is not None:
+                    out.write(json.dumps({"key": keys[i], "query": items[i][0], **results[i]}) + "\n")
+                    out.flush()
+
+            if throttled or gave_up:
+                concurrency = max(min_concurrency, concurrency // 2)
+                logger.warning(f"Rate limited on {len(throttled) + gave_up} requests; concurrency -> {concurrency}")
+                pending = throttled + pending
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+            else:
+                concurrency = min(max_concurrency, concurrency + 1)
+                backoff = 1.0
+    finally:
+        if out is not None:
+            out.close()
+
+    return results
@@ -0,0 +1,220 @@
+"""Process-wide pooled HTTP clients for the LLM path.
+
+`get_llm()` used to build a fresh ChatOpenAI, and with it a fresh HTTP
+client, on every call, so every question paid TCP/TLS setup again. This
+module keeps one `httpx.Client` per process, shared across threads, and
+one `httpx.AsyncClient` per event loop, since async connections belong
+to the loop that opened them. It also counts how many requests reused a
+pooled connection.
+
+Pool settings come from the environment (see .env.example) and can be
+changed at runtime with configure_http_pool().
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool and timeout settings.
+
+    Attributes:
+        max_connections: Maximum concurrent connections per client
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept open
+        timeout: Per-request read/write/pool timeout in seconds
+        connect_timeout: Connection setup timeout in seconds
+    """
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Read LLM_MAX_CONNECTIONS etc. from the environment."""
+        defaults = cls()
+        return cls(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", defaults.max_connections)),
+            max_keepalive_connections=int(
+                os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", defaults.max_keepalive_connections)
+            ),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", defaults.keepalive_expiry)),
+            timeout=float(os.getenv("LLM_TIMEOUT", defaults.timeout)),
+            connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", defaults.connect_timeout)),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def httpx_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+class PoolStats:
+    """Thread-safe counters of requests and newly opened connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> dict:
+        """Return counts, including requests served on a reused connection."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": max(self.requests - self.new_connections, 0),
+            }
+
+
+_lock = threading.Lock()
+_config = PoolConfig.from_env()
+_stats = PoolStats()
+_client: httpx.Client | None = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_loop_async_client: "LoopAsyncClient | None" = None
+
+
+def _trace(event_name: str, info: dict) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        _stats.record_connect()
+
+
+async def _atrace(event_name: str, info: dict) -> None:
+    _trace(event_name, info)
+
+
+def _on_request(request: httpx.Request) -> None:
+    _stats.record_request()
+    request.extensions["trace"] = _trace
+
+
+async def _aon_request(request: httpx.Request) -> None:
+    _stats.record_request()
+    request.extensions["trace"] = _atrace
+
+
+def get_http_client() -> httpx.Client:
+    """Return the shared synchronous HTTP client, creating it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(
+                limits=_config.limits(),
+                timeout=_config.httpx_timeout(),
+                event_hooks={"request": [_on_request]},
+            )
+        return _client
+
+
+def _running_loop_client() -> httpx.AsyncClient:
+    """Return the async client of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=_config.limits(),
+                timeout=_config.httpx_timeout(),
+                event_hooks={"request": [_aon_request]},
+            )
+            _async_clients[loop] = client
+        return client
+
+
+class LoopAsyncClient(httpx.AsyncClient):
+    """An AsyncClient that sends each request on the running loop's pooled client.
+
+    ChatOpenAI binds its async client when get_llm() is called, often
+    outside any loop; forwarding at send time keeps every loop on its own
+    connections. Clients are dropped with their loop.
+    """
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await _running_loop_client().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close the running loop's pooled client."""
+        loop = asyncio.get_running_loop()
+        with _lock:
+            client = _async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP client, pooled per event loop (see LoopAsyncClient)."""
+    global _loop_async_client
+    with _lock:
+        if _loop_async_client is None:
+            _loop_async_client = LoopAsyncClient()
+        return _loop_async_client
+
+
+def _close_async_client(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+    """Close a client on the loop that owns its connections."""
+    if loop.is_closed():
+        # Its connections went with the loop
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if loop is running:
+        loop.create_task(client.aclose())
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        loop.run_until_complete(client.aclose())
+
+
+def get_pool_config() -> PoolConfig:
+    """Return the active pool settings."""
+    return _config
+
+
+def configure_http_pool(config: PoolConfig) -> None:
+    """Replace the pool settings; old clients are closed and rebuilt on next use."""
+    global _config, _client
+    with _lock:
+        _config = config
+        if _client is not None:
+            _client.close()
+        _client = None
+        async_clients = list(_async_clients.items())
+        _async_clients.clear()
+    for loop, client in async_clients:
+        _close_async_client(loop, client)
+
+
+def http_pool_stats() -> dict:
+    """Return request and connection counts for the shared clients."""
+    return _stats.snapshot()
+
+
+def reset_http_pool_stats() -> None:
+    """Zero the request and connection counters."""
+    global _stats
+    _stats = PoolStats()
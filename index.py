@@ -1,81 +1,433 @@
 """Index papers into the vector store.
 
-Usage: uv run python index.py
+Usage: uv run python index.py [--profile] [--profile-memory]
 """
 
+import argparse
+from collections.abc import Callable, Iterator
+from functools import partial
 from pathlib import Path
 
 from langchain_community.document_loaders import PyPDFLoader
 from loguru import logger
 
-from chunker import chunk_document
-from vectorstore import create_vectorstore
+from chunker import chunk_pages, chunk_parents_and_children, count_truncated
+from dedup import StreamingDeduper
+from embedding_pool import DEFAULT_BATCH_SIZE, PooledEmbeddings
+from pdf_cache import CACHE_DIR, PDFTextCache
+from profiling import add_profiling_args, profiled, stage
+from sharding import SHARDS_DIR, ShardWriter
+from small_to_big import create_small_to_big
+from vectorstore import (
+    HNSWParams,
+    add_chunks,
+    delete_stale,
+    get_token_encoder,
+    make_chunk_ids,
+    open_vectorstore,
+    update_metadata,
+)
 
 
 PAPERS_DIR = Path("papers")
+DEDUP_THRESHOLD = 0.8
+TOKEN_OVERLAP = 32
+PARENT_SIZE = 1000
+CHILD_SENTENCES = 2
+# Chunks embedded and written per batch; must stay under Chroma's max batch size
+INDEX_BATCH_SIZE = 1000
 
 
-def load_papers(papers_dir: Path = PAPERS_DIR) -> list[tuple[str, str]]:
-    """Load all PDFs from the papers directory.
+def iter_pages(pdf_path: Path) -> Iterator[tuple[int, str]]:
+    """Lazily yield the pages of one PDF.
+
+    Only one page's text is held at a time.
+
+    Yields:
+        (page_number, text) tuples, with 1-based page numbers
+    """
+    loader = PyPDFLoader(str(pdf_path))
+    for i, page in enumerate(loader.lazy_load()):
+        yield i + 1, page.page_content
+
+
+def load_papers(
+    papers_dir: Path = PAPERS_DIR, cache: PDFTextCache | None = None
+) -> list[tuple[str, Iterator[tuple[int, str]]]]:
+    """Find all PDFs in the papers directory.
+
+    Pages are not read until each paper's iterator is consumed, so
+    extraction errors surface while iterating.
+
+    Args:
+        papers_dir: Directory containing the PDFs
+        cache: Extracted-text cache to read from and fill (None = always parse)
 
     Returns:
-        List of (filename, text) tuples
+        List of (filename, page iterator) tuples
     """
-    papers = []
-    pdf_files = list(papers_dir.glob("*.pdf"))
+    pdf_files = sorted(papers_dir.glob("*.pdf"))
 
     if not pdf_files:
         logger.warning(f"No PDF files found in {papers_dir}")
-        return papers
 
-    for pdf_path in pdf_files:
-        logger.info(f"Loading {pdf_path.name}")
-        try:
-            loader = PyPDFLoader(str(pdf_path))
-            pages = loader.load()
-            text = "\n\n".join(page.page_content for page in pages)
-            papers.append((pdf_path.name, text))
-        except Exception as e:
-            logger.error(f"Failed to load {pdf_path.name}: {e}")
+    if cache is None:
+        return [(pdf_path.name, iter_pages(pdf_path)) for pdf_path in pdf_files]
+    return [(pdf_path.name, cache.pages(pdf_path, iter_pages)) for pdf_path in pdf_files]
 
-    return papers
 
-
-def main():
+def main(argv: list[str] | None = None):
     """Index all papers into the vector store."""
+    parser = argparse.ArgumentParser(description="Index papers into the vector store.")
+    parser.add_argument("--no-text-cache", action="store_true",
+                        help="Always re-extract PDF text instead of using the text cache")
+    parser.add_argument("--text-cache-dir", type=Path, default=CACHE_DIR,
+                        help=f"Extracted-text cache directory (default: {CACHE_DIR})")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Keep near-duplicate chunks instead of merging them")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help=f"Jaccard similarity for near-duplicates (default: {DEDUP_THRESHOLD})")
+    parser.add_argument("--chunking", choices=["chars", "tokens"], default="chars",
+                        help="Chunk by characters (500, overlap 50) or fill the embedding model's token limit")
+    parser.add_argument("--token-overlap", type=int, default=TOKEN_OVERLAP,
+                        help=f"Overlap in tokens for --chunking tokens (default: {TOKEN_OVERLAP})")
+    parser.add_argument("--truncation-report", action="store_true",
+                        help="With --chunking tokens, also log how many character chunks would be truncated")
+    small_to_big_group = parser.add_argument_group("small-to-big (embed sentence windows, return paragraphs)")
+    small_to_big_group.add_argument("--small-to-big", action="store_true",
+                                    help="Build a child/parent index instead of flat chunks (no dedup)")
+    small_to_big_group.add_argument("--parent-size", type=int, default=PARENT_SIZE,
+                                    help=f"Max characters per paragraph parent (default: {PARENT_SIZE})")
+    small_to_big_group.add_argument("--child-sentences", type=int, default=CHILD_SENTENCES,
+                                    help=f"Sentences per embedded child (default: {CHILD_SENTENCES})")
+    parser.add_argument("--batch-size", type=int, default=INDEX_BATCH_SIZE,
+                        help=f"Chunks embedded and written per batch (default: {INDEX_BATCH_SIZE})")
+    parser.add_argument("--shards", type=int, default=0,
+                        help=f"Partition chunks across N shards in {SHARDS_DIR}, built in parallel (default: 0, unsharded)")
+    embed_group = parser.add_argument_group("embedding")
+    embed_group.add_argument("--embed-workers", type=int, default=0,
+                             help="Embed in N worker processes (default: 0, in-process)")
+    embed_group.add_argument("--embed-batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                             help=f"Chunks per worker task (default: {DEFAULT_BATCH_SIZE})")
+    embed_group.add_argument("--embed-threads", type=int, default=1,
+                             help="Torch threads per embedding worker (default: 1)")
+    hnsw_defaults = HNSWParams()
+    hnsw_group = parser.add_argument_group("HNSW index (new collections only; see tune_hnsw.py)")
+    hnsw_group.add_argument("--hnsw-space", choices=["l2", "cosine", "ip"], default=hnsw_defaults.space)
+    hnsw_group.add_argument("--hnsw-m", type=int, default=hnsw_defaults.M)
+    hnsw_group.add_argument("--hnsw-construction-ef", type=int, default=hnsw_defaults.construction_ef)
+    hnsw_group.add_argument("--hnsw-search-ef", type=int, default=hnsw_defaults.search_ef)
+    add_profiling_args(parser)
+    args = parser.parse_args(argv)
+    if args.small_to_big and (args.shards or args.chunking != "chars"):
+        parser.error("--small-to-big builds its own chunks; drop --shards and --chunking")
+
+    cache = None if args.no_text_cache else PDFTextCache(args.text_cache_dir)
+    dedup_threshold = None if args.no_dedup else args.dedup_threshold
+    hnsw = HNSWParams(
+        space=args.hnsw_space,
+        M=args.hnsw_m,
+        construction_ef=args.hnsw_construction_ef,
+        search_ef=args.hnsw_search_ef,
+    )
+    embeddings = None
+    if args.embed_workers:
+        embeddings = PooledEmbeddings(
+            workers=args.embed_workers, batch_size=args.embed_batch_size, threads=args.embed_threads
+        )
+    try:
+        with profiled("index", args):
+            if args.small_to_big:
+                run_index_small_to_big(
+                    cache,
+                    hnsw,
+                    embeddings=embeddings,
+                    parent_size=args.parent_size,
+                    child_sentences=args.child_sentences,
+                )
+            else:
+                run_index(
+                    cache,
+                    dedup_threshold,
+                    hnsw,
+                    shards=args.shards,
+                    embeddings=embeddings,
+                    chunking=args.chunking,
+                    token_overlap=args.token_overlap,
+                    truncation_report=args.truncation_report,
+                    batch_size=args.batch_size,
+                )
+    finally:
+        if embeddings is not None:
+            embeddings.close()
+
+
+class ChunkWriter:
+    """Write chunks to the store in fixed-size batches as they stream in.
+
+    Each batch is deduplicated against everything written before it
+    (dedup.StreamingDeduper). Every chunk is written with "sources" and
+    "duplicates" set for itself alone, because Chroma upserts merge
+    metadata and would otherwise keep the values of an earlier run;
+    close() then fills them in for the kept chunks of duplicate groups.
+    Once a finished source's last batch is
+    written, its chunks left over from earlier runs are deleted, as
+    create_vectorstore(replace_sources=True) does for one in-memory batch.
+
+    Args:
+        write: Stores a batch of (chunks, metadatas)
+        update_metadata: Merges metadata into stored chunks by ID
+        delete_stale: Deletes a source's chunks not among the given IDs (None: skip)
+        deduper: Drops near-duplicates (None: keep everything)
+        batch_size: Chunks per write
+    """
+
+    def __init__(
+        self,
+        write: Callable[[list[str], list[dict]], object],
+        update_metadata: Callable[[list[str], list[dict]], None],
+        delete_stale: Callable[[str, list[str]], int] | None = None,
+        deduper: StreamingDeduper | None = None,
+        batch_size: int = INDEX_BATCH_SIZE,
+    ):
+        self.write = write
+        self.update_metadata = update_metadata
+        self.delete_stale = delete_stale
+        self.deduper = deduper
+        self.batch_size = batch_size
+        self.written = 0
+        self._chunks: list[str] = []
+        self._metadatas: list[dict] = []
+        self._ids: dict[str, list[str]] = {}
+        self._finished: list[str] = []
+
+    def add(self, chunk: str, metadata: dict) -> None:
+        self._chunks.append(chunk)
+        self._metadatas.append(metadata)
+        if len(self._chunks) >= self.batch_size:
+            self.flush()
+
+    def finish_source(self, source: str) -> None:
+        """Mark a source complete; its stale chunks go after the next flush."""
+        self._finished.append(source)
+
+    def discard_source(self, source: str) -> int:
+        """Drop the unwritten chunks of a source that failed to load.
+
+        Returns:
+            Number of its chunks already written (these are kept)
+        """
+        kept = [(c, m) for c, m in zip(self._chunks, self._metadatas) if m["source"] != source]
+        self._chunks = [c for c, _ in kept]
+        self._metadatas = [m for _, m in kept]
+        return len(self._ids.pop(source, []))
+
+    def flush(self) -> None:
+        chunks, metadatas = self._chunks, self._metadatas
+        self._chunks, self._metadatas = [], []
+        ids = make_chunk_ids(chunks, metadatas)
+        if self.deduper is not None:
+            keep = self.deduper.keep(chunks, metadatas, ids)
+            chunks = [chunks[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            ids = [ids[i] for i in keep]
+        metadatas = [{**metadata, "sources": metadata["source"], "duplicates": 1} for metadata in metadatas]
+        if chunks:
+            self.write(chunks, metadatas)
+            self.written += len(chunks)
+        for chunk_id, metadata in zip(ids, metadatas):
+            self._ids.setdefault(metadata["source"], []).append(chunk_id)
+
+        for source in self._finished:
+            written = self._ids.pop(source, [])
+            if self.delete_stale is not None:
+                self.delete_stale(source, written)
+        self._finished = []
+
+    def close(self) -> None:
+        """Write the last batch and record merged duplicates on their kept chunks."""
+        self.flush()
+        if self.deduper is not None:
+            ids, metadatas = self.deduper.merged()
+            if ids:
+                self.update_metadata(ids, metadatas)
+
+
+def _catch_errors(items: Iterator, errors: list[Exception]) -> Iterator:
+    """Yield from `items`, ending early and recording the error if it raises."""
+    try:
+        yield from items
+    except Exception as e:
+        errors.append(e)
+
+
+def run_index(
+    cache: PDFTextCache | None = None,
+    dedup_threshold: float | None = DEDUP_THRESHOLD,
+    hnsw: HNSWParams | None = None,
+    shards: int = 0,
+    embeddings: PooledEmbeddings | None = None,
+    chunking: str = "chars",
+    token_overlap: int = TOKEN_OVERLAP,
+    truncation_report: bool = False,
+    batch_size: int = INDEX_BATCH_SIZE,
+):
+    """Load, chunk, dedupe, embed and persist all papers.
+
+    Chunks are written in batches of `batch_size` as they stream out of
+    the chunker (see ChunkWriter), so memory does not grow with the
+    corpus beyond the per-chunk dedup signatures.
+
+    With chunking="tokens", chunks are filled up to the embedding model's
+    token limit; truncation_report=True also logs how many character
+    chunks would have exceeded it (a second pass over the papers).
+    """
     logger.info("Starting indexing...")
 
+    encode = None
+    if chunking == "tokens":
+        encode, max_tokens = get_token_encoder()
+        logger.info(f"Token-aligned chunking: up to {max_tokens} tokens, {token_overlap} overlap")
+
     # Load papers
-    papers = load_papers()
+    papers = load_papers(cache=cache)
     if not papers:
         logger.error("No papers to index. Add PDFs to the papers/ directory.")
         return
 
-    logger.info(f"Loaded {len(papers)} papers")
-
-    # Chunk all papers
-    all_chunks = []
-    all_metadatas = []
+    # Merge near-duplicate chunks (boilerplate, repeated sections) as batches are written
+    deduper = StreamingDeduper(threshold=dedup_threshold) if dedup_threshold is not None else None
+    if shards:
+        if embeddings is not None:
+            logger.warning("--embed-workers is ignored with --shards; shards are already built in parallel")
+        logger.info(f"Writing {shards} vector store shards...")
+        shard_writer = ShardWriter(shards, hnsw=hnsw)
+        writer = ChunkWriter(shard_writer.add, shard_writer.update_metadata, deduper=deduper, batch_size=batch_size)
+    else:
+        logger.info("Writing vector store...")
+        vectorstore = open_vectorstore(hnsw=hnsw, embeddings=embeddings)
+        writer = ChunkWriter(
+            partial(add_chunks, vectorstore),
+            partial(update_metadata, vectorstore),
+            delete_stale=partial(delete_stale, vectorstore),
+            deduper=deduper,
+            batch_size=batch_size,
+        )
 
-    for filename, text in papers:
-        chunks = chunk_document(text, chunk_size=500, overlap=50)
-        logger.info(f"  {filename}: {len(chunks)} chunks")
+    # Stream pages of each paper through the chunker into the store
+    loaded = total = 0
+    for filename, pages in papers:
+        logger.info(f"Loading {filename}")
+        if encode is None:
+            chunks = chunk_pages(pages, chunk_size=500, overlap=50)
+        else:
+            chunks = chunk_pages(pages, chunk_size=max_tokens, overlap=token_overlap, encode=encode)
 
-        for i, chunk in enumerate(chunks):
-            all_chunks.append(chunk)
-            all_metadatas.append({
+        errors: list[Exception] = []
+        count = 0
+        for i, (chunk, page) in enumerate(_catch_errors(chunks, errors)):
+            writer.add(chunk, {
                 "source": filename,
                 "chunk_id": i,
+                "page": page,
             })
+            count += 1
+        if errors:
+            written = writer.discard_source(filename)
+            kept = f" ({written} chunks already written are kept)" if written else ""
+            logger.error(f"Failed to load {filename}: {errors[0]}{kept}")
+            continue
+
+        writer.finish_source(filename)
+        loaded += 1
+        total += count
+        logger.info(f"  {filename}: {count} chunks")
+    writer.close()
+    if shards:
+        shard_writer.close()
+
+    logger.info(f"Loaded {loaded} papers")
+    logger.info(f"Total chunks: {total}")
+    if deduper is not None:
+        logger.info(f"Removed {deduper.removed} near-duplicate chunks, {writer.written} remain")
+    stage("load+chunk+embed+persist")
+    if encode is not None and truncation_report:
+        report_truncation(cache, encode, max_tokens)
+        stage("truncation-report")
+
+    logger.info("Indexing complete!")
+    if shards:
+        logger.info(f"Sharded vector store saved to {SHARDS_DIR}")
+    else:
+        logger.info(f"Vector store saved to ./chroma_db")
+
+
+def report_truncation(cache: PDFTextCache | None, encode, max_tokens: int, batch_size: int = 1000) -> None:
+    """Log how many 500-character chunks would exceed `max_tokens`.
+
+    Re-streams the papers and tokenizes the character chunks in batches,
+    so only one batch is held at a time.
+    """
+    total = truncated = 0
+    batch = []
+    for filename, pages in load_papers(cache=cache):
+        try:
+            for chunk, _ in chunk_pages(pages, chunk_size=500, overlap=50):
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    total += len(batch)
+                    truncated += count_truncated(batch, encode, max_tokens, batch_size)
+                    batch = []
+        except Exception as e:
+            logger.error(f"Failed to load {filename}: {e}")
+    total += len(batch)
+    truncated += count_truncated(batch, encode, max_tokens, batch_size)
+    if total:
+        logger.info(
+            f"Character chunking would give {total} chunks, {truncated} "
+            f"({truncated / total:.1%}) over {max_tokens} tokens and truncated when embedded"
+        )
+
+
+def run_index_small_to_big(
+    cache: PDFTextCache | None = None,
+    hnsw: HNSWParams | None = None,
+    embeddings: PooledEmbeddings | None = None,
+    parent_size: int = PARENT_SIZE,
+    child_sentences: int = CHILD_SENTENCES,
+):
+    """Load papers and build a small-to-big index (see small_to_big.py)."""
+    logger.info("Starting small-to-big indexing...")
+
+    papers = load_papers(cache=cache)
+    if not papers:
+        logger.error("No papers to index. Add PDFs to the papers/ directory.")
+        return
+
+    hierarchy = []
+    loaded = 0
+    for filename, pages in papers:
+        logger.info(f"Loading {filename}")
+        try:
+            parents = list(chunk_parents_and_children(pages, max_parent_size=parent_size, window=child_sentences))
+        except Exception as e:
+            logger.error(f"Failed to load {filename}: {e}")
+            continue
+
+        loaded += 1
+        logger.info(f"  {filename}: {len(parents)} parents, {sum(len(c) for _, _, c in parents)} children")
+        for i, (parent, page, children) in enumerate(parents):
+            hierarchy.append((parent, {"source": filename, "chunk_id": i, "page": page}, children))
 
-    logger.info(f"Total chunks: {len(all_chunks)}")
+    logger.info(f"Loaded {loaded} papers")
+    stage("load+chunk")
 
-    # Create vector store
-    logger.info("Creating vector store...")
-    vectorstore = create_vectorstore(all_chunks, all_metadatas)
+    logger.info("Storing parents and embedding children...")
+    store = create_small_to_big(hierarchy, hnsw=hnsw, embeddings=embeddings)
+    stage("embed+persist")
 
     logger.info("Indexing complete!")
-    logger.info(f"Vector store saved to ./chroma_db")
+    logger.info(f"{store.parents.count()} parents, {store.children._collection.count()} children in ./chroma_db")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+"""Maintenance commands for the vector store.
+
+compact and delete-source also cover a small-to-big index (index.py
+--small-to-big) built under the same collection name: its children
+collection and its parent table. Pointed at a sharded store (index.py
+--shards, e.g. --persist-directory chroma_shards), every command runs on
+each shard listed in its manifest.
+
+Usage:
+    uv run python index_admin.py compact [--papers-dir papers] [--dry-run]
+    uv run python index_admin.py delete-source lewis2020rag.pdf
+    uv run python index_admin.py set-search-ef 64
+"""
+
+import argparse
+from pathlib import Path
+
+from langchain_community.vectorstores import Chroma
+from loguru import logger
+
+from sharding import is_sharded, read_manifest, shard_directory
+from small_to_big import SmallToBigStore, compact_parents, load_small_to_big, parent_store_path
+from vectorstore import CHROMA_DB_PATH, compact_vectorstore, delete_source, set_search_ef
+
+
+def _vectorstores(args: argparse.Namespace) -> list[tuple[str, Chroma]]:
+    """(name, store) for the collection, or for every shard of a sharded store.
+
+    Maintenance never embeds anything, so no embedding model is loaded.
+    """
+    if not is_sharded(args.persist_directory):
+        store = Chroma(collection_name=args.collection, persist_directory=str(args.persist_directory))
+        return [(args.collection, store)]
+    manifest = read_manifest(args.persist_directory)
+    stores = []
+    for i in manifest["shards"]:
+        directory = shard_directory(args.persist_directory, i)
+        if not directory.is_dir():
+            raise FileNotFoundError(f"Shard listed in the manifest is missing: {directory}")
+        store = Chroma(collection_name=manifest["collection_name"], persist_directory=str(directory))
+        stores.append((f"{directory.name}/{manifest['collection_name']}", store))
+    return stores
+
+
+def _small_to_big(args: argparse.Namespace) -> SmallToBigStore | None:
+    """The small-to-big index of the collection, if one was built."""
+    if not parent_store_path(args.persist_directory, args.collection).exists():
+        return None
+    return load_small_to_big(args.collection, args.persist_directory)
+
+
+def _print_report(report: dict, name: str) -> None:
+    verb = "Would remove" if report["dry_run"] else "Removed"
+    print(f"Scanned {report['scanned']} entries in {name}")
+    print(f"{verb} {report['orphans']} orphaned and {report['duplicates']} duplicate entries")
+    print(f"Reclaimed ~{report['bytes_reclaimed'] / 1024 / 1024:.2f} MiB of vectors, text and metadata")
+
+
+def cmd_compact(args: argparse.Namespace) -> None:
+    """Remove orphaned and duplicate vectors and report the space reclaimed."""
+    live_sources = None
+    if args.papers_dir is not None:
+        live_sources = {pdf.name for pdf in Path(args.papers_dir).glob("*.pdf")}
+
+    for name, vectorstore in _vectorstores(args):
+        report = compact_vectorstore(vectorstore, live_sources=live_sources, dry_run=args.dry_run)
+        _print_report(report, name)
+
+    store = _small_to_big(args)
+    if store is not None:
+        report = compact_vectorstore(store.children, live_sources=live_sources, dry_run=args.dry_run)
+        _print_report(report, store.children._collection.name)
+        parents = compact_parents(store, live_sources=live_sources, dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        print(f"{verb} {parents} orphaned parents")
+        store.parents.close()
+
+
+def cmd_delete_source(args: argparse.Namespace) -> None:
+    """Delete every chunk of the given source files."""
+    stores = _vectorstores(args)
+    for source in args.sources:
+        deleted = sum(delete_source(vectorstore, source) for _, vectorstore in stores)
+        logger.info(f"Deleted {deleted} chunks from {source}")
+
+    store = _small_to_big(args)
+    if store is not None:
+        for source in args.sources:
+            children = delete_source(store.children, source)
+            parents = store.parents.delete_source(source)
+            logger.info(f"Deleted {children} small-to-big children and {parents} parents from {source}")
+        store.parents.close()
+
+
+def cmd_set_search_ef(args: argparse.Namespace) -> None:
+    """Save a new HNSW search_ef on the collection, e.g. one recommended by tune_hnsw.py."""
+    for name, vectorstore in _vectorstores(args):
+        previous = vectorstore._collection.configuration["hnsw"]["ef_search"]
+        set_search_ef(vectorstore, args.search_ef)
+        logger.info(f"Changed search_ef of {name} from {previous} to {args.search_ef}")
+
+
+def main(argv: list[str] | None = None):
+    """Run a vector store maintenance command."""
+    parser = argparse.ArgumentParser(description="Vector store maintenance.")
+    parser.add_argument("--collection", default="papers")
+    parser.add_argument("--persist-directory", type=Path, default=CHROMA_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact = commands.add_parser("compact", help="Remove orphaned and duplicate vectors")
+    compact.add_argument("--papers-dir", type=Path, default=None,
+                         help="Treat sources not in this directory as orphaned")
+    compact.add_argument("--dry-run", action="store_true", help="Report without deleting")
+    compact.set_defaults(func=cmd_compact)
+
+    delete = commands.add_parser("delete-source", help="Delete all chunks of a source file")
+    delete.add_argument("sources", nargs="+")
+    delete.set_defaults(func=cmd_delete_source)
+
+    search_ef = commands.add_parser("set-search-ef", help="Save a new HNSW search_ef for every later reader")
+    search_ef.add_argument("search_ef", type=int)
+    search_ef.set_defaults(func=cmd_set_search_ef)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Local OpenAI-compatible stand-in for the LLM endpoint.
+
+This module serves `/v1/chat/completions` with synthetic answers so the
+query pipeline can be load-tested without hitting NAVIGATOR_API_BASE.
+Latency, token rate and error rate are configurable.
+
+Usage:
+    uv run python llm_stub.py --port 8001 --latency-ms 300 --tokens-per-second 80
+    NAVIGATOR_API_BASE=http://127.0.0.1:8001/v1 uv run python query.py "What is RAG?"
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from loguru import logger
+
+
+DEFAULT_PORT = 8001
+STUB_ANSWER = "Retrieval-augmented generation conditions a language model on retrieved passages [1]."
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server.
+
+    Attributes:
+        latency_ms: Median time before the first token, in milliseconds
+        latency_dist: "fixed", "uniform" (0..2x median) or "lognormal"
+        latency_sigma: Shape of the lognormal distribution
+        tokens_per_second: Simulated generation speed (0 = instant)
+        completion_tokens: Number of tokens in each answer
+        error_rate: Fraction of requests answered with an error
+        error_status: HTTP status used for injected errors (e.g. 429, 500)
+        seed: Random seed for reproducible runs
+    """
+
+    latency_ms: float = 200.0
+    latency_dist: str = "lognormal"
+    latency_sigma: float = 0.5
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 64
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int | None = None
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Sample time-to-first-token in seconds."""
+        median = self.latency_ms / 1000
+        if self.latency_dist == "fixed":
+            return median
+        if self.latency_dist == "uniform":
+            return rng.uniform(0, 2 * median)
+        if self.latency_dist == "lognormal":
+            return rng.lognormvariate(0, self.latency_sigma) * median
+        raise ValueError(f"Unknown latency distribution: {self.latency_dist}")
+
+    def generation_time(self) -> float:
+        """Time spent 'generating' completion_tokens, in seconds."""
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return self.completion_tokens / self.tokens_per_second
+
+
+def _make_answer(n_tokens: int) -> str:
+    """Build an answer roughly n_tokens words long."""
+    words = STUB_ANSWER.split()
+    return " ".join(words[i % len(words)] for i in range(max(n_tokens, 1)))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "StubServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        config = self.server.config
+        latency, is_error = self.server.draw()
+        time.sleep(latency)
+
+        if is_error:
+            self.server.count("errors")
+            self._send_json(config.error_status, {
+                "error": {"message": "injected error", "type": "stub_error", "code": config.error_status},
+            })
+            return
+
+        time.sleep(config.generation_time())
+        self.server.count("completions")
+
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": _make_answer(config.completion_tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": config.completion_tokens,
+                "total_tokens": prompt_tokens + config.completion_tokens,
+            },
+        })
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering OpenAI chat completion requests."""
+
+    daemon_threads = True
+
+    def __init__(self, config: StubConfig, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        super().__init__((host, port), _StubHandler)
+        self.config = config
+        self.stats = {"completions": 0, "errors": 0}
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI-style base URL to pass to get_llm / NAVIGATOR_API_BASE."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def draw(self) -> tuple[float, bool]:
+        """Sample (latency, is_error) for one request."""
+        with self._lock:
+            return self.config.sample_latency(self._rng), self._rng.random() < self.config.error_rate
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def start(self) -> "StubServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_stub_args(parser: argparse.ArgumentParser) -> None:
+    """Add the StubConfig options to a CLI parser."""
+    defaults = StubConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default=defaults.latency_dist)
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    """Build a StubConfig from options added by add_stub_args()."""
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+
+
+def main(argv: list[str] | None = None):
+    """Run the stub server until interrupted."""
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_stub_args(parser)
+    args = parser.parse_args(argv)
+
+    server = StubServer(config_from_args(args), host=args.host, port=args.port)
+    logger.info(f"Stub LLM listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Served {server.stats['completions']} completions, {server.stats['errors']} errors")
+
+
+if __name__ == "__main__":
+    main()
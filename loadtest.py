@@ -0,0 +1,246 @@
+"""Load generator for the retrieve + generate pipeline.
+
+This module drives `retrieve` and `generate_answer_with_citations` at a
+fixed concurrency (closed loop) or a target request rate (open loop) and
+reports latency percentiles, throughput and error counts. Combined with
+`llm_stub.py` the whole pipeline can be capacity-planned offline.
+
+Usage:
+    uv run python loadtest.py --stub --concurrency 8 --requests 200
+    uv run python loadtest.py --stub --rate 5 --duration 60 --latency-ms 500
+"""
+
+import argparse
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from loguru import logger
+
+from generator import generate_answer_with_citations, get_llm
+from http_pool import http_pool_stats, reset_http_pool_stats
+from llm_stub import StubServer, add_stub_args, config_from_args
+from run_evaluation import TEST_QUERIES
+from vectorstore import load_vectorstore, retrieve
+
+
+@dataclass
+class LoadResult:
+    """Outcome of a load test run.
+
+    Attributes:
+        latencies: Per-request latency in seconds (successful requests only)
+        errors: Count of failed requests by exception type
+        elapsed: Wall-clock duration of the run in seconds
+    """
+
+    latencies: list[float] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+    elapsed: float = 0.0
+
+    @property
+    def num_requests(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def summary(self) -> dict:
+        """Summarize the run as p50/p95/p99 latency, throughput and errors."""
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.num_requests,
+            "succeeded": len(ordered),
+            "errors": sum(self.errors.values()),
+            "error_types": dict(self.errors),
+            "elapsed_s": self.elapsed,
+            "throughput_rps": len(ordered) / self.elapsed if self.elapsed > 0 else 0.0,
+            "p50_s": percentile(ordered, 50),
+            "p95_s": percentile(ordered, 95),
+            "p99_s": percentile(ordered, 99),
+            "max_s": ordered[-1] if ordered else 0.0,
+        }
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values: Values in ascending order
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil without floats
+    return sorted_values[min(int(rank), len(sorted_values)) - 1]
+
+
+def run_load(
+    request_fn: Callable[[str], object],
+    queries: list[str],
+    concurrency: int = 4,
+    rate: float | None = None,
+    num_requests: int | None = None,
+    duration: float | None = None,
+) -> LoadResult:
+    """Drive request_fn with queries and measure latency.
+
+    Without `rate`, `concurrency` workers issue requests back-to-back
+    (closed loop). With `rate`, requests are started on a fixed schedule
+    of `rate` per second regardless of completions (open loop), so
+    latency includes any queueing once `concurrency` workers are busy.
+
+    Args:
+        request_fn: Function handling one query (e.g. retrieve + generate)
+        queries: Queries to cycle through
+        concurrency: Maximum in-flight requests
+        rate: Target requests per second (open loop), or None
+        num_requests: Stop after this many requests
+        duration: Stop issuing requests after this many seconds
+
+    Returns:
+        LoadResult with per-request latencies and error counts
+    """
+    if not queries:
+        raise ValueError("queries must not be empty")
+    if rate is not None and rate <= 0:
+        raise ValueError(f"rate must be positive, got {rate}")
+    if num_requests is None and duration is None:
+        num_requests = len(queries)
+
+    result = LoadResult()
+    lock = threading.Lock()
+    query_iter = itertools.cycle(queries)
+
+    def one(query: str, scheduled: float) -> None:
+        try:
+            request_fn(query)
+        except Exception as e:
+            with lock:
+                result.errors[type(e).__name__] += 1
+            return
+        latency = time.perf_counter() - scheduled
+        with lock:
+            result.latencies.append(latency)
+
+    start = time.perf_counter()
+
+    def should_continue(issued: int) -> bool:
+        if num_requests is not None and issued >= num_requests:
+            return False
+        if duration is not None and time.perf_counter() - start >= duration:
+            return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if rate is not None:
+            interval = 1.0 / rate
+            futures = []
+            issued = 0
+            while should_continue(issued):
+                scheduled = start + issued * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(one, next(query_iter), scheduled))
+                issued += 1
+            wait(futures)
+        else:
+            issued = 0
+            issued_lock = threading.Lock()
+
+            def worker() -> None:
+                nonlocal issued
+                while True:
+                    with issued_lock:
+                        if not should_continue(issued):
+                            return
+                        issued += 1
+                        query = next(query_iter)
+                    one(query, time.perf_counter())
+
+            wait([pool.submit(worker) for _ in range(concurrency)])
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def print_summary(summary: dict) -> None:
+    """Print a load test summary in the style of run_evaluation.py."""
+    print(f"\n{'=' * 40}")
+    print("Load Test Results")
+    print(f"{'=' * 40}")
+    print(f"Requests: {summary['requests']} ({summary['succeeded']} ok, {summary['errors']} errors)")
+    for name, count in summary["error_types"].items():
+        print(f"  {name}: {count}")
+    print(f"Elapsed: {summary['elapsed_s']:.2f}s")
+    print(f"Throughput: {summary['throughput_rps']:.2f} req/s")
+    print(f"Latency p50: {summary['p50_s'] * 1000:.0f} ms")
+    print(f"Latency p95: {summary['p95_s'] * 1000:.0f} ms")
+    print(f"Latency p99: {summary['p99_s'] * 1000:.0f} ms")
+
+
+def main(argv: list[str] | None = None):
+    """Run a load test against the local vector store and an LLM endpoint."""
+    parser = argparse.ArgumentParser(description="Load-test retrieve + generate.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum in-flight requests")
+    parser.add_argument("--rate", type=float, default=None, help="Target requests/second (open loop)")
+    parser.add_argument("--requests", type=int, default=None, help="Total requests to send")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to keep sending")
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per query")
+    parser.add_argument("--retrieve-only", action="store_true", help="Skip generation")
+    parser.add_argument("--llm-retries", type=int, default=0,
+                        help="Client retries per LLM call (default: 0, so every error is counted)")
+    parser.add_argument("--stub", action="store_true", help="Start a local stub LLM server")
+    add_stub_args(parser)
+    args = parser.parse_args(argv)
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+
+    stub = None
+    if args.stub:
+        stub = StubServer(config_from_args(args), port=0).start()
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+        logger.info(f"Stub LLM listening on {stub.base_url}")
+
+    try:
+        vectorstore = load_vectorstore()
+        llm = None
+        if not args.retrieve_only:
+            llm = get_llm(base_url=stub.base_url if stub else None, max_retries=args.llm_retries)
+
+        def request_fn(query: str) -> None:
+            docs = retrieve(vectorstore, query, k=args.k)
+            if llm is not None:
+                generate_answer_with_citations(query, docs, llm=llm)
+
+        queries = [query for query, _ in TEST_QUERIES]
+        mode = f"rate={args.rate}/s" if args.rate else "closed loop"
+        logger.info(f"Running load test: concurrency={args.concurrency}, {mode}")
+        reset_http_pool_stats()
+        result = run_load(
+            request_fn,
+            queries,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            num_requests=args.requests,
+            duration=args.duration,
+        )
+        print_summary(result.summary())
+        pool = http_pool_stats()
+        print(
+            f"HTTP: {pool['requests']} requests, {pool['new_connections']} new connections, "
+            f"{pool['reused_connections']} reused"
+        )
+    finally:
+        if stub is not None:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Cache of extracted PDF text for indexing.
+
+PyPDF extraction is the slowest part of re-indexing, and its output only
+changes when the PDF or the extractor changes. This module stores each
+paper's pages as gzip-compressed JSON lines keyed by the SHA-256 of the
+file contents and the extractor version, so re-chunking experiments read
+text from disk instead of parsing PDFs again.
+
+Usage:
+    uv run python pdf_cache.py info
+    uv run python pdf_cache.py prune --missing papers --older-than 30
+    uv run python pdf_cache.py clear
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+
+from loguru import logger
+
+
+CACHE_DIR = Path(".pdf_cache")
+CACHE_FORMAT = 1
+SUFFIX = ".jsonl.gz"
+
+
+def extractor_version() -> str:
+    """Identify the text extractor; a new version invalidates cached text."""
+    try:
+        from pypdf import __version__ as pypdf_version
+    except ImportError:
+        pypdf_version = "unknown"
+    return f"pypdf-{pypdf_version}-f{CACHE_FORMAT}"
+
+
+def file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PDFTextCache:
+    """Per-page text cache keyed by (file content hash, extractor version).
+
+    Args:
+        cache_dir: Directory holding cache entries (default: ./.pdf_cache)
+        extractor: Extractor version string (default: extractor_version())
+    """
+
+    def __init__(self, cache_dir: str | Path = CACHE_DIR, extractor: str | None = None):
+        self.cache_dir = Path(cache_dir)
+        self.extractor = extractor or extractor_version()
+
+    def path_for(self, pdf_path: Path) -> Path:
+        """Cache entry path for a PDF's current contents."""
+        return self.cache_dir / f"{file_hash(pdf_path)}-{self.extractor}{SUFFIX}"
+
+    def pages(
+        self, pdf_path: Path, extract: Callable[[Path], Iterable[tuple[int, str]]]
+    ) -> Iterator[tuple[int, str]]:
+        """Yield a PDF's pages from the cache, extracting and caching on a miss.
+
+        On a miss, pages are written as they are extracted and the entry
+        is only published once extraction finishes, so a failed or
+        abandoned run never leaves a partial entry behind. A hit refreshes
+        the entry's mtime, so its age counts from when it was last used.
+
+        Args:
+            pdf_path: The PDF to read
+            extract: Fallback that yields (page_number, text) from the PDF
+
+        Yields:
+            (page_number, text) tuples
+        """
+        entry = self.path_for(pdf_path)
+        if entry.exists():
+            logger.debug(f"Text cache hit for {pdf_path.name}")
+            try:
+                os.utime(entry)
+            except OSError:
+                # A read-only cache still serves hits; only pruning by age is affected
+                pass
+            yield from _read_entry(entry)
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                f.write(json.dumps({"source": pdf_path.name, "extractor": self.extractor}) + "\n")
+                for page_number, text in extract(pdf_path):
+                    f.write(json.dumps([page_number, text]) + "\n")
+                    yield page_number, text
+            os.replace(tmp, entry)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def entries(self) -> list[dict]:
+        """Describe every cache entry (source name, size, days since last use)."""
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for path in sorted(self.cache_dir.glob(f"*{SUFFIX}")):
+            stat = path.stat()
+            digest, _, extractor = path.name[: -len(SUFFIX)].partition("-")
+            entries.append({
+                "path": path,
+                "hash": digest,
+                "extractor": extractor,
+                "source": _read_header(path).get("source", "?"),
+                "bytes": stat.st_size,
+                "age_days": (time.time() - stat.st_mtime) / 86400,
+            })
+        return entries
+
+    def prune(
+        self,
+        papers_dir: Path | None = None,
+        older_than_days: float | None = None,
+        stale_extractor: bool = True,
+    ) -> tuple[int, int]:
+        """Delete cache entries that are no longer useful.
+
+        Args:
+            papers_dir: If given, delete entries whose PDF is no longer in it
+            older_than_days: If given, delete entries not used for this many days
+            stale_extractor: Delete entries from other extractor versions
+
+        Returns:
+            (entries removed, bytes reclaimed)
+        """
+        live = None
+        if papers_dir is not None:
+            live = {file_hash(pdf) for pdf in Path(papers_dir).glob("*.pdf")}
+
+        removed = reclaimed = 0
+        for entry in self.entries():
+            if (
+                (stale_extractor and entry["extractor"] != self.extractor)
+                or (live is not None and entry["hash"] not in live)
+                or (older_than_days is not None and entry["age_days"] > older_than_days)
+            ):
+                entry["path"].unlink()
+                removed += 1
+                reclaimed += entry["bytes"]
+        return removed, reclaimed
+
+    def clear(self) -> tuple[int, int]:
+        """Delete every cache entry.
+
+        Returns:
+            (entries removed, bytes reclaimed)
+        """
+        entries = self.entries()
+        for entry in entries:
+            entry["path"].unlink()
+        return len(entries), sum(entry["bytes"] for entry in entries)
+
+
+def _read_header(path: Path) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            return json.loads(f.readline())
+        except json.JSONDecodeError:
+            return {}
+
+
+def _read_entry(path: Path) -> Iterator[tuple[int, str]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        f.readline()  # header
+        for line in f:
+            page_number, text = json.loads(line)
+            yield page_number, text
+
+
+def main(argv: list[str] | None = None):
+    """Inspect or prune the extracted-text cache."""
+    parser = argparse.ArgumentParser(description="Inspect or prune the PDF text cache.")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", help="List cache entries")
+    prune = commands.add_parser("prune", help="Delete stale entries")
+    prune.add_argument("--missing", type=Path, metavar="PAPERS_DIR",
+                       help="Delete entries whose PDF is no longer in this directory")
+    prune.add_argument("--older-than", type=float, metavar="DAYS",
+                       help="Delete entries not used for this many days")
+    commands.add_parser("clear", help="Delete all entries")
+    args = parser.parse_args(argv)
+
+    cache = PDFTextCache(args.cache_dir)
+
+    if args.command == "info":
+        entries = cache.entries()
+        for entry in entries:
+            marker = "" if entry["extractor"] == cache.extractor else "  (stale extractor)"
+            print(
+                f"{entry['hash'][:12]}  {entry['bytes'] / 1024:8.1f} KiB  "
+                f"{entry['age_days']:6.1f} d  {entry['source']}{marker}"
+            )
+        total = sum(entry["bytes"] for entry in entries)
+        print(f"\n{len(entries)} entries, {total / 1024 / 1024:.2f} MiB in {cache.cache_dir}")
+        return
+
+    if args.command == "prune":
+        removed, reclaimed = cache.prune(papers_dir=args.missing, older_than_days=args.older_than)
+    else:
+        removed, reclaimed = cache.clear()
+    print(f"Removed {removed} entries, reclaimed {reclaimed / 1024 / 1024:.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Built-in profiling for the RAG entry points.
+
+This module lets `rag-index`, `rag-query` and `rag-evaluate` profile
+themselves instead of being wrapped in cProfile by hand. It writes:
+
+- `<name>.prof`: cProfile stats, readable with `pstats` or snakeviz
+- `<name>.collapsed`: collapsed stacks for flamegraph.pl / speedscope
+- `<name>.memory.txt`: tracemalloc top allocations at each stage boundary
+
+Usage: uv run python index.py --profile --profile-memory --profile-dir profiles
+"""
+
+import argparse
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from loguru import logger
+
+
+PROFILE_DIR = Path("profiles")
+TOP_ALLOCATIONS = 15
+MIN_STACK_FRACTION = 0.0005
+MAX_STACK_DEPTH = 128
+MAX_STACK_PATHS = 50_000
+
+_active: "Profiler | None" = None
+
+
+def add_profiling_args(parser: argparse.ArgumentParser) -> None:
+    """Add the --profile/--profile-memory/--profile-dir options to a CLI parser."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument(
+        "--profile", action="store_true",
+        help="Write cProfile stats and collapsed stacks for flame graphs",
+    )
+    group.add_argument(
+        "--profile-memory", action="store_true",
+        help="Take tracemalloc snapshots at stage boundaries",
+    )
+    group.add_argument(
+        "--profile-dir", type=Path, default=PROFILE_DIR,
+        help=f"Directory for profiling reports (default: {PROFILE_DIR})",
+    )
+
+
+class Profiler:
+    """CPU and memory profiler for one run of an entry point.
+
+    Args:
+        name: Base name for the report files (e.g. "index")
+        output_dir: Directory to write reports to
+        cpu: Whether to run cProfile
+        memory: Whether to take tracemalloc snapshots at stage boundaries
+    """
+
+    def __init__(self, name: str, output_dir: str | Path = PROFILE_DIR,
+                 cpu: bool = True, memory: bool = False):
+        self.name = name
+        self.output_dir = Path(output_dir)
+        self.cpu = cpu
+        self.memory = memory
+        self.snapshots: list[tuple[str, tracemalloc.Snapshot]] = []
+        self._profile: cProfile.Profile | None = None
+        self._started_tracemalloc = False
+
+    def start(self) -> None:
+        """Start collecting."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.cpu:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stage(self, label: str) -> None:
+        """Mark the end of a pipeline stage and snapshot memory if enabled."""
+        if self.memory and tracemalloc.is_tracing():
+            self.snapshots.append((label, tracemalloc.take_snapshot()))
+
+    def stop(self) -> list[Path]:
+        """Stop collecting and write the reports.
+
+        Returns:
+            Paths of the files written
+        """
+        written = []
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        if self._profile is not None:
+            self._profile.disable()
+            prof_path = self.output_dir / f"{self.name}.prof"
+            self._profile.dump_stats(str(prof_path))
+            written.append(prof_path)
+
+            collapsed_path = self.output_dir / f"{self.name}.collapsed"
+            stats = pstats.Stats(self._profile)
+            collapsed_path.write_text("\n".join(collapsed_stacks(stats)) + "\n")
+            written.append(collapsed_path)
+            self._profile = None
+
+        if self.snapshots:
+            memory_path = self.output_dir / f"{self.name}.memory.txt"
+            memory_path.write_text(format_snapshots(self.snapshots))
+            written.append(memory_path)
+
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        return written
+
+
+def _func_label(func: tuple[str, int, str]) -> str:
+    """Render a pstats function key as a flame graph frame name."""
+    filename, lineno, name = func
+    if filename == "~":
+        return name
+    return f"{Path(filename).name}:{lineno}:{name}"
+
+
+def collapsed_stacks(stats: pstats.Stats, min_fraction: float = MIN_STACK_FRACTION,
+                     max_depth: int = MAX_STACK_DEPTH, max_paths: int = MAX_STACK_PATHS) -> list[str]:
+    """Convert cProfile stats into collapsed-stack lines.
+
+    cProfile only records caller/callee edges, not full stacks, so each
+    function's own time is apportioned down the call graph in proportion
+    to the cumulative time spent along each edge. The number of paths
+    through a real call graph grows exponentially, so paths below
+    `min_fraction` of the total time are pruned, stacks are cut at
+    `max_depth` frames and at most `max_paths` paths are walked; the
+    pruned time is left out of the output.
+
+    Args:
+        stats: Loaded cProfile statistics
+        min_fraction: Smallest share of total time a path must carry to be walked
+        max_depth: Deepest stack to emit
+        max_paths: Most call paths to walk
+
+    Returns:
+        Lines of the form "frame;frame;frame <microseconds>"
+    """
+    raw = stats.stats  # func -> (cc, nc, tt, ct, callers)
+    labels = {func: _func_label(func) for func in raw}
+    callees: dict = {func: [] for func in raw}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            if caller in callees:
+                callees[caller].append((func, edge[3]))
+    for edges in callees.values():
+        edges.sort(key=lambda edge: edge[1], reverse=True)  # walk the heaviest paths first
+
+    roots = [func for func, (_, _, _, _, callers) in raw.items() if not callers]
+    min_time = sum(raw[root][3] for root in roots) * min_fraction
+    totals: dict[str, float] = {}
+    walked = 0
+
+    def walk(func, stack: tuple[str, ...], fraction: float) -> None:
+        nonlocal walked
+        walked += 1
+        _, _, tottime, cumtime, _ = raw[func]
+        path = stack + (labels[func],)
+        own = tottime * fraction
+        if own > 0:
+            key = ";".join(path)
+            totals[key] = totals.get(key, 0.0) + own
+        if cumtime <= 0 or len(path) >= max_depth:
+            return
+        for callee, edge_cumtime in callees[func]:
+            if walked >= max_paths:
+                return
+            if labels[callee] in path:
+                continue  # recursion: time is already counted higher up
+            callee_cumtime = raw[callee][3]
+            if callee_cumtime > 0 and edge_cumtime * fraction >= min_time:
+                walk(callee, path, fraction * edge_cumtime / callee_cumtime)
+
+    for root in sorted(roots, key=lambda root: raw[root][3], reverse=True):
+        if walked >= max_paths:
+            break
+        walk(root, (), 1.0)
+
+    return [
+        f"{key} {int(seconds * 1_000_000)}"
+        for key, seconds in sorted(totals.items())
+        if int(seconds * 1_000_000) > 0
+    ]
+
+
+def format_snapshots(snapshots: list[tuple[str, tracemalloc.Snapshot]],
+                     limit: int = TOP_ALLOCATIONS) -> str:
+    """Render the top allocations of each stage snapshot as text."""
+    lines = []
+    previous = None
+    for label, snapshot in snapshots:
+        total = sum(stat.size for stat in snapshot.statistics("filename"))
+        lines.append(f"=== after {label}: {total / 1024 / 1024:.1f} MiB traced ===")
+        for stat in snapshot.statistics("lineno")[:limit]:
+            lines.append(f"  {stat}")
+        if previous is not None:
+            lines.append("--- growth since previous stage ---")
+            for stat in snapshot.compare_to(previous, "lineno")[:limit]:
+                lines.append(f"  {stat}")
+        lines.append("")
+        previous = snapshot
+    return "\n".join(lines)
+
+
+def stage(label: str) -> None:
+    """Mark a stage boundary on the active profiler, if any."""
+    if _active is not None:
+        _active.stage(label)
+
+
+@contextmanager
+def profiled(name: str, args: argparse.Namespace):
+    """Profile the enclosed block according to parsed CLI options.
+
+    Does nothing unless --profile or --profile-memory was given.
+    """
+    global _active
+
+    if not (args.profile or args.profile_memory):
+        yield None
+        return
+
+    profiler = Profiler(name, args.profile_dir, cpu=args.profile, memory=args.profile_memory)
+    _active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        _active = None
+        for path in profiler.stop():
+            logger.info(f"Profile report written to {path}")
@@ -3,30 +3,103 @@
 Usage: uv run python query.py "What is retrieval augmented generation?"
 """
 
-import sys
+import argparse
+from pathlib import Path
 
 from loguru import logger
 
-from vectorstore import load_vectorstore, retrieve
+from adaptive_retrieval import DEFAULT_MAX_K, add_adaptive_args, cut_hits, cut_kwargs
+from centroid_index import load_centroid_index, retrieve_coarse_to_fine
+from profiling import add_profiling_args, profiled, stage
+from sharding import load_sharded_vectorstore
+from small_to_big import load_small_to_big
+from snapshot import Snapshot
+from vectorstore import load_vectorstore, retrieve, retrieve_with_scores
 from generator import generate_answer_with_citations
 
 
-def main():
+def main(argv: list[str] | None = None):
     """Query the RAG system."""
-    if len(sys.argv) < 2:
-        print("Usage: uv run python query.py \"Your question here\"")
-        sys.exit(1)
-
-    query = " ".join(sys.argv[1:])
+    parser = argparse.ArgumentParser(description="Query the RAG system.")
+    parser.add_argument("question", nargs="+", help="The question to answer")
+    parser.add_argument("--fan-out", type=int, default=None,
+                        help="Search only chunks of the N nearest papers (needs centroid_index.py build)")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Search the sharded store built with index.py --shards")
+    parser.add_argument("--small-to-big", action="store_true",
+                        help="Search sentence windows, answer from their paragraphs (index.py --small-to-big)")
+    parser.add_argument("--snapshot", type=Path, default=None,
+                        help="Search a snapshot file written by snapshot.py export")
+    parser.add_argument("--context-tokens", type=int, default=None,
+                        help="Token budget for sources; over it, chunk digests (digests.py build) replace full text")
+    add_adaptive_args(parser)
+    add_profiling_args(parser)
+    args = parser.parse_args(argv)
+    if args.sharded and args.fan_out is not None:
+        parser.error("--fan-out needs the unsharded store's centroid index; drop --sharded")
+    if args.snapshot and (args.sharded or args.fan_out is not None):
+        parser.error("--snapshot cannot be combined with --sharded or --fan-out")
+    if args.small_to_big and (args.sharded or args.snapshot or args.fan_out is not None):
+        parser.error("--small-to-big cannot be combined with --sharded, --snapshot or --fan-out")
+
+    with profiled("query", args):
+        run_query(
+            " ".join(args.question),
+            fan_out=args.fan_out,
+            sharded=args.sharded,
+            snapshot=args.snapshot,
+            small_to_big=args.small_to_big,
+            adaptive=cut_kwargs(args) if args.adaptive else None,
+            max_k=args.max_k,
+            max_context_tokens=args.context_tokens,
+        )
+
+
+def run_query(
+    query: str,
+    fan_out: int | None = None,
+    sharded: bool = False,
+    snapshot: Path | None = None,
+    small_to_big: bool = False,
+    adaptive: dict | None = None,
+    max_k: int = DEFAULT_MAX_K,
+    max_context_tokens: int | None = None,
+):
+    """Retrieve context for a query and print the generated answer.
+
+    With `adaptive` (cut_hits() options), `max_k` hits are fetched and cut
+    to a per-query depth instead of a fixed k=3. `max_context_tokens` is
+    passed to generate_answer_with_citations().
+    """
     logger.info(f"Query: {query}")
 
     # Load vector store
     logger.info("Loading vector store...")
-    vectorstore = load_vectorstore()
+    if snapshot is not None:
+        vectorstore = Snapshot(snapshot)
+    elif small_to_big:
+        vectorstore = load_small_to_big()
+    else:
+        vectorstore = load_sharded_vectorstore() if sharded else load_vectorstore()
+    stage("load")
 
     # Retrieve relevant documents
     logger.info("Retrieving relevant documents...")
-    docs = retrieve(vectorstore, query, k=3)
+    if adaptive is not None:
+        if fan_out is None:
+            hits = retrieve_with_scores(vectorstore, query, k=max_k)
+        else:
+            centroids = load_centroid_index(vectorstore)
+            hits = retrieve_coarse_to_fine(vectorstore, centroids, query, k=max_k, fan_out=fan_out)
+        hits, cut = cut_hits(hits, **adaptive)
+        docs = [doc for doc, _ in hits]
+        logger.info(f"Adaptive depth: {cut.describe()}")
+    elif fan_out is None:
+        docs = retrieve(vectorstore, query, k=3)
+    else:
+        centroids = load_centroid_index(vectorstore)
+        docs = [doc for doc, _ in retrieve_coarse_to_fine(vectorstore, centroids, query, k=3, fan_out=fan_out)]
+    stage("retrieve")
 
     if not docs:
         print("No relevant documents found.")
@@ -36,7 +109,8 @@ def main():
 
     # Generate answer with citations
     logger.info("Generating answer...")
-    result = generate_answer_with_citations(query, docs)
+    result = generate_answer_with_citations(query, docs, max_context_tokens=max_context_tokens)
+    stage("generate")
 
     # Print results
     print("\n" + "=" * 60)
@@ -1,12 +1,16 @@
 """Run evaluation on the RAG system.
 
-Usage: uv run python run_evaluation.py
+Usage: uv run python run_evaluation.py [--adaptive] [--profile] [--profile-memory]
 """
 
+import argparse
+
 from loguru import logger
 
+from adaptive_retrieval import add_adaptive_args, cut_kwargs, retrieve_adaptive
 from vectorstore import load_vectorstore, retrieve
 from evaluate import precision_at_k, mean_reciprocal_rank
+from profiling import add_profiling_args, profiled, stage
 
 
 # Define test queries with known relevant documents
@@ -24,21 +28,36 @@ TEST_QUERIES = [
 ]
 
 
-def evaluate_retrieval(vectorstore, queries: list[tuple[str, list[str]]], k: int = 5):
-    """Evaluate retrieval performance."""
+def evaluate_retrieval(
+    vectorstore, queries: list[tuple[str, list[str]]], k: int = 5, adaptive: dict | None = None
+):
+    """Evaluate retrieval performance.
+
+    With `adaptive` (cut_hits() options), k is the over-fetch depth and each
+    query is scored at its own cut; the cuts are returned under "cuts".
+    """
 
     precision_scores = []
     mrr_data = []
+    cuts = []
 
     for query, relevant_sources in queries:
         logger.info(f"Query: {query[:50]}...")
 
         # Retrieve documents
-        docs = retrieve(vectorstore, query, k=k)
+        if adaptive is None:
+            docs = retrieve(vectorstore, query, k=k)
+            depth = k
+        else:
+            hits, cut = retrieve_adaptive(vectorstore, query, max_k=k, **adaptive)
+            docs = [doc for doc, _ in hits]
+            depth = cut.kept
+            cuts.append(cut)
+            logger.info(f"  Adaptive depth: {cut.describe()}")
         retrieved_sources = [doc.metadata.get("source", "") for doc in docs]
 
         # Calculate precision@k
-        p_at_k = precision_at_k(retrieved_sources, relevant_sources, k)
+        p_at_k = precision_at_k(retrieved_sources, relevant_sources, depth)
         precision_scores.append(p_at_k)
 
         # Prepare data for MRR (use first relevant source)
@@ -46,7 +65,7 @@ def evaluate_retrieval(vectorstore, queries: list[tuple[str, list[str]]], k: int
             mrr_data.append((retrieved_sources, relevant_sources[0]))
 
         logger.info(f"  Retrieved: {retrieved_sources[:3]}")
-        logger.info(f"  Precision@{k}: {p_at_k:.3f}")
+        logger.info(f"  Precision@{depth}: {p_at_k:.3f}")
 
     # Calculate MRR
     mrr = mean_reciprocal_rank(mrr_data) if mrr_data else 0.0
@@ -56,26 +75,51 @@ def evaluate_retrieval(vectorstore, queries: list[tuple[str, list[str]]], k: int
         "mrr": mrr,
         "k": k,
         "num_queries": len(queries),
+        "mean_depth": sum(cut.kept for cut in cuts) / len(cuts) if cuts else float(k),
+        "cuts": cuts,
     }
 
 
-def main():
+def main(argv: list[str] | None = None):
     """Run evaluation."""
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality.")
+    add_adaptive_args(parser)
+    add_profiling_args(parser)
+    args = parser.parse_args(argv)
+
+    with profiled("evaluate", args):
+        if args.adaptive:
+            run_evaluation(adaptive=cut_kwargs(args), ks=[args.max_k])
+        else:
+            run_evaluation()
+
+
+def run_evaluation(adaptive: dict | None = None, ks: list[int] | None = None):
+    """Evaluate retrieval over TEST_QUERIES at several k values.
+
+    With `adaptive`, each k is an over-fetch depth and the per-query cuts are printed.
+    """
     logger.info("Loading vector store...")
     vectorstore = load_vectorstore()
+    stage("load")
 
     logger.info(f"Running evaluation on {len(TEST_QUERIES)} queries...")
 
     # Evaluate at different k values
-    for k in [3, 5]:
-        results = evaluate_retrieval(vectorstore, TEST_QUERIES, k=k)
+    for k in ks or [3, 5]:
+        results = evaluate_retrieval(vectorstore, TEST_QUERIES, k=k, adaptive=adaptive)
+        stage(f"evaluate k={k}")
 
         print(f"\n{'=' * 40}")
         print(f"Evaluation Results (k={k})")
         print(f"{'=' * 40}")
         print(f"Number of queries: {results['num_queries']}")
-        print(f"Precision@{k}: {results['precision_at_k']:.3f}")
+        print(f"Precision@{'cut' if adaptive is not None else k}: {results['precision_at_k']:.3f}")
         print(f"MRR: {results['mrr']:.3f}")
+        if adaptive is not None:
+            print(f"Mean depth: {results['mean_depth']:.2f}")
+            for (query, _), cut in zip(TEST_QUERIES, results["cuts"]):
+                print(f"  {query[:40]:<40} {cut.describe()}")
 
     print("\nDone!")
 
@@ -0,0 +1,303 @@
+"""Sharded vector store with parallel build and scatter-gather search.
+
+Chunks are partitioned across several Chroma stores, one directory per
+shard, by a stable hash of their source file, so every chunk of a paper
+lands in the same shard. Shards are built in parallel worker processes
+and searched concurrently; per-shard top-k lists are merged by score.
+
+ShardedVectorStore provides similarity_search() and
+similarity_search_with_score(), so retrieve() and retrieve_with_scores()
+work on it unchanged.
+
+Usage: uv run python index.py --shards 4
+"""
+
+import hashlib
+import heapq
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from vectorstore import HNSWParams, create_vectorstore, get_embeddings, update_metadata
+
+
+SHARDS_DIR = Path("./chroma_shards")
+MANIFEST = "shards.json"
+
+
+def shard_for(source: str, num_shards: int) -> int:
+    """Stable shard number for a source file (independent of PYTHONHASHSEED)."""
+    digest = hashlib.sha256(source.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % num_shards
+
+
+def shard_directory(persist_directory: str | Path, shard: int) -> Path:
+    return Path(persist_directory) / f"shard-{shard:02d}"
+
+
+def is_sharded(persist_directory: str | Path) -> bool:
+    """Whether a directory holds a sharded store (has a manifest)."""
+    return (Path(persist_directory) / MANIFEST).exists()
+
+
+def read_manifest(persist_directory: str | Path) -> dict:
+    """The manifest of a sharded store: num_shards, collection_name and the built shards."""
+    return json.loads((Path(persist_directory) / MANIFEST).read_text())
+
+
+def clear_shards(persist_directory: str | Path) -> None:
+    """Remove the manifest and every shard directory of an earlier build."""
+    persist_directory = Path(persist_directory)
+    (persist_directory / MANIFEST).unlink(missing_ok=True)
+    for directory in persist_directory.glob("shard-[0-9][0-9]"):
+        shutil.rmtree(directory)
+
+
+def partition(
+    chunks: list[str], metadatas: list[dict], num_shards: int
+) -> list[tuple[list[str], list[dict]]]:
+    """Split chunks into per-shard (chunks, metadatas) lists by source."""
+    if len(chunks) != len(metadatas):
+        raise ValueError(
+            f"chunks and metadatas must be same length. Got {len(chunks)} chunks and {len(metadatas)} metadatas."
+        )
+    shards: list[tuple[list[str], list[dict]]] = [([], []) for _ in range(num_shards)]
+    for chunk, metadata in zip(chunks, metadatas):
+        shard_chunks, shard_metadatas = shards[shard_for(str(metadata.get("source", "")), num_shards)]
+        shard_chunks.append(chunk)
+        shard_metadatas.append(metadata)
+    return shards
+
+
+_worker_embeddings = None
+
+
+def _build_shard(job: tuple) -> int:
+    """Worker process entry point: write a batch to one shard and return its size.
+
+    The embedding model is loaded once per process and reused across batches.
+    """
+    global _worker_embeddings
+    chunks, metadatas, collection_name, directory, hnsw = job
+    if _worker_embeddings is None:
+        _worker_embeddings = get_embeddings()
+    vectorstore = create_vectorstore(
+        chunks,
+        metadatas,
+        collection_name=collection_name,
+        persist_directory=directory,
+        replace_sources=False,
+        hnsw=hnsw,
+        embeddings=_worker_embeddings,
+    )
+    return vectorstore._collection.count()
+
+
+class ShardedVectorStore:
+    """Scatter-gather search over several Chroma shards.
+
+    Args:
+        shards: One Chroma store per shard, sharing an embedding function
+        max_workers: Threads used to query shards concurrently
+    """
+
+    def __init__(self, shards: list[Chroma], max_workers: int | None = None):
+        if not shards:
+            raise ValueError("ShardedVectorStore needs at least one shard")
+        self.shards = shards
+        self._embedding_function = shards[0]._embedding_function
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or len(shards))
+
+    def count(self) -> int:
+        """Total number of chunks across shards."""
+        return sum(shard._collection.count() for shard in self.shards)
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: list[float], k: int = 4, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        """Query every shard concurrently and merge the top-k by distance."""
+        futures = [
+            self._pool.submit(
+                shard.similarity_search_by_vector_with_relevance_scores, embedding, k=k, filter=filter
+            )
+            for shard in self.shards
+        ]
+        results = [future.result() for future in futures]
+        return heapq.nsmallest(k, (hit for hits in results for hit in hits), key=lambda hit: hit[1])
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        """Embed the query once, then scatter-gather across shards."""
+        embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+class ShardWriter:
+    """Build a sharded store one batch of chunks at a time.
+
+    Opening clears any earlier build in `persist_directory`, so a rebuild
+    with fewer shards (or fewer sources) leaves no stale shards. Each
+    add() partitions a batch by source and writes the shards in parallel
+    worker processes; close() writes the manifest.
+
+    Chroma does not support several processes writing one directory, so
+    each shard has a single owner: shard i is always written by build
+    process i % max_workers, which keeps its Chroma client open for the
+    whole build.
+
+    Args:
+        num_shards: Number of shards
+        collection_name: Collection name used in every shard (default: "papers")
+        persist_directory: Parent directory of the shard directories
+        max_workers: Build processes (default: one per shard, capped at CPU count)
+        hnsw: HNSW parameters for every shard
+    """
+
+    def __init__(
+        self,
+        num_shards: int,
+        collection_name: str = "papers",
+        persist_directory: str | Path = SHARDS_DIR,
+        max_workers: int | None = None,
+        hnsw: HNSWParams | None = None,
+    ):
+        if num_shards < 1:
+            raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+        self.num_shards = num_shards
+        self.collection_name = collection_name
+        self.persist_directory = Path(persist_directory)
+        self.workers = max_workers or min(num_shards, os.cpu_count() or 1)
+        self.hnsw = hnsw
+        self.built: set[int] = set()
+        self._pools: list[ProcessPoolExecutor] = []
+        clear_shards(self.persist_directory)
+
+    def add(self, chunks: list[str], metadatas: list[dict]) -> None:
+        """Upsert a batch of chunks into their shards."""
+        jobs = []
+        for i, (shard_chunks, shard_metadatas) in enumerate(partition(chunks, metadatas, self.num_shards)):
+            if shard_chunks:
+                self.built.add(i)
+                directory = str(shard_directory(self.persist_directory, i))
+                jobs.append((i, (shard_chunks, shard_metadatas, self.collection_name, directory, self.hnsw)))
+
+        if self.workers == 1:
+            for _, job in jobs:
+                _build_shard(job)
+            return
+        if not self._pools:
+            # Spawn, not fork: forking after Chroma/torch have started threads can deadlock
+            context = multiprocessing.get_context("spawn")
+            self._pools = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(self.workers)]
+        futures = [self._pools[i % self.workers].submit(_build_shard, job) for i, job in jobs]
+        for future in futures:
+            future.result()
+
+    def update_metadata(self, ids: list[str], metadatas: list[dict]) -> None:
+        """Merge metadata into stored chunks, routed by each metadata's 'source'.
+
+        Call after the last add(); the build processes are shut down first
+        so only this process has the shards open.
+        """
+        self._shutdown()
+        per_shard: dict[int, tuple[list[str], list[dict]]] = {}
+        for chunk_id, metadata in zip(ids, metadatas):
+            shard_ids, shard_metadatas = per_shard.setdefault(
+                shard_for(str(metadata.get("source", "")), self.num_shards), ([], [])
+            )
+            shard_ids.append(chunk_id)
+            shard_metadatas.append(metadata)
+        for i, (shard_ids, shard_metadatas) in per_shard.items():
+            shard = Chroma(
+                collection_name=self.collection_name,
+                persist_directory=str(shard_directory(self.persist_directory, i)),
+            )
+            update_metadata(shard, shard_ids, shard_metadatas)
+
+    def close(self) -> ShardedVectorStore:
+        """Write the manifest and open the built shards."""
+        self._shutdown()
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        (self.persist_directory / MANIFEST).write_text(
+            json.dumps({
+                "num_shards": self.num_shards,
+                "collection_name": self.collection_name,
+                "shards": sorted(self.built),
+            })
+        )
+        return load_sharded_vectorstore(self.persist_directory)
+
+    def _shutdown(self) -> None:
+        for pool in self._pools:
+            pool.shutdown()
+        self._pools = []
+
+
+def create_sharded_vectorstore(
+    chunks: list[str],
+    metadatas: list[dict],
+    num_shards: int,
+    collection_name: str = "papers",
+    persist_directory: str | Path = SHARDS_DIR,
+    max_workers: int | None = None,
+    hnsw: HNSWParams | None = None,
+) -> ShardedVectorStore:
+    """
+    Partition chunks by source and build each shard in its own process.
+
+    Any earlier build in `persist_directory` is removed first (see
+    ShardWriter, which also builds from batches).
+
+    Args:
+        chunks: List of text chunks to embed and store
+        metadatas: List of metadata dicts (one per chunk), each with 'source' key
+        num_shards: Number of shards
+        collection_name: Collection name used in every shard (default: "papers")
+        persist_directory: Parent directory of the shard directories
+        max_workers: Build processes (default: one per shard, capped at CPU count)
+        hnsw: HNSW parameters for every shard
+
+    Returns:
+        ShardedVectorStore over the built shards
+    """
+    writer = ShardWriter(num_shards, collection_name, persist_directory, max_workers, hnsw)
+    writer.add(chunks, metadatas)
+    return writer.close()
+
+
+def load_sharded_vectorstore(persist_directory: str | Path = SHARDS_DIR) -> ShardedVectorStore:
+    """
+    Open exactly the shards listed in a sharded store's manifest.
+
+    Raises:
+        FileNotFoundError: If the manifest or a listed shard directory is missing
+    """
+    persist_directory = Path(persist_directory)
+    manifest = read_manifest(persist_directory)
+    directories = [shard_directory(persist_directory, i) for i in manifest["shards"]]
+    missing = [str(directory) for directory in directories if not directory.is_dir()]
+    if missing:
+        raise FileNotFoundError(f"Shards listed in {persist_directory / MANIFEST} are missing: {', '.join(missing)}")
+    embeddings = get_embeddings()
+    shards = [
+        Chroma(
+            collection_name=manifest["collection_name"],
+            embedding_function=embeddings,
+            persist_directory=str(directory),
+        )
+        for directory in directories
+    ]
+    return ShardedVectorStore(shards)
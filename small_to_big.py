@@ -0,0 +1,237 @@
+"""Small-to-big retrieval over a two-level chunk hierarchy.
+
+Small chunks embed sharply but give the LLM thin context; large ones
+give context but dilute similarity and cost more to embed. Here only
+small sentence-window children are embedded (collection
+"<name>_children"); each points by "parent_id" to a paragraph-level
+parent from chunk_by_paragraphs(). Parents are stored once, unembedded,
+in a SQLite table next to the Chroma files.
+
+A search over-fetches children, maps them to parents in rank order and
+returns each parent once, scored by its best child; if too few distinct
+parents turn up, it fetches more children until it has k or runs out. SmallToBigStore
+provides similarity_search() and similarity_search_with_score(), so
+retrieve() and retrieve_with_scores() return deduplicated parents.
+
+Usage:
+    uv run python index.py --small-to-big
+    uv run python query.py --small-to-big "What is retrieval augmented generation?"
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import CHROMA_DB_PATH, HNSWParams, create_vectorstore, get_embeddings, iter_entries, make_chunk_id
+
+
+CHILDREN_SUFFIX = "_children"
+# Children fetched per requested parent; neighbouring windows often share a parent
+FETCH_FACTOR = 4
+
+
+class ParentStore:
+    """Parent passages keyed by ID, in one SQLite file.
+
+    Args:
+        path: Database file (created if missing)
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS parents (id TEXT PRIMARY KEY, source TEXT, text TEXT, metadata TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS parents_source ON parents (source)")
+
+    def replace_sources(self, ids: list[str], texts: list[str], metadatas: list[dict]) -> None:
+        """Store parents, first deleting every earlier parent of the same sources."""
+        sources = {str(m.get("source", "")) for m in metadatas}
+        with self._db:
+            self._db.executemany("DELETE FROM parents WHERE source = ?", [(s,) for s in sources])
+            self._db.executemany(
+                "INSERT OR REPLACE INTO parents VALUES (?, ?, ?, ?)",
+                [(i, str(m.get("source", "")), t, json.dumps(m)) for i, t, m in zip(ids, texts, metadatas)],
+            )
+
+    def get(self, ids: list[str]) -> dict[str, Document]:
+        """Parents by ID; unknown IDs are left out."""
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT id, text, metadata FROM parents WHERE id IN ({','.join('?' * len(batch))})", batch
+            )
+            for parent_id, text, metadata in rows:
+                found[parent_id] = Document(page_content=text, metadata=json.loads(metadata))
+        return found
+
+    def delete_source(self, source: str) -> int:
+        with self._db:
+            return self._db.execute("DELETE FROM parents WHERE source = ?", (source,)).rowcount
+
+    def delete(self, ids: list[str]) -> int:
+        with self._db:
+            return self._db.executemany("DELETE FROM parents WHERE id = ?", [(i,) for i in ids]).rowcount
+
+    def entries(self) -> list[tuple[str, str]]:
+        """(id, source) of every parent."""
+        return self._db.execute("SELECT id, source FROM parents").fetchall()
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def parent_store_path(persist_directory: str | Path, collection_name: str) -> Path:
+    return Path(persist_directory) / f"{collection_name}_parents.sqlite3"
+
+
+class SmallToBigStore:
+    """Search children, return their parents.
+
+    Args:
+        children: Chroma store of embedded child chunks with "parent_id" metadata
+        parents: ParentStore holding the parent passages
+        fetch_factor: Children fetched per requested parent
+    """
+
+    def __init__(self, children: Chroma, parents: ParentStore, fetch_factor: int = FETCH_FACTOR):
+        self.children = children
+        self.parents = parents
+        self.fetch_factor = fetch_factor
+        self._embedding_function = children._embedding_function
+
+    def _to_parents(self, hits: list[tuple[Document, float]], k: int) -> list[tuple[Document, float]]:
+        best: dict[str, float] = {}
+        for child, distance in hits:
+            parent_id = child.metadata.get("parent_id")
+            if parent_id is not None and parent_id not in best:
+                best[parent_id] = distance
+        parents = self.parents.get(list(best))
+        return [(parents[parent_id], distance) for parent_id, distance in best.items() if parent_id in parents][:k]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: list[float], k: int = 4, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        """Top-k distinct parents, each scored by its closest child.
+
+        Fetches k * fetch_factor children, doubling that until k parents
+        are found or the (filtered) collection has no more children.
+        """
+        fetch_k = k * self.fetch_factor
+        while True:
+            hits = self.children.similarity_search_by_vector_with_relevance_scores(
+                embedding, k=fetch_k, filter=filter
+            )
+            parents = self._to_parents(hits, k)
+            if len(parents) >= k or len(hits) < fetch_k:
+                return parents
+            fetch_k *= 2
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+
+def create_small_to_big(
+    hierarchy: list[tuple[str, dict, list[str]]],
+    collection_name: str = "papers",
+    persist_directory: str | Path = CHROMA_DB_PATH,
+    hnsw: HNSWParams | None = None,
+    embeddings: Embeddings | None = None,
+) -> SmallToBigStore:
+    """
+    Store parents and embed their children.
+
+    Args:
+        hierarchy: (parent_text, parent_metadata, child_texts) triples, e.g.
+            from chunker.chunk_parents_and_children(); metadata needs 'source'
+        collection_name: Base name; children go in "<name>_children"
+        persist_directory: Directory for the Chroma files and the parent table
+        hnsw: HNSW parameters for the children collection
+        embeddings: Embedding model (default: get_embeddings())
+
+    Returns:
+        SmallToBigStore over the new index
+    """
+    parent_ids, parent_texts, parent_metadatas = [], [], []
+    children, child_metadatas = [], []
+    child_counts: dict[str, int] = {}
+    for parent_text, metadata, child_texts in hierarchy:
+        parent_id = make_chunk_id(parent_text, metadata, position=len(parent_ids))
+        parent_ids.append(parent_id)
+        parent_texts.append(parent_text)
+        parent_metadatas.append(metadata)
+        source = str(metadata.get("source", ""))
+        for child in child_texts:
+            child_id = child_counts.get(source, 0)
+            child_counts[source] = child_id + 1
+            children.append(child)
+            child_metadatas.append({
+                "source": source,
+                "page": metadata.get("page", ""),
+                "chunk_id": child_id,
+                "parent_id": parent_id,
+            })
+
+    parents = ParentStore(parent_store_path(persist_directory, collection_name))
+    parents.replace_sources(parent_ids, parent_texts, parent_metadatas)
+    vectorstore = create_vectorstore(
+        children,
+        child_metadatas,
+        collection_name=f"{collection_name}{CHILDREN_SUFFIX}",
+        persist_directory=persist_directory,
+        hnsw=hnsw,
+        embeddings=embeddings,
+    )
+    return SmallToBigStore(vectorstore, parents)
+
+
+def compact_parents(store: SmallToBigStore, live_sources: set[str] | None = None, dry_run: bool = False) -> int:
+    """
+    Delete parents that no stored child points to, or whose source is not live.
+
+    Run after compacting the children (vectorstore.compact_vectorstore).
+
+    Returns:
+        Number of parents removed (or that would be, with dry_run)
+    """
+    referenced = {
+        (metadata or {}).get("parent_id") for _, _, metadata, _ in iter_entries(store.children, include=["metadatas"])
+    }
+    orphans = [
+        parent_id
+        for parent_id, source in store.parents.entries()
+        if parent_id not in referenced or (live_sources is not None and source not in live_sources)
+    ]
+    if orphans and not dry_run:
+        store.parents.delete(orphans)
+    return len(orphans)
+
+
+def load_small_to_big(
+    collection_name: str = "papers",
+    persist_directory: str | Path = CHROMA_DB_PATH,
+    embeddings: Embeddings | None = None,
+) -> SmallToBigStore:
+    """Open an index built by create_small_to_big()."""
+    children = Chroma(
+        collection_name=f"{collection_name}{CHILDREN_SUFFIX}",
+        embedding_function=embeddings or get_embeddings(),
+        persist_directory=str(persist_directory),
+    )
+    return SmallToBigStore(children, ParentStore(parent_store_path(persist_directory, collection_name)))
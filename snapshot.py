@@ -0,0 +1,394 @@
+"""Single-file index snapshots for fast cold start and shipping.
+
+A snapshot packs a whole collection into one versioned file:
+
+    magic "RAGSNAP\\0" | version (u32) | header length (u32) | JSON header
+    | embeddings (contiguous float32, or int8 + per-row float32 scales)
+    | squared row norms (float32)
+    | chunk text (zlib-compressed blocks of TEXT_BLOCK_SIZE chunks)
+    | ids and metadata (one zlib-compressed JSON column per key)
+
+Sections are 64-byte aligned and the header records their offsets and a
+SHA-256 checksum of everything after the header. Opening a snapshot
+memory-maps the file, so startup costs a header parse, and worker
+processes opening the same file share its pages through the OS cache.
+Search is exact (brute force) over the mapped matrix.
+
+Snapshot provides similarity_search() and similarity_search_with_score(),
+so retrieve() and retrieve_with_scores() work on it unchanged.
+
+Usage:
+    uv run python snapshot.py export index.ragsnap [--quantize int8]
+    uv run python snapshot.py verify index.ragsnap
+    uv run python snapshot.py import index.ragsnap --persist-directory ./chroma_db
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from vectorstore import CHROMA_DB_PATH, EMBEDDING_MODEL, get_embeddings, iter_entries, load_vectorstore
+
+
+MAGIC = b"RAGSNAP\0"
+VERSION = 1
+ALIGN = 64
+TEXT_BLOCK_SIZE = 256
+TEXT_BLOCK_CACHE = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+
+class SnapshotError(ValueError):
+    """Raised for unreadable, unsupported or corrupted snapshot files."""
+
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization.
+
+    Returns:
+        (int8 codes, float32 scales) with vectors ~= codes * scales[:, None]
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def write_snapshot(
+    path: str | Path,
+    ids: list[str],
+    documents: list[str],
+    metadatas: list[dict],
+    embeddings: np.ndarray,
+    space: str = "l2",
+    quantize: str | None = None,
+) -> dict:
+    """
+    Write a snapshot file.
+
+    Args:
+        path: Output file; written to a temporary name then renamed
+        ids: Chunk IDs
+        documents: Chunk texts
+        metadatas: Chunk metadata dicts
+        embeddings: (n, d) embedding matrix
+        space: Distance function of the source collection ("l2", "cosine", "ip")
+        quantize: None for float32 vectors, "int8" for per-row int8
+
+    Returns:
+        The header written to the file
+    """
+    if not (len(ids) == len(documents) == len(metadatas) == len(embeddings)):
+        raise ValueError("ids, documents, metadatas and embeddings must be same length")
+    if quantize not in (None, "int8"):
+        raise ValueError(f"Unknown quantization {quantize!r}")
+
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+    sections: list[tuple[str, bytes]] = []
+    if quantize == "int8":
+        codes, scales = quantize_int8(vectors)
+        sections.append(("embeddings", codes.tobytes()))
+        sections.append(("scales", scales.tobytes()))
+        stored = codes.astype(np.float32) * scales[:, None]
+    else:
+        sections.append(("embeddings", vectors.tobytes()))
+        stored = vectors
+    sections.append(("norms", (stored ** 2).sum(axis=1).astype(np.float32).tobytes()))
+
+    text_blocks = []
+    for start in range(0, len(documents), TEXT_BLOCK_SIZE):
+        block = json.dumps(documents[start:start + TEXT_BLOCK_SIZE]).encode()
+        text_blocks.append(zlib.compress(block, 6))
+    block_offsets = np.cumsum([0] + [len(b) for b in text_blocks]).astype(np.int64)
+    sections.append(("text_offsets", block_offsets.tobytes()))
+    sections.append(("text", b"".join(text_blocks)))
+
+    keys = sorted({key for metadata in metadatas for key in metadata})
+    sections.append(("col:__id__", zlib.compress(json.dumps(ids).encode(), 6)))
+    for key in keys:
+        column = [metadata.get(key) for metadata in metadatas]
+        sections.append((f"col:{key}", zlib.compress(json.dumps(column).encode(), 6)))
+
+    payload = bytearray()
+    layout = {}
+    for name, data in sections:
+        payload += b"\0" * _pad(len(payload))
+        layout[name] = [len(payload), len(data)]
+        payload += data
+
+    header = {
+        "version": VERSION,
+        "count": len(ids),
+        "dim": int(vectors.shape[1]) if len(ids) else 0,
+        "dtype": "int8" if quantize == "int8" else "float32",
+        "space": space,
+        "model": EMBEDDING_MODEL,
+        "text_block_size": TEXT_BLOCK_SIZE,
+        "metadata_keys": keys,
+        "sections": layout,
+        "checksum": hashlib.sha256(payload).hexdigest(),
+    }
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b" " * _pad(_PREAMBLE.size + len(header_bytes))
+
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(payload)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return header
+
+
+class Snapshot:
+    """A memory-mapped snapshot, searchable like a vector store.
+
+    Args:
+        path: Snapshot file
+        embedding_function: Query embedder (default: get_embeddings(), on first query)
+        verify: Check the payload checksum on open (reads the whole file)
+    """
+
+    def __init__(self, path: str | Path, embedding_function: Embeddings | None = None, verify: bool = False):
+        self.path = Path(path)
+        self._embedding_function = embedding_function
+        self._columns: dict[str, list] = {}
+        self._blocks: dict[int, list[str]] = {}
+        self.embeddings = self.scales = self.norms = self._text_offsets = None
+        self._file = open(self.path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise SnapshotError(f"{self.path} is empty") from e
+
+        try:
+            self._open(verify)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self, verify: bool) -> None:
+        """Validate the preamble and header and map the arrays."""
+        if len(self._mmap) < _PREAMBLE.size:
+            raise SnapshotError(f"{self.path} is truncated")
+        magic, version, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a snapshot file")
+        if version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version} (expected {VERSION})")
+        self.header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        self._base = _PREAMBLE.size + header_len
+        if verify:
+            self.verify()
+
+        count, dim = self.header["count"], self.header["dim"]
+        dtype = np.int8 if self.header["dtype"] == "int8" else np.float32
+        self.embeddings = self._array("embeddings", dtype).reshape(count, dim)
+        self.scales = self._array("scales", np.float32) if "scales" in self.header["sections"] else None
+        self.norms = self._array("norms", np.float32)
+        self._text_offsets = self._array("text_offsets", np.int64)
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    def _section(self, name: str) -> memoryview:
+        offset, length = self.header["sections"][name]
+        start = self._base + offset
+        return memoryview(self._mmap)[start:start + length]
+
+    def _array(self, name: str, dtype) -> np.ndarray:
+        return np.frombuffer(self._section(name), dtype=dtype)
+
+    def verify(self) -> None:
+        """Raise SnapshotError if the payload does not match its checksum."""
+        digest = hashlib.sha256(memoryview(self._mmap)[self._base:]).hexdigest()
+        if digest != self.header["checksum"]:
+            raise SnapshotError(f"{self.path} failed checksum validation")
+
+    def column(self, key: str) -> list:
+        """Decompress one metadata column ("__id__" for chunk IDs)."""
+        if key not in self._columns:
+            self._columns[key] = json.loads(zlib.decompress(self._section(f"col:{key}")))
+        return self._columns[key]
+
+    @property
+    def ids(self) -> list[str]:
+        return self.column("__id__")
+
+    def _text_block(self, block: int) -> list[str]:
+        if block not in self._blocks:
+            if len(self._blocks) >= TEXT_BLOCK_CACHE:
+                self._blocks.pop(next(iter(self._blocks)))
+            start, end = self._text_offsets[block], self._text_offsets[block + 1]
+            self._blocks[block] = json.loads(zlib.decompress(self._section("text")[start:end]))
+        return self._blocks[block]
+
+    def text(self, i: int) -> str:
+        block, offset = divmod(i, self.header["text_block_size"])
+        return self._text_block(block)[offset]
+
+    def metadata(self, i: int) -> dict:
+        metadata = {}
+        for key in self.header["metadata_keys"]:
+            value = self.column(key)[i]
+            if value is not None:
+                metadata[key] = value
+        return metadata
+
+    def document(self, i: int) -> Document:
+        return Document(page_content=self.text(i), metadata=self.metadata(i))
+
+    def distances(self, embedding: list[float]) -> np.ndarray:
+        """Distance from a query vector to every stored vector, as Chroma computes it."""
+        query = np.asarray(embedding, dtype=np.float32)
+        dots = self.embeddings @ query if self.scales is None else (self.embeddings @ query) * self.scales
+        space = self.header["space"]
+        if space == "l2":
+            return self.norms - 2 * dots + query @ query
+        if space == "cosine":
+            return 1 - dots / (np.sqrt(self.norms) * np.linalg.norm(query) + 1e-12)
+        return 1 - dots
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: list[float], k: int = 4, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        """Exact top-k search over the mapped embeddings.
+
+        `filter` supports equality on metadata keys, e.g. {"source": "a.pdf"}.
+        """
+        if len(self) == 0:
+            return []
+        distances = self.distances(embedding)
+        if filter:
+            mask = np.ones(len(self), dtype=bool)
+            for key, value in filter.items():
+                column = self.column(key) if key in self.header["metadata_keys"] else [None] * len(self)
+                mask &= np.array([v == value for v in column])
+            distances = np.where(mask, distances, np.inf)
+        k = min(k, len(self))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(self.document(int(i)), float(distances[i])) for i in top if np.isfinite(distances[i])]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        if self._embedding_function is None:
+            self._embedding_function = get_embeddings()
+        embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def close(self) -> None:
+        """Unmap and close the file.
+
+        Arrays taken from the snapshot (e.g. `snap.embeddings`) are views of
+        the map. If a caller still holds one, the map cannot be closed yet;
+        it is then unmapped when the last such array is garbage collected.
+        """
+        self._blocks.clear()
+        self._columns.clear()
+        self.embeddings = self.scales = self.norms = self._text_offsets = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                logger.debug(f"{self.path} still has arrays in use; unmapping when they are released")
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_snapshot(vectorstore: Chroma, path: str | Path, quantize: str | None = None) -> dict:
+    """Write every entry of a Chroma store to a snapshot file."""
+    ids, documents, metadatas, embeddings = [], [], [], []
+    for entry_id, document, metadata, embedding in iter_entries(
+        vectorstore, include=["documents", "metadatas", "embeddings"]
+    ):
+        ids.append(entry_id)
+        documents.append(document or "")
+        metadatas.append(metadata or {})
+        embeddings.append(embedding)
+    space = (vectorstore._collection.metadata or {}).get("hnsw:space", "l2")
+    return write_snapshot(path, ids, documents, metadatas, np.asarray(embeddings), space=space, quantize=quantize)
+
+
+def import_snapshot(
+    path: str | Path, collection_name: str = "papers", persist_directory: str | Path = CHROMA_DB_PATH
+) -> Chroma:
+    """Load a snapshot into a Chroma collection, reusing its stored embeddings."""
+    with Snapshot(path, verify=True) as snap:
+        vectorstore = load_vectorstore(collection_name, persist_directory)
+        vectors = snap.embeddings.astype(np.float32)
+        if snap.scales is not None:
+            vectors *= snap.scales[:, None]
+        ids = snap.ids
+        for start in range(0, len(snap), 1000):
+            end = min(start + 1000, len(snap))
+            vectorstore._collection.upsert(
+                ids=ids[start:end],
+                embeddings=vectors[start:end],
+                documents=[snap.text(i) for i in range(start, end)],
+                metadatas=[snap.metadata(i) or None for i in range(start, end)],
+            )
+    return vectorstore
+
+
+def main(argv: list[str] | None = None):
+    """Export, import or verify index snapshots."""
+    parser = argparse.ArgumentParser(description="Single-file index snapshots.")
+    parser.add_argument("--collection", default="papers")
+    parser.add_argument("--persist-directory", type=Path, default=CHROMA_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write the vector store to a snapshot")
+    export.add_argument("path", type=Path)
+    export.add_argument("--quantize", choices=["int8"], default=None)
+    load = commands.add_parser("import", help="Load a snapshot into the vector store")
+    load.add_argument("path", type=Path)
+    verify = commands.add_parser("verify", help="Validate a snapshot's checksum")
+    verify.add_argument("path", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        header = export_snapshot(load_vectorstore(args.collection, args.persist_directory), args.path, args.quantize)
+        size = args.path.stat().st_size
+        logger.info(f"Wrote {header['count']} chunks ({header['dtype']}) to {args.path}: {size / 1024 / 1024:.2f} MiB")
+    elif args.command == "import":
+        vectorstore = import_snapshot(args.path, args.collection, args.persist_directory)
+        logger.info(f"Imported into {args.persist_directory}: {vectorstore._collection.count()} chunks")
+    else:
+        with Snapshot(args.path) as snap:
+            snap.verify()
+            print(f"{args.path}: OK (v{snap.header['version']}, {len(snap)} chunks, "
+                  f"dim {snap.header['dim']}, {snap.header['dtype']}, space {snap.header['space']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Tests for adaptive_retrieval module."""
+
+import pytest
+from adaptive_retrieval import cut_hits, retrieve_adaptive
+from tokens import estimate_tokens
+from langchain_core.documents import Document
+
+
+def make_hits(distances, text="x" * 40):
+    return [(Document(page_content=text, metadata={"rank": i}), d) for i, d in enumerate(distances)]
+
+
+class TestCutHits:
+    def test_keeps_all_when_nothing_fires(self):
+        """Test that a smooth, close list is kept whole."""
+        kept, cut = cut_hits(make_hits([0.30, 0.32, 0.34, 0.36]))
+
+        assert len(kept) == 4
+        assert (cut.fetched, cut.kept, cut.reason) == (4, 4, "max_k")
+
+    def test_distance_threshold(self):
+        """Test that hits beyond max_distance are dropped."""
+        kept, cut = cut_hits(make_hits([0.5, 0.55, 0.6, 1.2]), max_distance=1.0, max_gap=None)
+
+        assert [doc.metadata["rank"] for doc, _ in kept] == [0, 1, 2]
+        assert cut.reason == "distance"
+
+    def test_score_gap(self):
+        """Test that a relative jump in distance ends the list."""
+        kept, cut = cut_hits(make_hits([0.20, 0.22, 0.45, 0.46]), max_gap=0.25)
+
+        assert len(kept) == 2
+        assert cut.reason == "gap"
+
+    def test_token_ceiling(self):
+        """Test that the token ceiling caps the kept context."""
+        kept, cut = cut_hits(make_hits([0.3] * 5, text="x" * 400), max_gap=None, max_tokens=250)
+
+        assert len(kept) == 2
+        assert cut.tokens == 2 * estimate_tokens("x" * 400) <= 250
+        assert cut.reason == "tokens"
+
+    def test_min_k(self):
+        """Test that min_k hits are kept even when they fail every cutoff."""
+        kept, cut = cut_hits(make_hits([1.5, 1.6, 1.7]), max_distance=1.0, min_k=2)
+
+        assert len(kept) == 2
+        assert cut.reason == "distance"
+
+    def test_empty(self):
+        """Test that no hits gives an empty cut."""
+        kept, cut = cut_hits([])
+        assert kept == [] and cut.kept == 0 and cut.fetched == 0
+
+
+class TestRetrieveAdaptive:
+    def test_over_fetches_then_cuts(self):
+        """Test that retrieve_adaptive fetches max_k and reports the cut."""
+
+        class Store:
+            def similarity_search_with_score(self, query, k=4):
+                self.k = k
+                return make_hits([0.1, 0.11, 0.9, 0.95, 1.0][:k])
+
+        store = Store()
+        kept, cut = retrieve_adaptive(store, "query", max_k=5)
+
+        assert store.k == 5
+        assert len(kept) == 2
+        assert cut.distances == pytest.approx([0.1, 0.11, 0.9, 0.95, 1.0])
+        assert "kept 2/5" in cut.describe()
@@ -0,0 +1,156 @@
+"""Tests for async_retrieval module."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from async_retrieval import QueryBatcher, aretrieve, aretrieve_with_scores
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds text as [len(text)], recording each call's batch."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches: list[list[str]] = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class FakeStore:
+    """Returns one document per search, naming the thread it ran on."""
+
+    def __init__(self, embeddings, delay: float = 0.0):
+        self._embedding_function = embeddings
+        self.delay = delay
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, filter=None):
+        time.sleep(self.delay)
+        doc = Document(page_content=f"len={embedding[0]:.0f}", metadata={"thread": threading.current_thread().name})
+        return [(doc, 0.5)][:k]
+
+
+class TestAsyncRetrieval:
+    def test_returns_documents_off_loop(self):
+        """Test that search runs on the retrieval pool, not the event loop thread."""
+        store = FakeStore(CountingEmbeddings())
+
+        docs = asyncio.run(aretrieve(store, "abc", k=1))
+
+        assert docs[0].page_content == "len=3"
+        assert docs[0].metadata["thread"].startswith("retrieval")
+
+    def test_concurrent_queries_share_one_embedding_call(self):
+        """Test that queries arriving within the window are embedded together."""
+        embeddings = CountingEmbeddings()
+        store = FakeStore(embeddings)
+        batcher = QueryBatcher(embeddings, window_ms=50)
+
+        async def run():
+            queries = ["a", "bb", "ccc", "dddd"]
+            return await asyncio.gather(*(aretrieve_with_scores(store, q, batcher=batcher) for q in queries))
+
+        results = asyncio.run(run())
+
+        assert [hits[0][0].page_content for hits in results] == ["len=1", "len=2", "len=3", "len=4"]
+        assert embeddings.batches == [["a", "bb", "ccc", "dddd"]]
+        assert (batcher.calls, batcher.queries) == (1, 4)
+
+    def test_max_batch_flushes_early(self):
+        """Test that a full batch is embedded without waiting for the window."""
+        embeddings = CountingEmbeddings()
+        batcher = QueryBatcher(embeddings, window_ms=10_000, max_batch=2)
+
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(batcher.embed("a"), batcher.embed("bb")), 1.0)
+
+        assert asyncio.run(run()) == [[1.0], [2.0]]
+
+    def test_timeout(self):
+        """Test that a slow search raises TimeoutError."""
+        store = FakeStore(CountingEmbeddings(), delay=0.5)
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(aretrieve(store, "abc", timeout=0.05))
+
+    def test_cancelled_query_dropped_from_batch(self):
+        """Test that a query cancelled inside the window is not embedded."""
+        embeddings = CountingEmbeddings()
+        batcher = QueryBatcher(embeddings, window_ms=50)
+
+        async def run():
+            cancelled = asyncio.create_task(batcher.embed("gone"))
+            kept = asyncio.create_task(batcher.embed("kept"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            return await kept
+
+        assert asyncio.run(run()) == [4.0]
+        assert embeddings.batches == [["kept"]]
+
+    def test_embedding_error_propagates(self):
+        """Test that an embedding failure reaches every caller in the batch."""
+
+        class Failing(CountingEmbeddings):
+            def embed_documents(self, texts):
+                raise RuntimeError("model unavailable")
+
+        batcher = QueryBatcher(Failing(), window_ms=10)
+
+        async def run():
+            return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_batcher_survives_closed_loop(self):
+        """Test that a window abandoned by a finished loop does not block the next one."""
+        embeddings = CountingEmbeddings()
+        batcher = QueryBatcher(embeddings, window_ms=200)
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(asyncio.wait_for(batcher.embed("first"), 0.01))
+
+        assert asyncio.run(asyncio.wait_for(batcher.embed("abc"), 1.0)) == [3.0]
+
+    def test_loops_in_threads_get_own_batchers(self):
+        """Test that event loops in different threads sharing an embedder do not share a batcher."""
+        embeddings = CountingEmbeddings(delay=0.05)
+        store = FakeStore(embeddings)
+        results = {}
+
+        def run(name):
+            results[name] = asyncio.run(aretrieve(store, name, k=1))
+
+        threads = [threading.Thread(target=run, args=(name,)) for name in ("a", "bb", "ccc")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert {name: docs[0].page_content for name, docs in results.items()} == {
+            "a": "len=1",
+            "bb": "len=2",
+            "ccc": "len=3",
+        }
+
+    def test_batcher_rejects_foreign_loop(self):
+        """Test that a batcher in use by a live loop cannot be used from another."""
+        batcher = QueryBatcher(CountingEmbeddings())
+        first = asyncio.new_event_loop()
+        try:
+            assert first.run_until_complete(batcher.embed("abc")) == [3.0]
+            with pytest.raises(RuntimeError, match="another event loop"):
+                asyncio.run(batcher.embed("abc"))
+        finally:
+            first.close()
+        assert asyncio.run(batcher.embed("abc")) == [3.0]
@@ -0,0 +1,131 @@
+"""Tests for centroid_index module."""
+
+import tempfile
+
+import numpy as np
+import pytest
+from centroid_index import (
+    build_centroid_index,
+    chunk_fingerprint,
+    load_centroid_index,
+    measure_recall_loss,
+    retrieve_coarse_to_fine,
+)
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from loguru import logger
+from vectorstore import create_vectorstore
+
+
+@pytest.fixture
+def corpus():
+    """Chunks from three papers, two chunks each."""
+    chunks = [
+        "RAG combines retrieval with generation to reduce hallucination.",
+        "Retrieved passages condition the generator on external memory.",
+        "Vector databases store embeddings for fast similarity search.",
+        "Approximate nearest neighbour indexes trade recall for speed.",
+        "Chain-of-thought prompting improves reasoning capabilities.",
+        "Intermediate reasoning steps help on arithmetic word problems.",
+    ]
+    metadatas = [
+        {"source": "rag.pdf", "chunk_id": 0, "page": 1},
+        {"source": "rag.pdf", "chunk_id": 1, "page": 2},
+        {"source": "vdb.pdf", "chunk_id": 0, "page": 1},
+        {"source": "vdb.pdf", "chunk_id": 1, "page": 1},
+        {"source": "cot.pdf", "chunk_id": 0, "page": 1},
+        {"source": "cot.pdf", "chunk_id": 1, "page": 3},
+    ]
+    return chunks, metadatas
+
+
+class TestCentroidIndex:
+    def test_one_centroid_per_source(self, corpus):
+        """Test that centroids are built per paper."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            vs = create_vectorstore(*corpus, persist_directory=tmpdir)
+            centroids = build_centroid_index(vs)
+
+            assert centroids._collection.count() == 3
+            assert load_centroid_index(vs)._collection.count() == 3
+
+    def test_one_centroid_per_page(self, corpus):
+        """Test that page grouping gives one centroid per (source, page)."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            vs = create_vectorstore(*corpus, persist_directory=tmpdir)
+            assert build_centroid_index(vs, group_by="page")._collection.count() == 5
+
+    def test_retrieves_from_nearest_documents(self, corpus):
+        """Test that fine search only returns chunks of the selected papers."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            vs = create_vectorstore(*corpus, persist_directory=tmpdir)
+            centroids = build_centroid_index(vs)
+
+            results = retrieve_coarse_to_fine(vs, centroids, "chain of thought reasoning", k=3, fan_out=1)
+
+            assert 1 <= len(results) <= 2
+            assert len({doc.metadata["source"] for doc, _ in results}) == 1
+
+    def test_full_fan_out_matches_flat(self, corpus):
+        """Test that searching every document loses no recall."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            vs = create_vectorstore(*corpus, persist_directory=tmpdir)
+            centroids = build_centroid_index(vs)
+
+            report = measure_recall_loss(vs, centroids, ["What is RAG?", "reasoning"], k=2, fan_out=3)
+
+            assert report["recall"] == 1.0
+            assert report["recall_loss"] == 0.0
+
+
+class TestCentroidMaintenance:
+    @pytest.fixture
+    def vs(self, corpus, tmp_path):
+        return create_vectorstore(*corpus, persist_directory=tmp_path, embeddings=DeterministicFakeEmbedding(size=16))
+
+    def test_centroids_are_unit_length(self, vs):
+        """Test that centroids are normalized like the chunk embeddings."""
+        stored = build_centroid_index(vs)._collection.get(include=["embeddings"])["embeddings"]
+
+        assert np.allclose(np.linalg.norm(stored, axis=1), 1.0)
+
+    def test_missing_index(self, vs):
+        """Test that loading before building is a clear error."""
+        with pytest.raises(ValueError, match="centroid_index.py build"):
+            load_centroid_index(vs)
+
+    def test_warns_when_chunks_changed(self, vs):
+        """Test that the centroid index records the chunks it was built from."""
+        build_centroid_index(vs)
+        fingerprint = chunk_fingerprint(vs)
+        messages = []
+        handler = logger.add(messages.append, level="WARNING")
+        try:
+            load_centroid_index(vs)
+            assert messages == []
+
+            vs.add_texts(["A new paper about retrieval."], metadatas=[{"source": "new.pdf"}], ids=["new"])
+            load_centroid_index(vs)
+        finally:
+            logger.remove(handler)
+
+        assert fingerprint.startswith("6:")
+        assert "stale" in messages[0]
+
+    def test_query_time_load_skips_full_fingerprint(self, vs, monkeypatch):
+        """Test that only verify=True pages through the chunk IDs."""
+        build_centroid_index(vs)
+        vs.delete(ids=[vs._collection.get(limit=1)["ids"][0]])
+        vs.add_texts(["A replacement chunk."], metadatas=[{"source": "new.pdf"}], ids=["new"])
+        messages = []
+        handler = logger.add(messages.append, level="WARNING")
+        try:
+            with monkeypatch.context() as patched:
+                patched.setattr("centroid_index.chunk_fingerprint", lambda _: pytest.fail("fingerprint on load"))
+                load_centroid_index(vs)
+            assert messages == []
+
+            load_centroid_index(vs, verify=True)
+        finally:
+            logger.remove(handler)
+
+        assert "stale" in messages[0]
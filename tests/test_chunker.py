@@ -1,7 +1,17 @@
 """Tests for chunker module."""
 
+import re
+
 import pytest
-from chunker import chunk_document, chunk_by_paragraphs
+from chunker import (
+    chunk_by_paragraphs,
+    chunk_document,
+    chunk_document_tokens,
+    chunk_pages,
+    chunk_parents_and_children,
+    count_truncated,
+    sentence_windows,
+)
 
 
 class TestChunkDocument:
@@ -71,3 +81,120 @@ class TestChunkByParagraphs:
         chunks = chunk_by_paragraphs(text, max_chunk_size=60)
 
         assert all(len(c) <= 60 for c in chunks)
+
+
+class TestChunkPages:
+    def test_tags_pages(self):
+        """Test that chunks carry the page they start on."""
+        pages = [(1, "Alpha one. Alpha two."), (2, "Beta one. Beta two. Beta three is longer.")]
+        chunks = list(chunk_pages(pages, chunk_size=40, overlap=5))
+
+        assert chunks[0][1] == 1
+        assert chunks[-1][1] == 2
+        assert all(len(c) <= 40 for c, _ in chunks)
+
+    def test_spans_page_breaks(self):
+        """Test that short pages are merged into one chunk."""
+        chunks = list(chunk_pages([(1, "One."), (2, "Two."), (3, "Three.")], chunk_size=100))
+
+        assert len(chunks) == 1
+        assert chunks[0][1] == 1
+        assert "One." in chunks[0][0] and "Three." in chunks[0][0]
+
+    def test_skips_empty_pages(self):
+        """Test that blank pages produce no chunks."""
+        assert list(chunk_pages([(1, ""), (2, "   ")])) == []
+
+    def test_consumes_lazily(self):
+        """Test that pages are pulled one at a time."""
+        pulled = []
+
+        def pages():
+            for n in range(1, 4):
+                pulled.append(n)
+                yield n, "Sentence number %d is here. " % n * 20
+
+        stream = chunk_pages(pages(), chunk_size=100, overlap=10)
+        next(stream)
+        assert pulled == [1]
+
+
+def word_encode(texts):
+    """Whitespace tokenizer returning per-token character offsets, batched."""
+    word_encode.calls += 1
+    return [[m.span() for m in re.finditer(r"\S+", text)] for text in texts]
+
+
+word_encode.calls = 0
+
+
+class TestChunkDocumentTokens:
+    def test_chunks_fit_token_budget(self):
+        """Test that every chunk fits max_tokens and sentences stay whole."""
+        text = " ".join(f"Sentence {i} has five words." for i in range(20))
+        chunks = chunk_document_tokens(text, word_encode, max_tokens=12, overlap=0)
+
+        assert all(len(chunk.split()) <= 12 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert len(chunks) == 10  # two five-word sentences per chunk
+
+    def test_sentence_overlap(self):
+        """Test that whole trailing sentences within the overlap budget are repeated."""
+        text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+        chunks = chunk_document_tokens(text, word_encode, max_tokens=6, overlap=3)
+
+        assert chunks[0] == "One two three. Four five six."
+        assert chunks[1].startswith("Four five six.")
+
+    def test_long_sentence_split_by_tokens(self):
+        """Test that a sentence over the budget is split into overlapping token windows."""
+        text = " ".join(f"w{i}" for i in range(25)) + "."
+        chunks = chunk_document_tokens(text, word_encode, max_tokens=10, overlap=2)
+
+        assert all(len(chunk.split()) <= 10 for chunk in chunks)
+        assert chunks[0].split()[-2:] == chunks[1].split()[:2]
+        assert chunks[-1].endswith("w24.")
+
+    def test_tokenizes_in_one_batch(self):
+        """Test that all sentences of a document are tokenized in one call."""
+        word_encode.calls = 0
+        chunk_document_tokens("A b. C d. E f. G h.", word_encode, max_tokens=4)
+        assert word_encode.calls == 1
+
+    def test_empty(self):
+        """Test that empty text gives no chunks."""
+        assert chunk_document_tokens("  ", word_encode, max_tokens=10) == []
+
+    def test_count_truncated(self):
+        """Test counting chunks over the token limit."""
+        chunks = ["a b c", "a b c d e f", "a"]
+        assert count_truncated(chunks, word_encode, max_tokens=4) == 1
+
+    def test_chunk_pages_with_encoder(self):
+        """Test that chunk_pages measures in tokens when given an encoder."""
+        pages = [(1, "One two three. Four five six."), (2, "Seven eight nine. Ten eleven twelve.")]
+        chunks = list(chunk_pages(pages, chunk_size=6, overlap=0, encode=word_encode))
+
+        assert [page for _, page in chunks] == [1, 2]
+        assert all(len(chunk.split()) <= 6 for chunk, _ in chunks)
+
+
+class TestHierarchy:
+    def test_sentence_windows(self):
+        """Test that windows cover every sentence and end with the last one."""
+        assert sentence_windows("A. B. C. D. E.", window=2) == ["A. B.", "C. D.", "D. E."]
+        assert sentence_windows("A. B. C.", window=2, step=1) == ["A. B.", "B. C."]
+        assert sentence_windows("Only one.", window=3) == ["Only one."]
+        assert sentence_windows("") == []
+
+    def test_parents_are_paragraphs(self):
+        """Test that parents come from chunk_by_paragraphs and children from their sentences."""
+        pages = [(1, "First para. Still first.\n\nSecond para here."), (2, "Page two text.")]
+        hierarchy = list(chunk_parents_and_children(pages, max_parent_size=30, window=1))
+
+        assert [(parent, page) for parent, page, _ in hierarchy] == [
+            ("First para. Still first.", 1),
+            ("Second para here.", 1),
+            ("Page two text.", 2),
+        ]
+        assert hierarchy[0][2] == ["First para.", "Still first."]
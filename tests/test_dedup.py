@@ -0,0 +1,79 @@
+"""Tests for dedup module."""
+
+import pytest
+from dedup import (
+    MinHasher,
+    StreamingDeduper,
+    estimate_jaccard,
+    shingles,
+)
+
+
+LICENSE = "This work is licensed under a Creative Commons Attribution 4.0 International License."
+ABSTRACT = "Retrieval augmented generation combines a parametric model with a non-parametric memory."
+COT = "Chain of thought prompting elicits intermediate reasoning steps from large language models."
+
+
+class TestMinHash:
+    def test_identical_texts_match(self):
+        """Test identical texts get identical signatures."""
+        hasher = MinHasher(num_perm=64)
+        assert estimate_jaccard(hasher.signature(shingles(ABSTRACT)), hasher.signature(shingles(ABSTRACT))) == 1.0
+
+    def test_different_texts_differ(self):
+        """Test unrelated texts have low estimated similarity."""
+        hasher = MinHasher(num_perm=128)
+        assert estimate_jaccard(hasher.signature(shingles(ABSTRACT)), hasher.signature(shingles(COT))) < 0.2
+
+    def test_short_text_single_shingle(self):
+        """Test texts shorter than the shingle size."""
+        assert shingles("Hello world") == {"hello world"}
+
+
+class TestStreamingDeduper:
+    def test_groups_near_duplicates(self):
+        """Test that case and punctuation differences still match."""
+        deduper = StreamingDeduper()
+        texts = [LICENSE, ABSTRACT, LICENSE.upper(), COT, LICENSE + " "]
+        sources = ["a.pdf", "a.pdf", "b.pdf", "b.pdf", "c.pdf"]
+
+        kept = deduper.keep(texts, [{"source": s} for s in sources], [str(i) for i in range(5)])
+
+        assert kept == [0, 1, 3]
+        assert deduper.removed == 2
+        assert deduper.merged() == (["0"], [{"source": "a.pdf", "sources": "a.pdf; b.pdf; c.pdf", "duplicates": 3}])
+
+    def test_no_duplicates(self):
+        """Test that distinct chunks are all kept with nothing to merge."""
+        deduper = StreamingDeduper()
+
+        assert deduper.keep([ABSTRACT, COT], [{"source": "a.pdf"}, {"source": "b.pdf"}], ["a", "b"]) == [0, 1]
+        assert deduper.merged() == ([], [])
+
+    def test_bands_must_divide_num_perm(self):
+        """Test invalid banding is rejected."""
+        with pytest.raises(ValueError):
+            StreamingDeduper(num_perm=100, bands=32)
+
+    def test_across_batches(self):
+        """Test that duplicates are found across batches and reported on the kept chunk."""
+        deduper = StreamingDeduper()
+
+        assert deduper.keep([LICENSE, ABSTRACT], [{"source": "a.pdf"}, {"source": "a.pdf"}], ["a0", "a1"]) == [0, 1]
+        assert deduper.keep([COT, LICENSE.upper()], [{"source": "b.pdf"}, {"source": "b.pdf"}], ["b0", "b1"]) == [0]
+
+        assert deduper.removed == 1
+        assert deduper.merged() == (["a0"], [{"source": "a.pdf", "sources": "a.pdf; b.pdf", "duplicates": 2}])
+
+    def test_duplicates_within_batch(self):
+        """Test that a batch is also checked against itself."""
+        deduper = StreamingDeduper()
+        metadatas = [{"source": "a.pdf"}] * 3
+
+        assert deduper.keep([LICENSE, LICENSE + " ", ABSTRACT], metadatas, ["0", "1", "2"]) == [0, 2]
+        assert deduper.merged()[1][0]["duplicates"] == 2
+
+    def test_length_mismatch(self):
+        """Test mismatched inputs are rejected."""
+        with pytest.raises(ValueError):
+            StreamingDeduper().keep([ABSTRACT], [{"source": "a.pdf"}], [])
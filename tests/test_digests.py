@@ -0,0 +1,138 @@
+"""Tests for digests module."""
+
+from unittest.mock import Mock
+
+import pytest
+from digests import build_digests, extractive_digest
+from vectorstore import create_vectorstore
+from generator import generate_answer_with_citations, select_context
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from loguru import logger
+
+TEXT = (
+    "Retrieval-augmented generation conditions a generator on retrieved passages. "
+    "The weather was pleasant that day. "
+    "The retriever finds passages and the generator reads retrieved passages to answer. "
+    "Results are shown in Table 3."
+)
+
+
+@pytest.fixture
+def vectorstore(tmp_path):
+    store = Chroma(
+        collection_name="papers",
+        embedding_function=DeterministicFakeEmbedding(size=16),
+        persist_directory=str(tmp_path / "db"),
+    )
+    store.add_texts([TEXT, "Short chunk."], metadatas=[{"source": "a.pdf"}, {"source": "b.pdf"}], ids=["a", "b"])
+    return store
+
+
+class TestExtractiveDigest:
+    def test_picks_central_sentences_in_order(self):
+        """Test that the sentences sharing the chunk's key terms are kept, in order."""
+        digest = extractive_digest(TEXT, max_sentences=2)
+
+        assert digest == (
+            "Retrieval-augmented generation conditions a generator on retrieved passages. "
+            "The retriever finds passages and the generator reads retrieved passages to answer."
+        )
+
+    def test_short_text_unchanged(self):
+        """Test that a chunk with few sentences is its own digest."""
+        assert extractive_digest("One sentence.", max_sentences=2) == "One sentence."
+
+
+class TestBuildDigests:
+    def test_extractive_stored_in_metadata(self, vectorstore):
+        """Test that digests are merged into chunk metadata."""
+        assert build_digests(vectorstore, max_sentences=1) == 2
+
+        stored = vectorstore._collection.get(ids=["a"], include=["metadatas"])["metadatas"][0]
+        assert stored["source"] == "a.pdf"
+        assert stored["digest_method"] == "extractive"
+        assert stored["digest"] == "The retriever finds passages and the generator reads retrieved passages to answer."
+
+    def test_skips_existing(self, vectorstore):
+        """Test that chunks with digests are skipped unless forced."""
+        build_digests(vectorstore)
+        assert build_digests(vectorstore) == 0
+        assert build_digests(vectorstore, force=True) == 2
+
+    def test_llm_batch_job(self, vectorstore, tmp_path):
+        """Test LLM digests through generate_many, with a checkpoint."""
+        llm = Mock()
+        llm.batch.side_effect = lambda prompts, **kwargs: [Mock(content=f" Summary {i}. ") for i in range(len(prompts))]
+
+        assert build_digests(vectorstore, method="llm", llm=llm, checkpoint_path=tmp_path / "d.jsonl") == 2
+
+        stored = vectorstore._collection.get(include=["metadatas"])["metadatas"]
+        assert sorted(m["digest"] for m in stored) == ["Summary 0.", "Summary 1."]
+        assert "Passage:" in llm.batch.call_args[0][0][0]
+        assert len((tmp_path / "d.jsonl").read_text().splitlines()) == 2
+
+    def test_survive_reindex_of_unchanged_chunks(self, tmp_path):
+        """Test that re-indexing keeps digests of unchanged chunks and drops those of edited ones."""
+        embeddings = DeterministicFakeEmbedding(size=16)
+        persist = tmp_path / "db"
+        metadatas = [{"source": "a.pdf", "chunk_id": 0}, {"source": "a.pdf", "chunk_id": 1}]
+        store = create_vectorstore([TEXT, "Short chunk."], metadatas, persist_directory=persist, embeddings=embeddings)
+        assert build_digests(store) == 2
+
+        store = create_vectorstore([TEXT, "Edited chunk."], metadatas, persist_directory=persist, embeddings=embeddings)
+
+        stored = store._collection.get(include=["documents", "metadatas"])
+        digests = {doc: meta.get("digest") for doc, meta in zip(stored["documents"], stored["metadatas"])}
+        assert digests == {TEXT: extractive_digest(TEXT), "Edited chunk.": None}
+        assert build_digests(store) == 1
+
+    def test_unknown_method(self, vectorstore):
+        with pytest.raises(ValueError, match="method"):
+            build_digests(vectorstore, method="abstractive")
+
+
+class TestSelectContext:
+    def docs(self):
+        long_text = "word " * 200
+        return [
+            Document(page_content=long_text, metadata={"source": f"p{i}.pdf", "digest": f"Digest {i}."})
+            for i in range(3)
+        ]
+
+    def test_lowest_ranked_summarized_first(self):
+        """Test that digests replace full text from the bottom until the budget fits."""
+        selected = select_context(self.docs(), max_tokens=600)
+
+        assert [doc.page_content for doc in selected[1:]] == ["word " * 200, "Digest 2."]
+        assert [doc.metadata["source"] for doc in selected] == ["p0.pdf", "p1.pdf", "p2.pdf"]
+
+    def test_warns_when_digests_missing(self):
+        """Test that an over-budget context without digests is sent whole, with a warning."""
+        messages = []
+        handler = logger.add(messages.append, level="WARNING")
+        try:
+            docs = [Document(page_content="word " * 200, metadata={"source": "p0.pdf"})]
+            assert select_context(docs, max_tokens=10)[0].page_content == "word " * 200
+        finally:
+            logger.remove(handler)
+
+        assert "no digest" in messages[0]
+
+    def test_within_budget_unchanged(self):
+        """Test that full text is kept when it fits."""
+        docs = self.docs()
+        assert [d.page_content for d in select_context(docs, 10_000)] == [d.page_content for d in docs]
+
+    def test_citation_numbering_preserved(self):
+        """Test that [n] maps to the same chunk with digests in the prompt."""
+        docs = self.docs()
+        llm = Mock()
+        llm.invoke.return_value = Mock(content="See [3] and [1].")
+
+        result = generate_answer_with_citations("q", docs, llm=llm, max_context_tokens=100)
+
+        prompt = llm.invoke.call_args[0][0]
+        assert "[3] (p2.pdf)\nDigest 2." in prompt
+        assert [c["source"] for c in result["citations"]] == ["p2.pdf", "p0.pdf"]
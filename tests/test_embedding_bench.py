@@ -0,0 +1,27 @@
+"""Tests for embedding_bench module."""
+
+import numpy as np
+import pytest
+from embedding_bench import SAMPLE_TEXTS, compare_backends, row_cosines
+
+
+class TestRowCosines:
+    def test_identical_rows(self):
+        """Test that identical vectors have cosine 1."""
+        a = np.array([[1.0, 2.0], [3.0, -1.0]])
+        assert np.allclose(row_cosines(a, a * 5), 1.0)
+
+    def test_orthogonal_rows(self):
+        """Test that orthogonal vectors have cosine 0."""
+        assert np.allclose(row_cosines(np.array([[1.0, 0.0]]), np.array([[0.0, 1.0]])), 0.0)
+
+
+class TestCompareBackends:
+    def test_onnx_parity(self):
+        """Test that the ONNX backends stay close to PyTorch."""
+        pytest.importorskip("optimum")
+        rows = compare_backends(SAMPLE_TEXTS, ["onnx", "onnx-int8"], threshold=0.95)
+
+        assert [row["backend"] for row in rows] == ["torch", "onnx", "onnx-int8"]
+        assert rows[1]["min_cosine"] > 0.999
+        assert all(row["passed"] for row in rows)
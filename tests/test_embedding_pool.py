@@ -0,0 +1,50 @@
+"""Tests for embedding_pool module."""
+
+import numpy as np
+import pytest
+from embedding_pool import PooledEmbeddings
+from vectorstore import get_embeddings
+
+
+@pytest.fixture(scope="module")
+def pooled():
+    with PooledEmbeddings(workers=2, batch_size=3, threads=1) as embeddings:
+        yield embeddings
+
+
+TEXTS = [
+    "RAG combines retrieval with generation.",
+    "Vector databases store embeddings.",
+    "Chain-of-thought prompting\nimproves reasoning.",
+    "Dense passage retrieval uses a dual encoder.",
+    "MinHash estimates Jaccard similarity.",
+    "HNSW is a graph-based ANN index.",
+    "Short.",
+]
+
+
+class TestPooledEmbeddings:
+    def test_matches_single_process(self, pooled):
+        """Test that pooled vectors equal single-process embedding, in order."""
+        # More than one encode batch of mixed lengths, so batch cuts and padding matter
+        texts = [text * (1 + i % 5) for i, text in enumerate(TEXTS * 10)]
+        expected = get_embeddings().embed_documents(texts)
+        actual = pooled.embed_documents(texts)
+
+        assert actual == expected
+
+    def test_empty_input(self, pooled):
+        """Test embedding no texts."""
+        assert pooled.embed_documents([]) == []
+
+    def test_embed_query(self, pooled):
+        """Test that queries are embedded like the default model."""
+        assert np.allclose(pooled.embed_query("What is RAG?"), get_embeddings().embed_query("What is RAG?"), atol=1e-6)
+
+    def test_settings_follow_model_and_backend(self):
+        """Test that workers and the query model share model name and backend settings."""
+        embeddings = PooledEmbeddings(workers=1, model_name="some-model", backend="onnx")
+
+        assert embeddings.model_name == "some-model"
+        assert embeddings.model_kwargs == {"backend": "onnx"}
+        assert embeddings._local is None
@@ -5,7 +5,14 @@ from unittest.mock import Mock, patch
 from langchain_core.documents import Document
 
 
-from generator import format_context, generate_answer, generate_answer_with_citations, _extract_citations
+from generator import (
+    TokenBucket,
+    format_context,
+    generate_answer,
+    generate_answer_with_citations,
+    generate_many,
+    _extract_citations,
+)
 
 
 @pytest.fixture
@@ -92,3 +99,94 @@ class TestGenerateAnswerWithCitations:
         assert "answer" in result
         assert "citations" in result
         assert isinstance(result["citations"], list)
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+class TestGenerateMany:
+    def _llm(self, *waves):
+        """Mock LLM whose batch() returns the given waves of responses in order."""
+        mock_llm = Mock()
+        mock_llm.batch.side_effect = list(waves)
+        return mock_llm
+
+    def test_answers_in_order(self, sample_docs):
+        """Test that answers come back in input order with citations."""
+        mock_llm = self._llm([Mock(content="First [1]."), Mock(content="Second [2].")])
+        items = [("Q1?", sample_docs), ("Q2?", sample_docs)]
+
+        results = generate_many(items, llm=mock_llm)
+
+        assert [r["answer"] for r in results] == ["First [1].", "Second [2]."]
+        assert results[1]["citations"] == [sample_docs[1].metadata]
+
+    def test_backs_off_on_rate_limit(self, sample_docs):
+        """Test that 429s are retried with a smaller wave."""
+        mock_llm = self._llm(
+            [Mock(content="A [1]."), _RateLimited()],
+            [Mock(content="B [1].")],
+        )
+        items = [("Q1?", sample_docs), ("Q2?", sample_docs)]
+
+        with patch("generator.time.sleep"):
+            results = generate_many(items, llm=mock_llm)
+
+        assert [r["answer"] for r in results] == ["A [1].", "B [1]."]
+        assert mock_llm.batch.call_args_list[1].kwargs["config"]["max_concurrency"] == 1
+
+    def test_gives_up_after_retries(self, sample_docs):
+        """Test that persistent errors are reported, not raised."""
+        mock_llm = self._llm([RuntimeError("boom")], [RuntimeError("boom")])
+
+        results = generate_many([("Q?", sample_docs)], llm=mock_llm, max_retries=2)
+
+        assert results[0]["answer"] is None
+        assert "boom" in results[0]["error"]
+
+    def test_gives_up_when_always_rate_limited(self, sample_docs):
+        """Test that an endpoint that keeps answering 429 cannot stall the job."""
+        mock_llm = self._llm([_RateLimited()], [_RateLimited()], [_RateLimited()])
+
+        with patch("generator.time.sleep"):
+            results = generate_many([("Q?", sample_docs)], llm=mock_llm, max_rate_limited=3)
+
+        assert results[0]["answer"] is None
+        assert mock_llm.batch.call_count == 3
+
+    def test_skips_malformed_checkpoint_records(self, sample_docs, tmp_path):
+        """Test that checkpoint lines without a key are ignored."""
+        checkpoint = tmp_path / "answers.jsonl"
+        checkpoint.write_text('["not", "a", "record"]\n{"answer": "no key"}\n')
+
+        results = generate_many([("Q?", sample_docs)], llm=self._llm([Mock(content="A [1].")]), checkpoint_path=checkpoint)
+
+        assert results[0]["answer"] == "A [1]."
+
+    def test_resumes_from_checkpoint(self, sample_docs, tmp_path):
+        """Test that completed answers are not generated again."""
+        checkpoint = tmp_path / "answers.jsonl"
+        items = [("Q1?", sample_docs), ("Q2?", sample_docs)]
+
+        generate_many(items[:1], llm=self._llm([Mock(content="A [1].")]), checkpoint_path=checkpoint)
+        mock_llm = self._llm([Mock(content="B [2].")])
+        results = generate_many(items, llm=mock_llm, checkpoint_path=checkpoint)
+
+        assert [r["answer"] for r in results] == ["A [1].", "B [2]."]
+        assert mock_llm.batch.call_count == 1
+        assert len(mock_llm.batch.call_args.args[0]) == 1
+        assert len(checkpoint.read_text().splitlines()) == 2
+
+
+class TestTokenBucket:
+    def test_allows_burst(self):
+        """Test that a full bucket does not block."""
+        bucket = TokenBucket(rate=1000, capacity=5)
+        for _ in range(5):
+            bucket.acquire()
+
+    def test_rejects_bad_rate(self):
+        """Test that non-positive rates are rejected."""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
@@ -0,0 +1,108 @@
+"""Tests for http_pool module."""
+
+import asyncio
+
+from generator import generate_answer, get_llm
+from http_pool import (
+    PoolConfig,
+    configure_http_pool,
+    get_async_http_client,
+    get_http_client,
+    http_pool_stats,
+    reset_http_pool_stats,
+    _running_loop_client,
+)
+from llm_stub import StubConfig, StubServer
+
+
+async def _loop_client():
+    return _running_loop_client()
+
+
+class TestPoolConfig:
+    def test_from_env(self, monkeypatch):
+        """Test pool settings are read from the environment."""
+        monkeypatch.setenv("LLM_MAX_CONNECTIONS", "7")
+        monkeypatch.setenv("LLM_TIMEOUT", "2.5")
+        config = PoolConfig.from_env()
+
+        assert config.max_connections == 7
+        assert config.timeout == 2.5
+
+    def test_llm_keeps_connect_timeout(self, monkeypatch):
+        """Test that get_llm() passes the pool's connect timeout through."""
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        configure_http_pool(PoolConfig(timeout=30.0, connect_timeout=1.5))
+        try:
+            timeout = get_llm(base_url="http://localhost:1").client._client.timeout
+        finally:
+            configure_http_pool(PoolConfig.from_env())
+
+        assert timeout.connect == 1.5
+        assert timeout.read == 30.0
+
+
+class TestSharedClient:
+    def test_client_is_shared(self):
+        """Test that the same client is returned on every call."""
+        assert get_http_client() is get_http_client()
+
+    def test_configure_rebuilds_client(self):
+        """Test that reconfiguring replaces the client."""
+        before = get_http_client()
+        configure_http_pool(PoolConfig(max_connections=5))
+        try:
+            assert get_http_client() is not before
+        finally:
+            configure_http_pool(PoolConfig.from_env())
+
+    def test_connections_are_reused(self, monkeypatch):
+        """Test that repeated get_llm() calls reuse one connection."""
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        config = StubConfig(latency_ms=0, latency_dist="fixed", tokens_per_second=0)
+        reset_http_pool_stats()
+
+        with StubServer(config, port=0) as server:
+            for _ in range(3):
+                generate_answer("What is RAG?", [], llm=get_llm(base_url=server.base_url))
+
+        stats = http_pool_stats()
+        assert stats["requests"] == 3
+        assert stats["new_connections"] == 1
+        assert stats["reused_connections"] == 2
+
+
+class TestAsyncClients:
+    def test_one_client_per_loop(self):
+        """Test that each event loop gets its own pooled async client."""
+        first, second = asyncio.new_event_loop(), asyncio.new_event_loop()
+        try:
+            a = first.run_until_complete(_loop_client())
+            assert first.run_until_complete(_loop_client()) is a
+            assert second.run_until_complete(_loop_client()) is not a
+        finally:
+            first.close()
+            second.close()
+
+    def test_configure_closes_async_clients(self):
+        """Test that reconfiguring closes the old async clients on their loop."""
+        loop = asyncio.new_event_loop()
+        try:
+            before = loop.run_until_complete(_loop_client())
+            configure_http_pool(PoolConfig.from_env())
+
+            assert before.is_closed
+            assert loop.run_until_complete(_loop_client()) is not before
+        finally:
+            loop.close()
+
+    def test_llm_async_across_loops(self, monkeypatch):
+        """Test that one get_llm() instance works from successive event loops."""
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        config = StubConfig(latency_ms=0, latency_dist="fixed", tokens_per_second=0)
+
+        with StubServer(config, port=0) as server:
+            llm = get_llm(base_url=server.base_url)
+            for _ in range(2):
+                assert asyncio.run(llm.ainvoke("What is RAG?")).content
+        assert get_async_http_client() is get_async_http_client()
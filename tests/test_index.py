@@ -0,0 +1,99 @@
+"""Tests for index module."""
+
+from functools import partial
+
+import pytest
+from dedup import StreamingDeduper
+from index import ChunkWriter
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from vectorstore import add_chunks, delete_stale, open_vectorstore, update_metadata
+
+
+LICENSE = "This work is licensed under a Creative Commons Attribution 4.0 International License."
+
+
+@pytest.fixture
+def vectorstore(tmp_path):
+    return open_vectorstore(persist_directory=tmp_path / "db", embeddings=DeterministicFakeEmbedding(size=16))
+
+
+def _writer(vectorstore, batch_size=2, deduper=None):
+    writes = []
+
+    def write(chunks, metadatas):
+        writes.append(len(chunks))
+        add_chunks(vectorstore, chunks, metadatas)
+
+    writer = ChunkWriter(
+        write,
+        partial(update_metadata, vectorstore),
+        delete_stale=partial(delete_stale, vectorstore),
+        deduper=deduper,
+        batch_size=batch_size,
+    )
+    return writer, writes
+
+
+def _index(writer, papers):
+    for source, chunks in papers.items():
+        for i, chunk in enumerate(chunks):
+            writer.add(chunk, {"source": source, "chunk_id": i, "page": 1})
+        writer.finish_source(source)
+    writer.close()
+
+
+def _stored(vectorstore):
+    stored = vectorstore._collection.get(include=["documents", "metadatas"])
+    return {doc: meta for doc, meta in zip(stored["documents"], stored["metadatas"])}
+
+
+class TestChunkWriter:
+    def test_writes_in_batches(self, vectorstore):
+        """Test that chunks are written in fixed-size batches as they arrive."""
+        writer, writes = _writer(vectorstore, batch_size=2)
+
+        _index(writer, {"a.pdf": ["one", "two", "three"], "b.pdf": ["four", "five"]})
+
+        assert writes == [2, 2, 1]
+        assert writer.written == 5
+        assert sorted(_stored(vectorstore)) == ["five", "four", "one", "three", "two"]
+
+    def test_deletes_stale_chunks_of_finished_sources(self, vectorstore):
+        """Test that re-indexing a changed paper removes its old chunks, across batches."""
+        _index(_writer(vectorstore)[0], {"a.pdf": ["one", "two", "three"], "b.pdf": ["four"]})
+
+        _index(_writer(vectorstore)[0], {"a.pdf": ["one", "2", "three"]})
+
+        assert sorted(_stored(vectorstore)) == ["2", "four", "one", "three"]
+
+    def test_dedup_across_batches(self, vectorstore):
+        """Test that near-duplicates in later batches are dropped and counted on the kept chunk."""
+        writer, _ = _writer(vectorstore, batch_size=1, deduper=StreamingDeduper())
+
+        _index(writer, {"a.pdf": [LICENSE, "one"], "b.pdf": [LICENSE.upper()]})
+
+        stored = _stored(vectorstore)
+        assert sorted(stored) == [LICENSE, "one"]
+        assert stored[LICENSE]["sources"] == "a.pdf; b.pdf"
+        assert stored[LICENSE]["duplicates"] == 2
+
+    def test_reindex_clears_merged_sources(self, vectorstore):
+        """Test that a chunk no longer standing for duplicates loses the earlier run's sources."""
+        _index(_writer(vectorstore, deduper=StreamingDeduper())[0], {"a.pdf": [LICENSE], "b.pdf": [LICENSE]})
+
+        _index(_writer(vectorstore)[0], {"a.pdf": [LICENSE]})
+
+        stored = _stored(vectorstore)[LICENSE]
+        assert stored["sources"] == "a.pdf"
+        assert stored["duplicates"] == 1
+
+    def test_discard_failed_source(self, vectorstore):
+        """Test that unwritten chunks of a failed paper are dropped and its old chunks kept."""
+        _index(_writer(vectorstore)[0], {"a.pdf": ["old"]})
+        writer, _ = _writer(vectorstore, batch_size=10)
+
+        writer.add("partial", {"source": "a.pdf", "chunk_id": 0, "page": 1})
+        assert writer.discard_source("a.pdf") == 0
+        _index(writer, {"b.pdf": ["other"]})
+
+        assert sorted(_stored(vectorstore)) == ["old", "other"]
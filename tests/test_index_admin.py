@@ -0,0 +1,63 @@
+"""Tests for index_admin module."""
+
+import pytest
+import sharding
+from index_admin import main
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from sharding import ShardWriter, read_manifest, shard_directory
+from vectorstore import create_vectorstore
+
+
+def _search_ef(persist_directory) -> int:
+    collection = Chroma(collection_name="papers", persist_directory=str(persist_directory))._collection
+    return collection.configuration["hnsw"]["ef_search"]
+
+
+class TestSetSearchEf:
+    def test_saves_for_later_readers(self, tmp_path):
+        """Test that set-search-ef persists the new value on the collection."""
+        create_vectorstore(
+            ["RAG combines retrieval with generation."], [{"source": "rag.pdf", "chunk_id": 0}],
+            persist_directory=tmp_path, embeddings=DeterministicFakeEmbedding(size=16),
+        )
+        assert _search_ef(tmp_path) == 100
+
+        main(["--persist-directory", str(tmp_path), "set-search-ef", "37"])
+
+        assert _search_ef(tmp_path) == 37
+
+
+class TestShardedStore:
+    @pytest.fixture
+    def shards_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sharding, "get_embeddings", lambda: DeterministicFakeEmbedding(size=16))
+        monkeypatch.setattr(sharding, "_worker_embeddings", None)
+        writer = ShardWriter(num_shards=2, persist_directory=tmp_path, max_workers=1)
+        writer.add(
+            [f"Passage {i} of paper {i % 4}." for i in range(8)],
+            [{"source": f"paper{i % 4}.pdf", "chunk_id": i} for i in range(8)],
+        )
+        writer.close()
+        return tmp_path
+
+    def _counts(self, shards_dir):
+        return [
+            Chroma(collection_name="papers", persist_directory=str(shard_directory(shards_dir, i)))._collection.count()
+            for i in read_manifest(shards_dir)["shards"]
+        ]
+
+    def test_compact_covers_every_shard(self, shards_dir, tmp_path_factory):
+        """Test that compaction runs on each shard, not on an empty top-level collection."""
+        papers = tmp_path_factory.mktemp("papers")
+        (papers / "paper0.pdf").touch()
+
+        main(["--persist-directory", str(shards_dir), "compact", "--papers-dir", str(papers)])
+
+        assert sum(self._counts(shards_dir)) == 2
+
+    def test_delete_source(self, shards_dir):
+        """Test that delete-source removes a paper from whichever shard holds it."""
+        main(["--persist-directory", str(shards_dir), "delete-source", "paper1.pdf"])
+
+        assert sum(self._counts(shards_dir)) == 6
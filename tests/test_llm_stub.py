@@ -0,0 +1,72 @@
+"""Tests for llm_stub module."""
+
+import json
+import random
+import urllib.error
+import urllib.request
+
+import pytest
+from generator import generate_answer, get_llm
+from llm_stub import StubConfig, StubServer
+
+
+def _post(base_url: str, payload: dict):
+    request = urllib.request.Request(
+        f"{base_url}/chat/completions",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+class TestStubConfig:
+    def test_fixed_latency(self):
+        """Test fixed latency is the median."""
+        config = StubConfig(latency_ms=100, latency_dist="fixed")
+        assert config.sample_latency(random.Random(0)) == pytest.approx(0.1)
+
+    def test_generation_time(self):
+        """Test generation time follows the token rate."""
+        config = StubConfig(tokens_per_second=100, completion_tokens=50)
+        assert config.generation_time() == pytest.approx(0.5)
+
+    def test_unknown_distribution(self):
+        """Test that unknown distributions are rejected."""
+        with pytest.raises(ValueError):
+            StubConfig(latency_dist="pareto").sample_latency(random.Random(0))
+
+
+class TestStubServer:
+    def test_chat_completion(self):
+        """Test an OpenAI-shaped chat completion response."""
+        config = StubConfig(latency_ms=0, latency_dist="fixed", tokens_per_second=0, completion_tokens=5)
+        with StubServer(config, port=0) as server:
+            status, body = _post(server.base_url, {
+                "model": "gpt-oss-20b",
+                "messages": [{"role": "user", "content": "What is RAG?"}],
+            })
+
+        assert status == 200
+        assert body["choices"][0]["message"]["role"] == "assistant"
+        assert body["usage"]["completion_tokens"] == 5
+        assert server.stats["completions"] == 1
+
+    def test_injected_errors(self):
+        """Test that error_rate=1 fails every request."""
+        config = StubConfig(latency_ms=0, latency_dist="fixed", error_rate=1.0, error_status=429)
+        with StubServer(config, port=0) as server:
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                _post(server.base_url, {"messages": []})
+
+        assert excinfo.value.code == 429
+        assert server.stats["errors"] == 1
+
+    def test_get_llm_points_at_stub(self, monkeypatch):
+        """Test that the real LLM client works against the stub."""
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        config = StubConfig(latency_ms=0, latency_dist="fixed", tokens_per_second=0)
+        with StubServer(config, port=0) as server:
+            answer = generate_answer("What is RAG?", [], llm=get_llm(base_url=server.base_url))
+
+        assert isinstance(answer, str) and answer
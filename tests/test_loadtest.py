@@ -0,0 +1,78 @@
+"""Tests for loadtest module."""
+
+import time
+
+import pytest
+from generator import generate_answer, get_llm
+from http_pool import http_pool_stats, reset_http_pool_stats
+from llm_stub import StubConfig, StubServer
+from loadtest import main, percentile, run_load
+
+
+class TestPercentile:
+    def test_nearest_rank(self):
+        """Test nearest-rank percentiles."""
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile(values, 100) == 100.0
+
+    def test_empty(self):
+        """Test empty input."""
+        assert percentile([], 50) == 0.0
+
+
+class TestRunLoad:
+    def test_closed_loop_counts(self):
+        """Test that the requested number of requests is sent."""
+        result = run_load(lambda q: None, ["a", "b"], concurrency=3, num_requests=10)
+        summary = result.summary()
+
+        assert summary["requests"] == 10
+        assert summary["succeeded"] == 10
+        assert summary["errors"] == 0
+
+    def test_errors_are_counted(self):
+        """Test that failures are counted by type."""
+        def flaky(query):
+            if query == "bad":
+                raise RuntimeError("boom")
+
+        result = run_load(flaky, ["ok", "bad"], concurrency=1, num_requests=4)
+
+        assert result.errors["RuntimeError"] == 2
+        assert len(result.latencies) == 2
+
+    def test_open_loop_rate(self):
+        """Test that open-loop mode paces requests at the target rate."""
+        result = run_load(lambda q: time.sleep(0.001), ["q"], concurrency=2, rate=50, num_requests=10)
+
+        # 10 requests at 50/s are spread over at least 9 intervals of 20ms
+        assert result.elapsed >= 0.18
+        assert result.summary()["succeeded"] == 10
+
+    def test_empty_queries(self):
+        """Test that empty query lists are rejected."""
+        with pytest.raises(ValueError):
+            run_load(lambda q: None, [])
+
+    def test_rate_must_be_positive(self):
+        """Test that a zero rate is rejected instead of dividing by zero."""
+        with pytest.raises(ValueError):
+            run_load(lambda q: None, ["q"], rate=0)
+        with pytest.raises(SystemExit):
+            main(["--rate", "0"])
+
+
+class TestLoadTestLLM:
+    def test_errors_are_not_retried(self, monkeypatch):
+        """Test that an LLM built without retries sends one request per injected error."""
+        monkeypatch.setenv("OPENAI_API_KEY", "stub")
+        config = StubConfig(latency_ms=0, latency_dist="fixed", tokens_per_second=0, error_rate=1.0)
+        reset_http_pool_stats()
+
+        with StubServer(config, port=0) as server, pytest.raises(Exception):
+            generate_answer("What is RAG?", [], llm=get_llm(base_url=server.base_url, max_retries=0))
+
+        assert http_pool_stats()["requests"] == 1
@@ -0,0 +1,99 @@
+"""Tests for pdf_cache module."""
+
+import os
+
+import pytest
+from pdf_cache import PDFTextCache
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    """A stand-in PDF file; only its bytes matter to the cache."""
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(b"%PDF-1.4 fake contents")
+    return path
+
+
+def _extractor(calls):
+    def extract(path):
+        calls.append(path)
+        yield 1, "Page one."
+        yield 2, "Page two."
+    return extract
+
+
+class TestPDFTextCache:
+    def test_miss_then_hit(self, tmp_path, pdf):
+        """Test that the second read comes from the cache."""
+        cache = PDFTextCache(tmp_path / "cache", extractor="test")
+        calls = []
+
+        first = list(cache.pages(pdf, _extractor(calls)))
+        second = list(cache.pages(pdf, _extractor(calls)))
+
+        assert first == second == [(1, "Page one."), (2, "Page two.")]
+        assert len(calls) == 1
+
+    def test_content_change_invalidates(self, tmp_path, pdf):
+        """Test that editing the file forces re-extraction."""
+        cache = PDFTextCache(tmp_path / "cache", extractor="test")
+        calls = []
+
+        list(cache.pages(pdf, _extractor(calls)))
+        pdf.write_bytes(b"%PDF-1.4 new contents")
+        list(cache.pages(pdf, _extractor(calls)))
+
+        assert len(calls) == 2
+
+    def test_extractor_version_invalidates(self, tmp_path, pdf):
+        """Test that a new extractor version misses the old entry."""
+        calls = []
+        list(PDFTextCache(tmp_path / "cache", extractor="v1").pages(pdf, _extractor(calls)))
+        list(PDFTextCache(tmp_path / "cache", extractor="v2").pages(pdf, _extractor(calls)))
+
+        assert len(calls) == 2
+
+    def test_abandoned_read_leaves_no_entry(self, tmp_path, pdf):
+        """Test that a partially consumed miss is not cached."""
+        cache = PDFTextCache(tmp_path / "cache", extractor="test")
+        stream = cache.pages(pdf, _extractor([]))
+        next(stream)
+        stream.close()
+
+        assert cache.entries() == []
+
+    def test_entries_and_prune(self, tmp_path, pdf):
+        """Test listing entries and pruning stale ones."""
+        cache_dir = tmp_path / "cache"
+        list(PDFTextCache(cache_dir, extractor="old").pages(pdf, _extractor([])))
+        cache = PDFTextCache(cache_dir, extractor="new")
+        list(cache.pages(pdf, _extractor([])))
+
+        assert {e["source"] for e in cache.entries()} == {"paper.pdf"}
+        removed, reclaimed = cache.prune()
+
+        assert removed == 1
+        assert reclaimed > 0
+        assert [e["extractor"] for e in cache.entries()] == ["new"]
+
+    def test_hit_refreshes_age(self, tmp_path, pdf):
+        """Test that pruning by age spares entries that were recently read."""
+        cache = PDFTextCache(tmp_path / "cache", extractor="test")
+        list(cache.pages(pdf, _extractor([])))
+        entry = cache.entries()[0]["path"]
+        os.utime(entry, (0, 0))
+        assert cache.entries()[0]["age_days"] > 30
+
+        list(cache.pages(pdf, _extractor([])))
+
+        assert cache.entries()[0]["age_days"] < 1
+        assert cache.prune(older_than_days=30) == (0, 0)
+
+    def test_prune_missing(self, tmp_path, pdf):
+        """Test pruning entries whose PDF was removed."""
+        cache = PDFTextCache(tmp_path / "cache", extractor="test")
+        list(cache.pages(pdf, _extractor([])))
+        pdf.unlink()
+
+        removed, _ = cache.prune(papers_dir=tmp_path)
+        assert removed == 1
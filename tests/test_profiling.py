@@ -0,0 +1,96 @@
+"""Tests for profiling module."""
+
+import argparse
+import cProfile
+import pstats
+import time
+from types import SimpleNamespace
+
+from profiling import Profiler, add_profiling_args, collapsed_stacks, profiled, stage
+
+
+def _leaf():
+    return sum(i * i for i in range(20000))
+
+
+def _branch():
+    return _leaf() + _leaf()
+
+
+class TestCollapsedStacks:
+    def test_produces_collapsed_lines(self):
+        """Test that output lines are 'frames count' pairs."""
+        profile = cProfile.Profile()
+        profile.enable()
+        _branch()
+        profile.disable()
+
+        lines = collapsed_stacks(pstats.Stats(profile))
+
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+            assert stack
+
+    def test_nests_callee_under_caller(self):
+        """Test that callees appear below their caller in the stack."""
+        profile = cProfile.Profile()
+        profile.enable()
+        _branch()
+        profile.disable()
+
+        lines = collapsed_stacks(pstats.Stats(profile))
+
+        assert any("_branch;" in line and "_leaf" in line for line in lines)
+
+    def test_wide_graph_is_bounded(self):
+        """Test that a call graph with exponentially many paths converts quickly."""
+        # 40 layers of 10 functions, each calling every function in the next layer: 10**39 paths
+        layers = [[("mod.py", layer * 10 + i, f"f{layer}_{i}") for i in range(10)] for layer in range(40)]
+        raw = {("mod.py", 0, "main"): (1, 1, 0.0, 10.0, {})}
+        for depth, layer in enumerate(layers):
+            callers = [("mod.py", 0, "main")] if depth == 0 else layers[depth - 1]
+            cumtime = 10.0 / len(layer)
+            edges = {caller: (1, 1, 0.0, cumtime / len(callers)) for caller in callers}
+            raw.update({func: (1, 1, 0.1 / len(layer), cumtime, edges) for func in layer})
+
+        started = time.perf_counter()
+        lines = collapsed_stacks(SimpleNamespace(stats=raw), max_depth=20, max_paths=5000)
+
+        assert time.perf_counter() - started < 5
+        assert 0 < len(lines) <= 5000
+        assert max(line.count(";") for line in lines) < 20
+
+
+class TestProfiled:
+    def _args(self, tmp_path, *flags):
+        parser = argparse.ArgumentParser()
+        add_profiling_args(parser)
+        return parser.parse_args([*flags, "--profile-dir", str(tmp_path)])
+
+    def test_disabled_by_default(self, tmp_path):
+        """Test that nothing is written without profiling flags."""
+        with profiled("test", self._args(tmp_path)) as profiler:
+            stage("noop")
+        assert profiler is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_writes_reports(self, tmp_path):
+        """Test that CPU and memory reports are written."""
+        with profiled("test", self._args(tmp_path, "--profile", "--profile-memory")):
+            _branch()
+            stage("work")
+
+        assert (tmp_path / "test.prof").exists()
+        assert (tmp_path / "test.collapsed").exists()
+        memory = (tmp_path / "test.memory.txt").read_text()
+        assert "after work" in memory
+
+    def test_stage_without_memory_is_noop(self, tmp_path):
+        """Test that stages don't snapshot when memory profiling is off."""
+        profiler = Profiler("test", tmp_path, cpu=True, memory=False)
+        profiler.start()
+        profiler.stage("work")
+        profiler.stop()
+        assert profiler.snapshots == []
@@ -0,0 +1,111 @@
+"""Tests for sharding module."""
+
+import json
+import tempfile
+
+import pytest
+from sharding import (
+    MANIFEST,
+    ShardWriter,
+    clear_shards,
+    create_sharded_vectorstore,
+    load_sharded_vectorstore,
+    partition,
+    shard_directory,
+    shard_for,
+)
+from vectorstore import create_vectorstore, retrieve, retrieve_with_scores
+
+
+@pytest.fixture
+def corpus():
+    chunks = [
+        "RAG combines retrieval with generation to reduce hallucination.",
+        "Vector databases store embeddings for fast similarity search.",
+        "Chain-of-thought prompting improves reasoning capabilities.",
+        "Retrieved passages condition the generator on external memory.",
+        "Dense passage retrieval uses a dual encoder.",
+    ]
+    metadatas = [
+        {"source": "rag.pdf", "chunk_id": 0},
+        {"source": "vdb.pdf", "chunk_id": 0},
+        {"source": "cot.pdf", "chunk_id": 0},
+        {"source": "rag.pdf", "chunk_id": 1},
+        {"source": "dpr.pdf", "chunk_id": 0},
+    ]
+    return chunks, metadatas
+
+
+class TestPartition:
+    def test_stable_shard(self):
+        """Test that shard assignment is deterministic and in range."""
+        assert shard_for("rag.pdf", 4) == shard_for("rag.pdf", 4)
+        assert all(0 <= shard_for(f"paper{i}.pdf", 3) < 3 for i in range(20))
+
+    def test_source_stays_together(self, corpus):
+        """Test that all chunks of a source land in one shard."""
+        shards = partition(*corpus, num_shards=3)
+
+        assert sum(len(chunks) for chunks, _ in shards) == 5
+        holding_rag = [i for i, (_, metas) in enumerate(shards) if any(m["source"] == "rag.pdf" for m in metas)]
+        assert len(holding_rag) == 1
+        assert len([m for m in shards[holding_rag[0]][1] if m["source"] == "rag.pdf"]) == 2
+
+
+class TestShardedVectorStore:
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_build_and_load(self, corpus, max_workers):
+        """Test building shards serially and in worker processes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sharded = create_sharded_vectorstore(*corpus, num_shards=2, persist_directory=tmpdir, max_workers=max_workers)
+            assert sharded.count() == 5
+            assert load_sharded_vectorstore(tmpdir).count() == 5
+
+    def test_many_batches_in_workers(self):
+        """Test that shards written over several batches by worker processes read back intact."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = ShardWriter(num_shards=2, persist_directory=tmpdir, max_workers=2)
+            for batch in range(6):
+                chunks = [f"Batch {batch} passage {i} about retrieval." for i in range(8)]
+                metadatas = [{"source": f"paper{batch}-{i % 4}.pdf", "chunk_id": i} for i in range(8)]
+                writer.add(chunks, metadatas)
+            sharded = writer.close()
+
+            assert sharded.count() == 48
+            for shard in load_sharded_vectorstore(tmpdir).shards:
+                stored = shard._collection.get(include=["embeddings"])
+                assert len(stored["embeddings"]) == len(stored["ids"])
+
+    def test_matches_flat_search(self, corpus):
+        """Test that scatter-gather returns the same top-k as one store."""
+        with tempfile.TemporaryDirectory() as flat_dir, tempfile.TemporaryDirectory() as shard_dir:
+            flat = create_vectorstore(*corpus, persist_directory=flat_dir)
+            sharded = create_sharded_vectorstore(*corpus, num_shards=3, persist_directory=shard_dir, max_workers=1)
+
+            query = "retrieval augmented generation"
+            expected = [doc.page_content for doc in retrieve(flat, query, k=3)]
+            results = retrieve_with_scores(sharded, query, k=3)
+
+            assert [doc.page_content for doc, _ in results] == expected
+            assert [score for _, score in results] == sorted(score for _, score in results)
+
+
+class TestManifest:
+    def test_clear_removes_earlier_build(self, tmp_path):
+        """Test that clearing removes shard directories and the manifest, nothing else."""
+        for i in range(3):
+            shard_directory(tmp_path, i).mkdir()
+        (tmp_path / MANIFEST).write_text("{}")
+        (tmp_path / "notes").mkdir()
+
+        clear_shards(tmp_path)
+
+        assert [p.name for p in tmp_path.iterdir()] == ["notes"]
+
+    def test_missing_listed_shard(self, tmp_path):
+        """Test that a shard listed in the manifest but absent on disk is an error."""
+        shard_directory(tmp_path, 0).mkdir()
+        (tmp_path / MANIFEST).write_text(json.dumps({"num_shards": 2, "collection_name": "papers", "shards": [0, 1]}))
+
+        with pytest.raises(FileNotFoundError, match="shard-01"):
+            load_sharded_vectorstore(tmp_path)
@@ -0,0 +1,104 @@
+"""Tests for small_to_big module."""
+
+import pytest
+from langchain_core.embeddings import Embeddings
+from small_to_big import SmallToBigStore, compact_parents, create_small_to_big, load_small_to_big
+from vectorstore import delete_source, retrieve, retrieve_with_scores
+
+
+class KeywordEmbeddings(Embeddings):
+    """One dimension per keyword, so nearest neighbours are predictable."""
+
+    KEYWORDS = ["retrieval", "reasoning", "vector", "kidney"]
+
+    def _embed(self, text):
+        text = text.lower()
+        return [float(text.count(word)) + 0.01 for word in self.KEYWORDS]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def hierarchy():
+    return [
+        (
+            "Retrieval helps. Retrieval grounds answers. Reasoning is separate.",
+            {"source": "rag.pdf", "chunk_id": 0, "page": 1},
+            ["Retrieval helps.", "Retrieval grounds answers.", "Reasoning is separate."],
+        ),
+        (
+            "Vector stores index embeddings. Vector search is fast.",
+            {"source": "vdb.pdf", "chunk_id": 0, "page": 3},
+            ["Vector stores index embeddings.", "Vector search is fast."],
+        ),
+        (
+            "Kidney injury is common in intensive care.",
+            {"source": "crrt.pdf", "chunk_id": 0, "page": 2},
+            ["Kidney injury is common in intensive care."],
+        ),
+    ]
+
+
+class TestSmallToBig:
+    def test_returns_deduplicated_parents(self, hierarchy, tmp_path):
+        """Test that several matching children yield their parent once."""
+        store = create_small_to_big(hierarchy, persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+
+        docs = retrieve(store, "retrieval", k=2)
+
+        assert [doc.metadata["source"] for doc in docs] == ["rag.pdf", "vdb.pdf"]
+        assert docs[0].page_content == hierarchy[0][0]
+        assert docs[0].metadata["page"] == 1
+
+    def test_scores_by_best_child(self, hierarchy, tmp_path):
+        """Test that parents are ranked by their closest child's distance."""
+        store = create_small_to_big(hierarchy, persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+
+        hits = retrieve_with_scores(store, "vector vector", k=3)
+
+        assert hits[0][0].metadata["source"] == "vdb.pdf"
+        assert [score for _, score in hits] == sorted(score for _, score in hits)
+
+    def test_parents_stored_once_unembedded(self, hierarchy, tmp_path):
+        """Test that only children are embedded and parents are stored once."""
+        store = create_small_to_big(hierarchy, persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+
+        assert store.children._collection.count() == 6
+        assert store.parents.count() == 3
+        children = store.children._collection.get(include=["metadatas"])["metadatas"]
+        assert len({m["parent_id"] for m in children}) == 3
+
+    def test_reindex_replaces_parents(self, hierarchy, tmp_path):
+        """Test that re-indexing a source drops its old parents and children."""
+        create_small_to_big(hierarchy, persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+        changed = [("Kidney care changed.", {"source": "crrt.pdf", "chunk_id": 0, "page": 2}, ["Kidney care changed."])]
+        create_small_to_big(changed, persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+
+        store = load_small_to_big(persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+        assert store.parents.count() == 3
+        assert retrieve(store, "kidney", k=1)[0].page_content == "Kidney care changed."
+        assert store.children._collection.count() == 6
+
+    def test_refills_until_k_parents(self, hierarchy, tmp_path):
+        """Test that more children are fetched when the first ones share a parent."""
+        store = create_small_to_big(hierarchy, persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+        narrow = SmallToBigStore(store.children, store.parents, fetch_factor=1)
+
+        docs = retrieve(narrow, "retrieval", k=3)
+
+        assert [doc.metadata["source"] for doc in docs] == ["rag.pdf", "vdb.pdf", "crrt.pdf"]
+
+    def test_compact_parents(self, hierarchy, tmp_path):
+        """Test that parents without children or of dead sources are removed."""
+        store = create_small_to_big(hierarchy, persist_directory=tmp_path, embeddings=KeywordEmbeddings())
+        delete_source(store.children, "crrt.pdf")
+
+        assert compact_parents(store, dry_run=True) == 1
+        assert store.parents.count() == 3
+        assert compact_parents(store) == 1
+        assert compact_parents(store, live_sources={"rag.pdf"}) == 1
+        assert [source for _, source in store.parents.entries()] == ["rag.pdf"]
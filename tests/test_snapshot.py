@@ -0,0 +1,157 @@
+"""Tests for snapshot module."""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+import snapshot
+from snapshot import Snapshot, SnapshotError, export_snapshot, import_snapshot, quantize_int8, write_snapshot
+from vectorstore import create_vectorstore, retrieve_with_scores
+
+
+@pytest.fixture
+def entries():
+    rng = np.random.default_rng(0)
+    n = 600  # more than one text block
+    return {
+        "ids": [f"id-{i}" for i in range(n)],
+        "documents": [f"chunk number {i}" for i in range(n)],
+        "metadatas": [{"source": f"paper{i % 3}.pdf", "chunk_id": i} | ({"page": 2} if i % 2 else {}) for i in range(n)],
+        "embeddings": rng.normal(size=(n, 16)).astype(np.float32),
+    }
+
+
+@pytest.fixture
+def tmpdir():
+    with tempfile.TemporaryDirectory() as d:
+        yield Path(d)
+
+
+class TestSnapshot:
+    def test_round_trip(self, entries, tmpdir):
+        """Test that ids, text, metadata and vectors survive a write/open."""
+        path = tmpdir / "index.ragsnap"
+        write_snapshot(path, **entries)
+
+        with Snapshot(path, verify=True) as snap:
+            assert len(snap) == 600
+            assert snap.ids == entries["ids"]
+            assert snap.text(599) == "chunk number 599"
+            assert snap.metadata(3) == {"source": "paper0.pdf", "chunk_id": 3, "page": 2}
+            assert snap.metadata(4) == {"source": "paper1.pdf", "chunk_id": 4}
+            np.testing.assert_array_equal(snap.embeddings, entries["embeddings"])
+
+    @pytest.mark.parametrize("quantize", [None, "int8"])
+    def test_search_matches_exact(self, entries, tmpdir, quantize):
+        """Test that top-k by vector matches brute-force L2, within quantization error."""
+        path = tmpdir / "index.ragsnap"
+        write_snapshot(path, **entries, quantize=quantize)
+        query = entries["embeddings"][42] + 0.01
+
+        with Snapshot(path) as snap:
+            hits = snap.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=5)
+
+        expected = np.argsort(((entries["embeddings"] - query) ** 2).sum(axis=1))[:5]
+        assert hits[0][0].page_content == "chunk number 42"
+        assert [doc.metadata["chunk_id"] for doc, _ in hits][:3] == expected[:3].tolist()
+        assert [score for _, score in hits] == sorted(score for _, score in hits)
+
+    def test_filter(self, entries, tmpdir):
+        """Test that equality filters restrict results."""
+        path = tmpdir / "index.ragsnap"
+        write_snapshot(path, **entries)
+
+        with Snapshot(path) as snap:
+            hits = snap.similarity_search_by_vector_with_relevance_scores(
+                entries["embeddings"][0].tolist(), k=10, filter={"source": "paper1.pdf"}
+            )
+        assert len(hits) == 10
+        assert {doc.metadata["source"] for doc, _ in hits} == {"paper1.pdf"}
+
+    def test_int8_is_smaller(self, entries, tmpdir):
+        """Test that int8 quantization shrinks the file."""
+        write_snapshot(tmpdir / "f32.ragsnap", **entries)
+        write_snapshot(tmpdir / "i8.ragsnap", **entries, quantize="int8")
+        assert (tmpdir / "i8.ragsnap").stat().st_size < (tmpdir / "f32.ragsnap").stat().st_size
+
+    def test_quantize_int8_error(self, entries):
+        """Test that int8 reconstruction error is bounded by half a step."""
+        codes, scales = quantize_int8(entries["embeddings"])
+        error = np.abs(codes * scales[:, None] - entries["embeddings"])
+        assert (error <= scales[:, None] / 2 + 1e-6).all()
+
+    def test_corruption_detected(self, entries, tmpdir):
+        """Test that a flipped payload byte fails checksum validation."""
+        path = tmpdir / "index.ragsnap"
+        write_snapshot(path, **entries)
+        data = bytearray(path.read_bytes())
+        data[-10] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(SnapshotError, match="checksum"):
+            Snapshot(path, verify=True)
+
+    def test_rejects_other_files(self, tmpdir):
+        """Test that non-snapshot files are rejected."""
+        path = tmpdir / "not.ragsnap"
+        path.write_bytes(b"hello world, definitely not a snapshot")
+        with pytest.raises(SnapshotError, match="not a snapshot"):
+            Snapshot(path)
+
+    def test_failed_open_closes_file(self, tmpdir, monkeypatch):
+        """Test that a file rejected during validation is not left open."""
+        path = tmpdir / "not.ragsnap"
+        path.write_bytes(b"hello world, definitely not a snapshot")
+        opened = []
+
+        def tracking_open(*args, **kwargs):
+            opened.append(open(*args, **kwargs))
+            return opened[-1]
+
+        monkeypatch.setattr(snapshot, "open", tracking_open, raising=False)
+        with pytest.raises(SnapshotError):
+            Snapshot(path)
+
+        assert opened[0].closed
+
+    def test_close_with_arrays_in_use(self, entries, tmpdir):
+        """Test that closing while a caller holds a mapped array does not raise."""
+        path = tmpdir / "index.ragsnap"
+        write_snapshot(path, **entries)
+        snap = Snapshot(path)
+        embeddings = snap.embeddings
+
+        snap.close()
+
+        assert snap.embeddings is None
+        assert np.array_equal(embeddings, entries["embeddings"])
+
+    def test_length_mismatch(self, entries, tmpdir):
+        """Test that mismatched inputs raise ValueError."""
+        entries["ids"] = entries["ids"][:-1]
+        with pytest.raises(ValueError, match="same length"):
+            write_snapshot(tmpdir / "index.ragsnap", **entries)
+
+
+class TestExportImport:
+    def test_export_query_import(self, tmpdir):
+        """Test exporting a store, querying the snapshot and importing it back."""
+        chunks = [
+            "RAG combines retrieval with generation to reduce hallucination.",
+            "Vector databases store embeddings for fast similarity search.",
+            "Chain-of-thought prompting improves reasoning capabilities.",
+        ]
+        metadatas = [{"source": f"paper{i}.pdf", "chunk_id": 0} for i in range(3)]
+        vectorstore = create_vectorstore(chunks, metadatas, persist_directory=str(tmpdir / "db"))
+        path = tmpdir / "index.ragsnap"
+        export_snapshot(vectorstore, path)
+
+        with Snapshot(path, embedding_function=vectorstore._embedding_function) as snap:
+            expected = retrieve_with_scores(vectorstore, "vector similarity search", k=2)
+            actual = retrieve_with_scores(snap, "vector similarity search", k=2)
+            assert [d.page_content for d, _ in actual] == [d.page_content for d, _ in expected]
+            assert [s for _, s in actual] == pytest.approx([s for _, s in expected], abs=1e-4)
+
+        restored = import_snapshot(path, persist_directory=tmpdir / "restored")
+        assert restored._collection.count() == 3
@@ -0,0 +1,51 @@
+"""Tests for tune_hnsw module."""
+
+import numpy as np
+import pytest
+from tune_hnsw import exact_top_k, recommend, tune_vectors
+from vectorstore import HNSWParams
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(300, 16)).astype(np.float32), rng.normal(size=(20, 16)).astype(np.float32)
+
+
+class TestExactTopK:
+    def test_finds_self(self, vectors):
+        """Test that a stored vector is its own nearest neighbour."""
+        embeddings, _ = vectors
+        for space in ("l2", "cosine"):
+            assert [row[0] for row in exact_top_k(embeddings, embeddings[:5], k=3, space=space)] == [0, 1, 2, 3, 4]
+
+    def test_sorted_by_distance(self, vectors):
+        """Test that neighbours come back nearest first."""
+        embeddings, queries = vectors
+        top = exact_top_k(embeddings, queries[:1], k=5)[0]
+        distances = np.linalg.norm(embeddings[top] - queries[0], axis=1)
+        assert list(distances) == sorted(distances)
+
+
+class TestRecommend:
+    def _row(self, recall, p50, m=16, c_ef=100, s_ef=10):
+        return {"params": HNSWParams(M=m, construction_ef=c_ef, search_ef=s_ef), "recall": recall, "p50_ms": p50}
+
+    def test_picks_fastest_passing(self):
+        """Test that the fastest setting above target wins."""
+        rows = [self._row(0.90, 0.1), self._row(0.97, 0.5, s_ef=50), self._row(0.99, 0.9, s_ef=100)]
+        assert recommend(rows, 0.95)["params"].search_ef == 50
+
+    def test_none_when_unreachable(self):
+        """Test that no recommendation is made below target."""
+        assert recommend([self._row(0.5, 0.1)], 0.95) is None
+
+
+class TestTuneVectors:
+    def test_high_search_ef_reaches_full_recall(self, vectors):
+        """Test that a generous setting matches brute force."""
+        embeddings, queries = vectors
+        rows = tune_vectors(embeddings, queries, k=5, m_grid=(16,), construction_ef_grid=(200,), search_ef_grid=(200,))
+
+        assert len(rows) == 1
+        assert rows[0]["recall"] >= 0.99
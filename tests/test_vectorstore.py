@@ -4,7 +4,18 @@ import pytest
 import tempfile
 from pathlib import Path
 
-from vectorstore import create_vectorstore, retrieve, retrieve_with_scores, load_vectorstore
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from vectorstore import (
+    backend_model_kwargs,
+    compact_vectorstore,
+    create_vectorstore,
+    delete_source,
+    load_vectorstore,
+    make_chunk_id,
+    make_chunk_ids,
+    retrieve,
+    retrieve_with_scores,
+)
 
 
 @pytest.fixture
@@ -93,3 +104,88 @@ class TestRetrieveWithScores:
             assert len(results) <= 2
             assert all(isinstance(r, tuple) and len(r) == 2 for r in results)
             assert all(isinstance(r[1], float) for r in results)
+
+
+class TestChunkIds:
+    def test_deterministic(self):
+        """Test that the same chunk always gets the same ID."""
+        meta = {"source": "a.pdf", "chunk_id": 3, "page": 2}
+        assert make_chunk_id("text", meta) == make_chunk_id("text", dict(meta))
+
+    def test_depends_on_source_span_and_content(self):
+        """Test that source, span and text all change the ID."""
+        base = make_chunk_id("text", {"source": "a.pdf", "chunk_id": 0})
+        assert make_chunk_id("text", {"source": "b.pdf", "chunk_id": 0}) != base
+        assert make_chunk_id("text", {"source": "a.pdf", "chunk_id": 1}) != base
+        assert make_chunk_id("other", {"source": "a.pdf", "chunk_id": 0}) != base
+
+
+class TestUpsert:
+    def test_reindex_is_idempotent(self, sample_chunks, sample_metadatas):
+        """Test that indexing twice does not duplicate chunks."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            create_vectorstore(sample_chunks, sample_metadatas, persist_directory=tmpdir)
+            vs = create_vectorstore(sample_chunks, sample_metadatas, persist_directory=tmpdir)
+            assert vs._collection.count() == len(sample_chunks)
+
+    def test_reindex_replaces_changed_source(self, sample_chunks, sample_metadatas):
+        """Test that stale chunks of a re-indexed source are removed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            create_vectorstore(sample_chunks, sample_metadatas, persist_directory=tmpdir)
+            vs = create_vectorstore(
+                ["RAG, revised edition."], [{"source": "rag_paper.pdf", "chunk_id": 0}],
+                persist_directory=tmpdir,
+            )
+            assert vs._collection.count() == len(sample_chunks)
+
+    def test_delete_source(self, sample_chunks, sample_metadatas):
+        """Test deleting every chunk of one source."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            vs = create_vectorstore(sample_chunks, sample_metadatas, persist_directory=tmpdir)
+            assert delete_source(vs, "rag_paper.pdf") == 1
+            assert vs._collection.count() == len(sample_chunks) - 1
+
+
+class TestCompact:
+    def test_removes_duplicates_and_orphans(self, sample_chunks, sample_metadatas):
+        """Test compaction of legacy random-ID copies and missing sources."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            vs = create_vectorstore(sample_chunks, sample_metadatas, persist_directory=tmpdir)
+            vs.add_texts(sample_chunks[:1], metadatas=sample_metadatas[:1])  # random-ID copy
+
+            report = compact_vectorstore(vs, live_sources={"rag_paper.pdf", "vector_db.pdf"})
+
+            assert report["duplicates"] == 1
+            assert report["orphans"] == 1
+            assert report["bytes_reclaimed"] > 0
+            assert vs._collection.count() == 2
+
+    def test_same_text_at_different_spans_is_kept(self, tmp_path):
+        """Test that repeated text in one paper is not a duplicate, so indexing and compaction agree."""
+        chunks = ["Repeated running title.", "Repeated running title."]
+        metadatas = [{"source": "a.pdf", "chunk_id": 0, "page": 1}, {"source": "a.pdf", "chunk_id": 7, "page": 2}]
+        vs = create_vectorstore(chunks, metadatas, persist_directory=tmp_path,
+                                embeddings=DeterministicFakeEmbedding(size=16))
+        vs.add_texts(chunks[:1], metadatas=metadatas[:1])  # random-ID copy of the first span
+
+        report = compact_vectorstore(vs)
+
+        assert report["duplicates"] == 1
+        assert sorted(vs._collection.get()["ids"]) == sorted(make_chunk_ids(chunks, metadatas))
+
+
+class TestEmbeddingBackends:
+    def test_torch_is_default_model(self):
+        """Test that the torch backend adds no model arguments."""
+        assert backend_model_kwargs("torch") == {}
+
+    def test_onnx_int8_selects_quantized_file(self):
+        """Test that the int8 backend loads a quantized ONNX graph."""
+        kwargs = backend_model_kwargs("onnx-int8")
+        assert kwargs["backend"] == "onnx"
+        assert "int8" in kwargs["model_kwargs"]["file_name"]
+
+    def test_unknown_backend(self):
+        """Test that unknown backends are rejected."""
+        with pytest.raises(ValueError):
+            backend_model_kwargs("tensorrt")
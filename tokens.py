@@ -0,0 +1,16 @@
+"""Cheap LLM token estimates for context budgeting.
+
+Dependency-free, so generator and adaptive_retrieval can share it without
+importing each other's dependencies.
+"""
+
+import math
+
+
+# Rough English average for OpenAI tokenizers; exact counts need the model's encoding
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
@@ -0,0 +1,188 @@
+"""Tune HNSW parameters for recall and latency.
+
+Rebuilds the stored embeddings into temporary in-memory collections for a
+grid of (M, construction_ef, search_ef) settings, measures recall@k
+against exact brute-force search and per-query latency, and recommends
+the cheapest setting that meets a target recall.
+
+Usage: uv run python tune_hnsw.py --target-recall 0.95 --k 5 --sample 200
+"""
+
+import argparse
+import itertools
+import random
+import re
+import time
+import uuid
+
+import chromadb
+import numpy as np
+from loguru import logger
+
+from evaluate import recall_at_k
+from run_evaluation import TEST_QUERIES
+from vectorstore import HNSWParams, get_embeddings, iter_entries, load_vectorstore
+
+
+M_GRID = (8, 16, 32)
+CONSTRUCTION_EF_GRID = (64, 128, 256)
+SEARCH_EF_GRID = (10, 20, 50, 100, 200)
+
+
+def exact_top_k(embeddings: np.ndarray, queries: np.ndarray, k: int, space: str = "l2") -> list[list[int]]:
+    """
+    Brute-force nearest neighbours, the ground truth for recall.
+
+    Args:
+        embeddings: (n, d) stored vectors
+        queries: (q, d) query vectors
+        k: Neighbours per query
+        space: "l2", "cosine" or "ip", as in HNSWParams
+
+    Returns:
+        For each query, indices of the k nearest stored vectors
+    """
+    if space == "l2":
+        distances = (
+            (queries ** 2).sum(axis=1)[:, None]
+            - 2 * queries @ embeddings.T
+            + (embeddings ** 2).sum(axis=1)[None, :]
+        )
+    elif space == "cosine":
+        a = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        b = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        distances = 1 - a @ b.T
+    elif space == "ip":
+        distances = 1 - queries @ embeddings.T
+    else:
+        raise ValueError(f"Unknown space: {space}")
+
+    k = min(k, embeddings.shape[0])
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1).tolist()
+
+
+def tune_vectors(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    k: int = 5,
+    space: str = "l2",
+    m_grid: tuple[int, ...] = M_GRID,
+    construction_ef_grid: tuple[int, ...] = CONSTRUCTION_EF_GRID,
+    search_ef_grid: tuple[int, ...] = SEARCH_EF_GRID,
+) -> list[dict]:
+    """
+    Measure recall@k and latency of each HNSW setting on the given vectors.
+
+    Returns:
+        One row per setting with "params" (HNSWParams), "recall",
+        "p50_ms" and "mean_ms"
+    """
+    truth = exact_top_k(embeddings, queries, k, space)
+    ids = [str(i) for i in range(len(embeddings))]
+    client = chromadb.EphemeralClient()
+    rows = []
+
+    for m, construction_ef in itertools.product(m_grid, construction_ef_grid):
+        build = HNSWParams(space=space, M=m, construction_ef=construction_ef, search_ef=search_ef_grid[0])
+        name = f"tune-{uuid.uuid4().hex[:12]}"
+        collection = client.create_collection(name, metadata=build.collection_metadata(), embedding_function=None)
+        try:
+            for start in range(0, len(ids), 1000):
+                collection.add(ids=ids[start:start + 1000], embeddings=embeddings[start:start + 1000])
+
+            for search_ef in search_ef_grid:
+                collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                latencies, recalls = [], []
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    found = collection.query(query_embeddings=[query], n_results=k, include=[])["ids"][0]
+                    latencies.append(time.perf_counter() - started)
+                    recalls.append(recall_at_k(found, [str(i) for i in expected], k))
+
+                latencies.sort()
+                rows.append({
+                    "params": HNSWParams(space=space, M=m, construction_ef=construction_ef, search_ef=search_ef),
+                    "recall": float(np.mean(recalls)),
+                    "p50_ms": latencies[len(latencies) // 2] * 1000,
+                    "mean_ms": float(np.mean(latencies)) * 1000,
+                })
+        finally:
+            client.delete_collection(name)
+
+    return rows
+
+
+def recommend(rows: list[dict], target_recall: float) -> dict | None:
+    """
+    Pick the cheapest setting meeting the target recall.
+
+    Cheapest means lowest median latency, then smallest M and
+    construction_ef (less memory and faster builds).
+
+    Returns:
+        The chosen row, or None if no setting reaches the target
+    """
+    passing = [row for row in rows if row["recall"] >= target_recall]
+    if not passing:
+        return None
+    return min(
+        passing,
+        key=lambda row: (round(row["p50_ms"], 2), row["params"].M, row["params"].construction_ef),
+    )
+
+
+def sample_queries(documents: list[str], sample: int, seed: int = 0) -> list[str]:
+    """Evaluation questions plus the first sentence of randomly sampled chunks."""
+    rng = random.Random(seed)
+    picked = rng.sample(documents, min(sample, len(documents)))
+    sentences = [re.split(r"(?<=[.!?])\s+", doc.strip())[0] for doc in picked]
+    return [query for query, _ in TEST_QUERIES] + [s for s in sentences if s]
+
+
+def main(argv: list[str] | None = None):
+    """Tune HNSW parameters against the current vector store."""
+    parser = argparse.ArgumentParser(description="Tune HNSW parameters for recall/latency.")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--sample", type=int, default=200, help="Number of sampled chunk queries")
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default="l2")
+    args = parser.parse_args(argv)
+
+    logger.info("Loading vector store...")
+    vectorstore = load_vectorstore()
+    embeddings, documents = [], []
+    for _, document, _, embedding in iter_entries(vectorstore, include=["documents", "embeddings"]):
+        embeddings.append(embedding)
+        documents.append(document or "")
+    if not embeddings:
+        logger.error("Vector store is empty. Run index.py first.")
+        return
+
+    queries = sample_queries(documents, args.sample)
+    logger.info(f"Embedding {len(queries)} queries...")
+    query_vectors = np.asarray(get_embeddings().embed_documents(queries), dtype=np.float32)
+
+    logger.info(f"Tuning over {len(embeddings)} vectors...")
+    rows = tune_vectors(np.asarray(embeddings, dtype=np.float32), query_vectors, k=args.k, space=args.space)
+
+    print(f"\n{'M':>4} {'c_ef':>5} {'s_ef':>5} {'recall@' + str(args.k):>9} {'p50 ms':>8}")
+    for row in rows:
+        p = row["params"]
+        print(f"{p.M:>4} {p.construction_ef:>5} {p.search_ef:>5} {row['recall']:>9.3f} {row['p50_ms']:>8.2f}")
+
+    best = recommend(rows, args.target_recall)
+    if best is None:
+        print(f"\nNo setting reached recall@{args.k} >= {args.target_recall}")
+        return
+    p = best["params"]
+    print(
+        f"\nRecommended: space={p.space} M={p.M} construction_ef={p.construction_ef} "
+        f"search_ef={p.search_ef} (recall {best['recall']:.3f}, p50 {best['p50_ms']:.2f} ms)"
+    )
+    print(f"Apply search_ef with: index_admin.py set-search-ef {p.search_ef}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,15 @@ for dpyocument retrieval.
 Run tests: uv run pytest tests/test_vectorstore.py
 """
 
+import hashlib
+from collections.abc import Callable
+from dataclasses import dataclass
 from pathlib import Path
 
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 import os
 import tempfile
 
@@ -18,10 +22,156 @@ import tempfile
 CHROMA_DB_PATH = Path("./chroma_db")
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
+# Embedding inference backend: "torch" (default), "onnx" or "onnx-int8".
+# The ONNX backends need `uv sync --extra onnx`.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+# Dynamically quantized int8 graph shipped in the model repo (x86 AVX2)
+ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
 
-def get_embeddings() -> HuggingFaceEmbeddings:
-    """Get the embedding model instance. (Provided)"""
-    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+@dataclass(frozen=True)
+class HNSWParams:
+    """HNSW index parameters for a Chroma collection.
+
+    `space`, `M` and `construction_ef` are fixed when a collection is
+    created; `search_ef` can be changed on an existing collection.
+    Defaults match Chroma's own.
+
+    Attributes:
+        space: Distance function, "l2", "cosine" or "ip"
+        M: Maximum neighbours per graph node
+        construction_ef: Candidate list size while building the graph
+        search_ef: Candidate list size while searching
+    """
+
+    space: str = "l2"
+    M: int = 16
+    construction_ef: int = 100
+    search_ef: int = 100
+
+    def collection_metadata(self) -> dict:
+        """Chroma collection metadata carrying these parameters."""
+        return {
+            "hnsw:space": self.space,
+            "hnsw:M": self.M,
+            "hnsw:construction_ef": self.construction_ef,
+            "hnsw:search_ef": self.search_ef,
+        }
+
+
+def set_search_ef(vectorstore: Chroma, search_ef: int) -> None:
+    """Change the HNSW search_ef of an existing collection.
+
+    The new value is saved with the collection, so it applies to every
+    later reader (see `index_admin.py set-search-ef`).
+    """
+    vectorstore._collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+
+
+def backend_model_kwargs(backend: str) -> dict:
+    """SentenceTransformer keyword arguments selecting an inference backend."""
+    if backend == "torch":
+        return {}
+    if backend == "onnx":
+        return {"backend": "onnx"}
+    if backend == "onnx-int8":
+        return {"backend": "onnx", "model_kwargs": {"file_name": ONNX_INT8_FILE}}
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {EMBEDDING_BACKENDS}")
+
+
+def get_embeddings(backend: str | None = None) -> HuggingFaceEmbeddings:
+    """Get the embedding model instance. (Provided)
+
+    `backend` selects PyTorch or ONNX Runtime inference for the same model
+    (default: EMBEDDING_BACKEND, from the environment). See embedding_bench.py
+    for a parity and throughput comparison.
+    """
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs=backend_model_kwargs(backend or EMBEDDING_BACKEND),
+    )
+
+
+def get_token_encoder(embeddings: HuggingFaceEmbeddings | None = None) -> tuple[Callable, int]:
+    """The embedding model's fast tokenizer as a batch chunker.TokenEncoder, and its token budget.
+
+    The budget is the model's max_seq_length (256 for all-MiniLM-L6-v2)
+    minus the special tokens added around every input; text beyond it is
+    truncated when embedded.
+    """
+    model = (embeddings or get_embeddings()).client
+    tokenizer = model.tokenizer
+
+    def encode(texts: list[str]) -> list[list[tuple[int, int]]]:
+        return tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+
+    return encode, model.max_seq_length - tokenizer.num_special_tokens_to_add()
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def make_chunk_id(text: str, metadata: dict, position: int = 0) -> str:
+    """
+    Deterministic ID for a chunk.
+
+    Derived from the source, the chunk's span within it (page and chunk
+    number, or `position` when the metadata has no chunk number) and a hash
+    of the text, so re-indexing the same chunk always yields the same ID.
+    """
+    span = f"{metadata.get('page', '')}:{metadata.get('chunk_id', position)}"
+    key = "\0".join([str(metadata.get("source", "")), span, content_hash(text)])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def make_chunk_ids(chunks: list[str], metadatas: list[dict]) -> list[str]:
+    """Deterministic IDs for a batch of chunks (see make_chunk_id)."""
+    return [make_chunk_id(c, m, i) for i, (c, m) in enumerate(zip(chunks, metadatas))]
+
+
+def source_ids(vectorstore: Chroma, source: str) -> list[str]:
+    """IDs of every stored chunk from one source file."""
+    return vectorstore._collection.get(where={"source": source}, include=[])["ids"]
+
+
+def delete_source(vectorstore: Chroma, source: str) -> int:
+    """
+    Delete every chunk from one source file.
+
+    Returns:
+        Number of chunks deleted
+    """
+    ids = source_ids(vectorstore, source)
+    if ids:
+        vectorstore.delete(ids=ids)
+    return len(ids)
+
+
+def delete_stale(vectorstore: Chroma, source: str, keep_ids: set[str] | list[str]) -> int:
+    """
+    Delete the chunks of one source file whose IDs are not in `keep_ids`.
+
+    Returns:
+        Number of chunks deleted
+    """
+    keep = set(keep_ids)
+    stale = [i for i in source_ids(vectorstore, source) if i not in keep]
+    if stale:
+        vectorstore.delete(ids=stale)
+    return len(stale)
+
+
+def _replace_stale(vectorstore: Chroma, ids: list[str], metadatas: list[dict]) -> int:
+    """Delete chunks of the indexed sources that are not part of this batch."""
+    keep = set(ids)
+    return sum(
+        delete_stale(vectorstore, source, keep)
+        for source in dict.fromkeys(m.get("source") for m in metadatas)
+        if source is not None
+    )
 
 
 def create_vectorstore(
@@ -29,15 +179,27 @@ def create_vectorstore(
     metadatas: list[dict],
     collection_name: str = "papers",
     persist_directory: str | Path = CHROMA_DB_PATH,
+    replace_sources: bool = True,
+    hnsw: HNSWParams | None = None,
+    embeddings: Embeddings | None = None,
 ) -> Chroma:
     """
     Create a Chroma vector store from document chunks.
 
+    Chunks are upserted under deterministic IDs (see make_chunk_id), so
+    indexing the same papers again into an existing store does not add a
+    second copy of anything.
+
     Args:
         chunks: List of text chunks to embed and store
         metadatas: List of metadata dicts (one per chunk), each with 'source' key
         collection_name: Name for the Chroma collection (default: "papers")
         persist_directory: Directory to persist the database (default: ./chroma_db)
+        replace_sources: Delete previously stored chunks of the same sources
+            that are not in this batch (default: True)
+        hnsw: HNSW index parameters for a new collection (default: Chroma's)
+        embeddings: Embedding model to use (default: get_embeddings()), e.g.
+            embedding_pool.PooledEmbeddings for multi-process builds
 
     Returns:
         Chroma vector store instance
@@ -58,7 +220,10 @@ def create_vectorstore(
             f"chunks and metadatas must be same length. Got {len(chunks)} chunks and {len(metadatas)} metadatas."
         )
 
-    embeddings = get_embeddings()
+    if embeddings is None:
+        embeddings = get_embeddings()
+    ids = make_chunk_ids(chunks, metadatas)
+    collection_metadata = hnsw.collection_metadata() if hnsw is not None else None
 
     persist_path = Path(persist_directory).resolve()
     temp_root = Path(tempfile.gettempdir()).resolve()
@@ -75,33 +240,81 @@ def create_vectorstore(
             texts=chunks,
             embedding=embeddings,
             metadatas=metadatas,
+            ids=ids,
             collection_name=collection_name,
+            collection_metadata=collection_metadata,
         )
 
     os.makedirs(str(persist_path), exist_ok=True)
-    return Chroma.from_texts(
+    vectorstore = Chroma.from_texts(
         texts=chunks,
         embedding=embeddings,
         metadatas=metadatas,
+        ids=ids,
         collection_name=collection_name,
         persist_directory=str(persist_path),
+        collection_metadata=collection_metadata,
     )
+    if replace_sources:
+        _replace_stale(vectorstore, ids, metadatas)
+    return vectorstore
 
 
     # raise NotImplementedError("Implement create_vectorstore")
 
 
+def open_vectorstore(
+    collection_name: str = "papers",
+    persist_directory: str | Path = CHROMA_DB_PATH,
+    hnsw: HNSWParams | None = None,
+    embeddings: Embeddings | None = None,
+) -> Chroma:
+    """Open a collection for add_chunks(), creating it with `hnsw` parameters if new."""
+    os.makedirs(str(persist_directory), exist_ok=True)
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings or get_embeddings(),
+        persist_directory=str(persist_directory),
+        collection_metadata=hnsw.collection_metadata() if hnsw is not None else None,
+    )
+
+
+def add_chunks(vectorstore: Chroma, chunks: list[str], metadatas: list[dict]) -> list[str]:
+    """
+    Upsert one batch of chunks under their deterministic IDs.
+
+    Unlike create_vectorstore(), other chunks of the same sources are left
+    alone; call delete_stale() once a source's last batch is written. The
+    batch must fit Chroma's maximum batch size (a few thousand).
+
+    Returns:
+        The chunk IDs (see make_chunk_id)
+    """
+    ids = make_chunk_ids(chunks, metadatas)
+    vectorstore.add_texts(chunks, metadatas=metadatas, ids=ids)
+    return ids
+
+
+def update_metadata(vectorstore: Chroma, ids: list[str], metadatas: list[dict], batch_size: int = 1000) -> None:
+    """Merge metadata into stored chunks; nothing is re-embedded."""
+    for start in range(0, len(ids), batch_size):
+        vectorstore._collection.update(
+            ids=ids[start:start + batch_size], metadatas=metadatas[start:start + batch_size]
+        )
+
+
 def load_vectorstore(
     collection_name: str = "papers",
     persist_directory: str | Path = CHROMA_DB_PATH,
 ) -> Chroma:
     """Load an existing Chroma vector store. (Provided)"""
     embeddings = get_embeddings()
-    return Chroma(
+    vectorstore = Chroma(
         collection_name=collection_name,
         embedding_function=embeddings,
         persist_directory=str(persist_directory),
     )
+    return vectorstore
 
 
 def retrieve(vectorstore: Chroma, query: str, k: int = 3) -> list[Document]:
@@ -142,3 +355,92 @@ def retrieve_with_scores(
     - Return documents with their scores
     """
     return vectorstore.similarity_search_with_score(query, k=k)
+
+
+def iter_entries(vectorstore: Chroma, include: list[str], batch_size: int = 1000):
+    """Page through every stored entry as (id, document, metadata, embedding)."""
+    offset = 0
+    while True:
+        batch = vectorstore._collection.get(include=include, limit=batch_size, offset=offset)
+        ids = batch["ids"]
+        if not ids:
+            return
+        documents = batch.get("documents") or [None] * len(ids)
+        metadatas = batch.get("metadatas") or [None] * len(ids)
+        embeddings = batch.get("embeddings")
+        if embeddings is None:
+            embeddings = [None] * len(ids)
+        yield from zip(ids, documents, metadatas, embeddings)
+        offset += len(ids)
+
+
+def compact_vectorstore(
+    vectorstore: Chroma, live_sources: set[str] | None = None, dry_run: bool = False
+) -> dict:
+    """
+    Remove orphaned and duplicate vectors from a store.
+
+    Orphans are entries with no text or, when `live_sources` is given, whose
+    source is not in it. Duplicates are entries with the same deterministic
+    ID (source, span and text; see make_chunk_id) as another entry, so the
+    same text at two spans of a paper is kept, as indexing would write it.
+    The copy stored under that ID is kept (older stores used random IDs),
+    otherwise the first one seen.
+
+    Args:
+        vectorstore: The Chroma vector store to compact
+        live_sources: Source filenames that should remain indexed (optional)
+        dry_run: Report what would be removed without deleting anything
+
+    Returns:
+        Dict with counts of entries scanned, orphans and duplicates removed,
+        and the approximate bytes of vectors, text and metadata reclaimed
+    """
+    orphans: list[str] = []
+    duplicates: list[str] = []
+    keep: dict[str, tuple[str, bool]] = {}
+    sizes: dict[str, int] = {}
+    scanned = 0
+
+    for entry_id, document, metadata, embedding in iter_entries(
+        vectorstore, include=["documents", "metadatas", "embeddings"]
+    ):
+        scanned += 1
+        metadata = metadata or {}
+        sizes[entry_id] = (
+            (len(embedding) * 4 if embedding is not None else 0)
+            + len((document or "").encode())
+            + len(str(metadata).encode())
+        )
+
+        source = metadata.get("source")
+        if not document or (live_sources is not None and source not in live_sources):
+            orphans.append(entry_id)
+            continue
+
+        key = make_chunk_id(document, metadata)
+        canonical = entry_id == key
+        if key not in keep:
+            keep[key] = (entry_id, canonical)
+            continue
+
+        kept_id, kept_canonical = keep[key]
+        if canonical and not kept_canonical:
+            duplicates.append(kept_id)
+            keep[key] = (entry_id, True)
+        else:
+            duplicates.append(entry_id)
+
+    removed = orphans + duplicates
+    if removed and not dry_run:
+        for start in range(0, len(removed), 1000):
+            vectorstore.delete(ids=removed[start:start + 1000])
+
+    return {
+        "scanned": scanned,
+        "orphans": len(orphans),
+        "duplicates": len(duplicates),
+        "removed": len(removed),
+        "bytes_reclaimed": sum(sizes[i] for i in removed),
+        "dry_run": dry_run,
+    }